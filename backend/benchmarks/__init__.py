@@ -0,0 +1,5 @@
+"""
+Benchmarks for the backend hot paths.
+
+Run from `backend/` with `python -m benchmarks.run`; see the README for options.
+"""
@@ -0,0 +1,240 @@
+"""
+Time the backend hot paths against synthetic data.
+
+Each case is measured cold (every cache it depends on cleared first) and warm
+(repeated calls served by the caches), directly and through the FastAPI app
+with a test client.  Results are written as JSON for regression tracking; pass
+a previous result file as `--baseline` to flag warm medians that got slower.
+
+    cd backend
+    python -m benchmarks.run --size 448x304 --years 2015-2016 --output bench.json
+    python -m benchmarks.run --baseline bench.json --max-regression 0.2
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .synthetic import MODEL_NAME, write_dataset, write_model
+
+# Warm medians below this are cache hits dominated by timer noise; not compared.
+COMPARE_FLOOR_MS = 0.05
+
+
+def _parse_size(value: str) -> Tuple[int, int]:
+    height, width = (int(part) for part in value.lower().split("x"))
+    return height, width
+
+
+def _parse_years(value: str) -> Tuple[int, int]:
+    start, _, end = value.partition("-")
+    return int(start), int(end or start)
+
+
+def prepare_data(args: argparse.Namespace) -> Tuple[Path, Dict]:
+    """Generate (or reuse) the synthetic dataset and model under the data directory."""
+    root = Path(args.data_dir or tempfile.mkdtemp(prefix="ice-bench-")).resolve()
+    model_path = root / "trained_data" / MODEL_NAME
+    info: Dict = {"data_dir": str(root), "reused": False}
+    if model_path.exists() and not args.regenerate:
+        info["reused"] = True
+        info["rasters"] = sum(1 for _ in root.rglob("*.tif"))
+        return root, info
+
+    started = time.perf_counter()
+    paths = write_dataset(root, args.years, args.every_days, *args.size)
+    info["rasters"] = len(paths)
+    info["model"] = write_model(model_path, args.years, *args.size)
+    info["generate_s"] = round(time.perf_counter() - started, 3)
+    return root, info
+
+
+def _summary(samples: List[float]) -> Dict:
+    ordered = sorted(samples)
+    return {
+        "n": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered), 3),
+        "median_ms": round(statistics.median(ordered), 3),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))], 3),
+        "min_ms": round(ordered[0], 3),
+    }
+
+
+def measure(name: str, fn: Callable[[], object], reset: Callable[[], None], repeat: int) -> Dict:
+    """One cold call after `reset`, then `repeat` warm calls."""
+    reset()
+    started = time.perf_counter()
+    fn()
+    cold_ms = (time.perf_counter() - started) * 1000.0
+
+    warm = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        warm.append((time.perf_counter() - started) * 1000.0)
+    result = {"name": name, "cold_ms": round(cold_ms, 3), "warm": _summary(warm)}
+    print(f"{name:<32} cold {cold_ms:10.2f} ms   warm median {result['warm']['median_ms']:10.3f} ms", flush=True)
+    return result
+
+
+def run_cases(args: argparse.Namespace) -> List[Dict]:
+    # The backend reads its configuration at import time.
+    from fastapi.testclient import TestClient
+
+    from src.core import converter
+    from src.core.services import ice_extent, prediction
+    from src.main import app
+
+    def reset_catalog() -> None:
+        with ice_extent._CATALOG_LOCK:
+            ice_extent._CATALOG.update(signature=None, checked_at=None, paths={})
+
+    def reset_conversion() -> None:
+        converter.convert_tif_to_geojson.cache_clear()
+        converter.load_ice_mask.cache_clear()
+        converter.load_raster.cache_clear()
+
+    def reset_prediction() -> None:
+        prediction.cached_prediction.cache_clear()
+        prediction.predict_ice_grid.cache_clear()
+        with prediction._PROB_FIELDS_LOCK:
+            prediction._PROB_FIELDS.clear()
+        prediction._MODEL_DATA = {}
+
+    def reset_all() -> None:
+        reset_catalog()
+        reset_conversion()
+        reset_prediction()
+
+    dates = ice_extent.scan_available_dates()
+    if not dates:
+        raise SystemExit("No synthetic rasters found; rerun with --regenerate")
+    date = dates[len(dates) // 2]
+    year = int(date[:4])
+    month = int(date[5:7])
+    path = str(ice_extent.find_dataset_path(date))
+    radius = args.radius_km
+    client = TestClient(app)
+
+    def get(url: str) -> Callable[[], object]:
+        def call() -> object:
+            response = client.get(url)
+            response.raise_for_status()
+            return response.content
+        return call
+
+    def load_year() -> object:
+        return [converter.convert_tif_to_geojson(str(p), radius) for p in ice_extent.get_datasets_for_year(year)]
+
+    cases = [
+        ("catalog.scan_available_dates", ice_extent.scan_available_dates, reset_catalog),
+        ("catalog.find_dataset_path", lambda: ice_extent.find_dataset_path(date), reset_catalog),
+        ("converter.load_ice_mask", lambda: converter.load_ice_mask(path, radius), reset_conversion),
+        ("converter.convert_tif_to_geojson", lambda: converter.convert_tif_to_geojson(path, radius), reset_conversion),
+        ("prediction.predict_probability_fields", lambda: prediction.predict_probability_fields([(year, month)]), reset_prediction),
+        ("prediction.cached_prediction", lambda: prediction.cached_prediction(year, month, 0.5, radius), reset_prediction),
+        ("ice_extent.by_year_load", load_year, reset_conversion),
+        ("http GET /ice_extent", get(f"{args.prefix}/ice_extent?date={date}&radius_km={radius}"), reset_all),
+        ("http GET /ice_extent/available_dates", get(f"{args.prefix}/ice_extent/available_dates"), reset_all),
+        ("http GET /ice_extent/predict", get(f"{args.prefix}/ice_extent/predict?date={date}&radius_km={radius}"), reset_all),
+        ("http GET /ice_extent/by_year", get(f"{args.prefix}/ice_extent/by_year?year={year}&radius_km={radius}"), reset_all),
+    ]
+    selected = [case for case in cases if not args.only or any(token in case[0] for token in args.only)]
+    return [measure(name, fn, reset, args.repeat) for name, fn, reset in selected]
+
+
+def compare(results: List[Dict], baseline_path: Path, max_regression: float) -> List[Dict]:
+    """Warm-median ratios against a previous run; returns the cases that regressed."""
+    baseline = {case["name"]: case for case in json.loads(baseline_path.read_text())["results"]}
+    regressions = []
+    for case in results:
+        previous = baseline.get(case["name"])
+        if previous is None or max(previous["warm"]["median_ms"], case["warm"]["median_ms"]) < COMPARE_FLOOR_MS:
+            continue
+        ratio = case["warm"]["median_ms"] / previous["warm"]["median_ms"]
+        case["baseline_ratio"] = round(ratio, 3)
+        if ratio > 1.0 + max_regression:
+            regressions.append(case)
+    return regressions
+
+
+def _metadata(args: argparse.Namespace, data: Dict) -> Dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": {
+            "size": list(args.size),
+            "years": list(args.years),
+            "every_days": args.every_days,
+            "repeat": args.repeat,
+            "radius_km": args.radius_km,
+        },
+        "data": data,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=_parse_size, default=(448, 304), help="raster HEIGHTxWIDTH (default 448x304)")
+    parser.add_argument("--years", type=_parse_years, default=(2015, 2016), help="year range, e.g. 2015-2016")
+    parser.add_argument("--every-days", type=int, default=30, help="days between synthetic rasters (default 30)")
+    parser.add_argument("--repeat", type=int, default=10, help="warm iterations per case (default 10)")
+    parser.add_argument("--radius-km", type=float, default=500.0, help="radius filter used by every case")
+    parser.add_argument("--data-dir", help="where to write synthetic data (reused if present; default a temp dir)")
+    parser.add_argument("--regenerate", action="store_true", help="rewrite the synthetic data even if present")
+    parser.add_argument("--only", nargs="*", help="run only cases whose name contains one of these strings")
+    parser.add_argument("--output", type=Path, help="write JSON results to this file")
+    parser.add_argument("--baseline", type=Path, help="previous JSON results to compare warm medians against")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="allowed slowdown vs baseline (default 0.25)")
+    args = parser.parse_args(argv)
+    args.prefix = os.environ.get("API_PREFIX", "/api")
+
+    root, data = prepare_data(args)
+    os.environ["ICE_DATASET_DIR"] = str(root)
+    os.environ["ICE_MODEL_DIR"] = str(root / "trained_data")
+    os.environ.setdefault("SMS_ENABLED", "false")
+    # Background prefetching would warm the caches the cold cases measure.
+    os.environ.setdefault("PREFETCH_ENABLED", "false")
+    os.environ.setdefault("CHAT_BACKEND", "stub")
+    print(f"Synthetic data: {data['rasters']} rasters in {root}", flush=True)
+
+    results = run_cases(args)
+    report = {"meta": _metadata(args, data), "results": results}
+
+    regressions = compare(results, args.baseline, args.max_regression) if args.baseline else []
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f"Results written to {args.output}")
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    for case in regressions:
+        print(f"REGRESSION {case['name']}: {case['baseline_ratio']:.2f}x baseline warm median", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
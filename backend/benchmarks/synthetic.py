@@ -0,0 +1,136 @@
+"""
+Synthetic polar-stereographic GeoTIFFs and RBF models for benchmarking.
+
+The rasters mimic the NSIDC sea-ice extent product: a seasonal ice cap around
+the pole (code 1), a pole hole (251), a land mass with a coastline (254/253)
+and open ocean (0), on a grid covering the standard NSIDC north extent.  The
+model is fitted on the same rasters the way `brf_training/train_rbf.py` does,
+so predictions look like the observations they were trained on.
+"""
+from __future__ import annotations
+
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+import rasterio
+from rasterio.transform import Affine
+
+# NSIDC polar stereographic north grid (EPSG:3411), 304 x 448 cells of 25 km.
+CRS = "EPSG:3411"
+X_MIN, Y_MAX = -3850000.0, 5850000.0
+X_SPAN, Y_SPAN = 7600000.0, 11200000.0
+NODATA = 255
+
+MODEL_NAME = "rbf_model_2015_2025_spatiotemporal.npz"
+
+
+def grid_transform(height: int, width: int) -> Affine:
+    """Transform for a `height` x `width` grid covering the NSIDC extent."""
+    return Affine(X_SPAN / width, 0.0, X_MIN, 0.0, -Y_SPAN / height, Y_MAX)
+
+
+def _polar(height: int, width: int) -> Tuple[np.ndarray, np.ndarray]:
+    transform = grid_transform(height, width)
+    cols, rows = np.meshgrid(np.arange(width) + 0.5, np.arange(height) + 0.5)
+    xs = transform.c + cols * transform.a
+    ys = transform.f + rows * transform.e
+    return np.hypot(xs, ys) / 1000.0, np.arctan2(ys, xs)
+
+
+def ice_band(height: int, width: int, day: date) -> np.ndarray:
+    """One uint8 extent raster for `day`; deterministic for a given date and size."""
+    dist_km, angle = _polar(height, width)
+    transform = grid_transform(height, width)
+    xs = transform.c + (np.arange(width) + 0.5) * transform.a
+    ys = transform.f + (np.arange(height) + 0.5) * transform.e
+    land_dist = np.hypot(xs[None, :] - 1500e3, ys[:, None] + 1500e3) / 1000.0
+
+    doy = day.timetuple().tm_yday
+    rng = np.random.default_rng(day.toordinal())
+    # Seasonal radius with a slow decline and a ragged, date-dependent edge.
+    radius = 2500.0 + 900.0 * np.cos(2 * np.pi * (doy - 60) / 365.0) - 50.0 * (day.year - 2015)
+    phases = rng.uniform(0, 2 * np.pi, size=3)
+    edge = sum(
+        amplitude * np.cos(k * angle + phase)
+        for k, amplitude, phase in zip((3, 7, 13), (180.0, 90.0, 40.0), phases)
+    )
+
+    band = np.where(dist_km < radius + edge, 1, 0).astype(np.uint8)
+    band[land_dist < 1250.0] = 253
+    band[land_dist < 1200.0] = 254
+    band[dist_km < 100.0] = 251
+    return band
+
+
+def write_dataset(
+    root: Path,
+    years: Tuple[int, int] = (2015, 2016),
+    every_days: int = 30,
+    height: int = 448,
+    width: int = 304,
+) -> List[Path]:
+    """
+    Write one raster every `every_days` days for the inclusive year range,
+    laid out as `root/YYYY/MM_Mon/N_YYYYMMDD_extent_v4.0.tif` like the real
+    dataset.  Returns the written paths.
+    """
+    transform = grid_transform(height, width)
+    paths = []
+    day, end = date(years[0], 1, 1), date(years[1], 12, 31)
+    while day <= end:
+        directory = root / str(day.year) / f"{day.month:02d}_{day.strftime('%b')}"
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"N_{day.strftime('%Y%m%d')}_extent_v4.0.tif"
+        with rasterio.open(
+            path, "w", driver="GTiff", height=height, width=width, count=1,
+            dtype="uint8", crs=CRS, transform=transform, nodata=NODATA,
+        ) as dst:
+            dst.write(ice_band(height, width, day), 1)
+        paths.append(path)
+        day += timedelta(days=every_days)
+    return paths
+
+
+def write_model(
+    path: Path,
+    years: Tuple[int, int] = (2015, 2016),
+    height: int = 448,
+    width: int = 304,
+    alpha: float = 0.01,
+    gamma: float = 1.0,
+) -> Dict:
+    """
+    Fit a kernel ridge model on one synthetic raster per month of the year
+    range and save it in the `.npz` layout `prediction.py` loads.  Returns
+    the model's shape (training samples, valid pixels).
+    """
+    samples = [date(year, month, 15) for year in range(years[0], years[1] + 1) for month in range(1, 13)]
+    bands = [ice_band(height, width, day) for day in samples]
+    valid_mask = bands[0] != NODATA
+    targets = np.stack([(band == 1).astype(np.float32)[valid_mask] for band in bands])
+
+    years_arr = np.array([day.year for day in samples])
+    months_arr = np.array([day.month for day in samples])
+    year_norm = (years_arr - years_arr.min()) / max(1, years_arr.max() - years_arr.min())
+    t = np.stack([year_norm, np.sin(2 * np.pi * months_arr / 12.0), np.cos(2 * np.pi * months_arr / 12.0)], axis=1)
+    kernel = np.exp(-gamma * ((t[:, None, :] - t[None, :, :]) ** 2).sum(axis=2))
+    weights = np.linalg.solve(kernel + alpha * np.eye(len(samples)), targets)
+
+    transform = grid_transform(height, width)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    np.savez(
+        path,
+        weights=weights.T.astype(np.float32),
+        valid_mask=valid_mask,
+        years=years_arr,
+        months=months_arr,
+        alpha=alpha,
+        gamma=gamma,
+        H=height,
+        W=width,
+        transform=np.array([transform.a, transform.b, transform.c, transform.d, transform.e, transform.f]),
+        crs=CRS,
+    )
+    return {"samples": len(samples), "valid_pixels": int(valid_mask.sum())}
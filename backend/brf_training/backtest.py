@@ -0,0 +1,221 @@
+"""
+Hindcast the RBF model against the observed masks.
+
+Two modes, both on the same data and hyper-parameters as `train_rbf.py`:
+
+- `lomo` (leave-one-month-out): every (year, month) is predicted by the model
+  fitted on all other months.  With C = (K + alpha I)^-1 and G the samples of
+  one month, the held-out prediction is the closed-form identity
+
+      f_-G(t_G) = Y_G - (C_GG)^-1 (C Y)_G
+
+  so one inverse and one product C @ Y replace a refit per month.
+- `rolling` (rolling origin): for each origin month, fit on all earlier months
+  and predict the next `--horizon` months, as the live model does for dates
+  after its training range.
+
+Predictions are evaluated in blocks of pixels with batched matrix products and
+thresholded like `predict_ice_grid`.  Per sample it reports IoU, accuracy and
+the extent error against the observed ice mask, aggregated overall, per
+calendar month and (rolling) per lead time.
+
+    cd backend
+    python brf_training/backtest.py --mode lomo
+    python brf_training/backtest.py --mode rolling --min-train-months 36 --horizon 3
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+
+from train_rbf import (
+    ALPHA, DATA_ROOT, DATACUBE_DIR, GAMMA, OUT_PATH, YEAR_END, YEAR_START,
+    find_rasters, load_samples, parse_date, rbf, temporal_features,
+)
+
+# Pixels per block; C @ Y for one block is (samples x BLOCK) float32.
+BLOCK = 16384
+
+
+def _counts(pred, obs):
+    """Per-sample [tp, fp, fn, tn] for boolean (samples, pixels) arrays."""
+    tp = (pred & obs).sum(axis=1)
+    fp = (pred & ~obs).sum(axis=1)
+    fn = (~pred & obs).sum(axis=1)
+    tn = pred.shape[1] - tp - fp - fn
+    return np.stack([tp, fp, fn, tn], axis=1)
+
+
+def lomo_counts(t, Y, groups, alpha, gamma, thresh, block=BLOCK):
+    """Confusion counts per sample of the leave-one-month-out predictions."""
+    A = rbf(t, t, gamma) + alpha * np.eye(len(t))
+    C = np.linalg.inv(A)
+    members = [np.flatnonzero(groups == g) for g in np.unique(groups)]
+    # (C_GG)^-1 per held-out month; small (days in a month) square matrices.
+    corrections = [(idx, np.linalg.inv(C[np.ix_(idx, idx)]).astype(np.float32)) for idx in members]
+    C32 = C.astype(np.float32)
+
+    counts = np.zeros((len(t), 4), dtype=np.int64)
+    for start in range(0, Y.shape[1], block):
+        Yb = Y[:, start:start + block].astype(np.float32)
+        CY = C32 @ Yb
+        pred = np.empty_like(Yb)
+        for idx, correction in corrections:
+            pred[idx] = Yb[idx] - correction @ CY[idx]
+        counts += _counts(pred >= thresh, Yb > 0.5)
+    return counts
+
+
+def rolling_counts(years, months, Y, groups, alpha, gamma, thresh, min_train, horizon, step, block=BLOCK):
+    """
+    Confusion counts of rolling-origin forecasts.  Returns (sample index,
+    origin group, lead in months, counts) rows for every forecast made.
+    """
+    order = np.unique(groups)
+    plans = []
+    for o in range(min_train, len(order), step):
+        train = np.flatnonzero(groups < order[o])
+        test = np.flatnonzero((groups >= order[o]) & (groups < order[o] + horizon))
+        # Normalise years with the training range only, as a model fitted at the origin would.
+        t = temporal_features(years, months, years[train].min(), years[train].max())
+        A = rbf(t[train], t[train], gamma) + alpha * np.eye(len(train))
+        coefficients = np.linalg.solve(A, rbf(t[train], t[test], gamma)).astype(np.float32)
+        plans.append((order[o], train, test, coefficients))
+
+    counts = [np.zeros((len(test), 4), dtype=np.int64) for _, _, test, _ in plans]
+    for start in range(0, Y.shape[1], block):
+        Yb = Y[:, start:start + block]
+        for (_, train, test, coefficients), total in zip(plans, counts):
+            pred = coefficients.T @ Yb[train].astype(np.float32)
+            total += _counts(pred >= thresh, Yb[test] > 0)
+
+    rows = []
+    for (origin, _, test, _), total in zip(plans, counts):
+        for i, sample in enumerate(test):
+            rows.append((sample, origin, int(groups[sample] - origin) + 1, total[i]))
+    return rows
+
+
+def _sample_metrics(counts, cell_km2):
+    tp, fp, fn, tn = (int(v) for v in counts)
+    union = tp + fp + fn
+    return {
+        "iou": tp / union if union else 1.0,
+        "accuracy": (tp + tn) / (tp + fp + fn + tn),
+        "observed_km2": (tp + fn) * cell_km2,
+        "predicted_km2": (tp + fp) * cell_km2,
+    }
+
+
+def _aggregate(samples, counts):
+    """Mean per-sample scores plus pooled IoU over a set of samples."""
+    tp, fp, fn, _ = counts.sum(axis=0)
+    errors = np.array([s["predicted_km2"] - s["observed_km2"] for s in samples])
+    return {
+        "samples": len(samples),
+        "iou_mean": float(np.mean([s["iou"] for s in samples])),
+        "iou_pooled": float(tp / (tp + fp + fn)) if tp + fp + fn else 1.0,
+        "accuracy_mean": float(np.mean([s["accuracy"] for s in samples])),
+        "extent_bias_km2": float(errors.mean()),
+        "extent_mae_km2": float(np.abs(errors).mean()),
+    }
+
+
+def _group_by(samples, counts, key):
+    groups = {}
+    for i, sample in enumerate(samples):
+        groups.setdefault(sample[key], []).append(i)
+    return {
+        str(value): _aggregate([samples[i] for i in idx], counts[idx])
+        for value, idx in sorted(groups.items())
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest the RBF ice model against observed masks.")
+    parser.add_argument("--mode", choices=("lomo", "rolling"), default="lomo")
+    parser.add_argument("--data-root", type=Path, default=DATA_ROOT)
+    parser.add_argument("--years", default=f"{YEAR_START}-{YEAR_END}", help="inclusive range, e.g. 2015-2025")
+    parser.add_argument("--alpha", type=float, default=ALPHA)
+    parser.add_argument("--gamma", type=float, default=GAMMA)
+    parser.add_argument("--thresh", type=float, default=0.5, help="ice probability threshold")
+    parser.add_argument("--min-train-months", type=int, default=24, help="rolling: months before the first origin")
+    parser.add_argument("--horizon", type=int, default=1, help="rolling: months predicted from each origin")
+    parser.add_argument("--step", type=int, default=1, help="rolling: months between origins")
+    parser.add_argument("--output", type=Path, default=None, help="report path (default next to the model)")
+    args = parser.parse_args()
+
+    year_start, year_end = (int(part) for part in args.years.split("-"))
+    started = time.perf_counter()
+    tif_paths = find_rasters(args.data_root, year_start, year_end)
+    years, months, Y, valid_mask, transform, _ = load_samples(tif_paths, DATACUBE_DIR)
+    dates = [parse_date(p)[2] for p in tif_paths]
+    loaded = time.perf_counter()
+    print(f"Loaded {len(dates)} rasters x {Y.shape[1]} pixels in {loaded - started:.1f} s")
+
+    groups = years * 12 + (months - 1)
+    cell_km2 = abs(transform.a * transform.e) / 1e6
+    if args.mode == "lomo":
+        t = temporal_features(years, months)
+        counts = lomo_counts(t, Y, groups, args.alpha, args.gamma, args.thresh)
+        samples = [
+            {"date": date, "month": int(m), **_sample_metrics(c, cell_km2)}
+            for date, m, c in zip(dates, months, counts)
+        ]
+    else:
+        rows = rolling_counts(
+            years, months, Y, groups, args.alpha, args.gamma, args.thresh,
+            args.min_train_months, args.horizon, args.step,
+        )
+        if not rows:
+            raise SystemExit("No rolling origins: lower --min-train-months or add data.")
+        counts = np.stack([c for *_, c in rows])
+        samples = [
+            {
+                "date": dates[i], "month": int(months[i]),
+                "origin": f"{origin // 12:04d}-{origin % 12 + 1:02d}", "lead_months": lead,
+                **_sample_metrics(c, cell_km2),
+            }
+            for i, origin, lead, c in rows
+        ]
+    elapsed = time.perf_counter() - loaded
+
+    report = {
+        "mode": args.mode,
+        "years": [year_start, year_end],
+        "alpha": args.alpha,
+        "gamma": args.gamma,
+        "thresh": args.thresh,
+        "pixels": int(Y.shape[1]),
+        "load_seconds": round(loaded - started, 3),
+        "backtest_seconds": round(elapsed, 3),
+        "overall": _aggregate(samples, counts),
+        "by_calendar_month": _group_by(samples, counts, "month"),
+        "samples": samples,
+    }
+    if args.mode == "rolling":
+        report.update(
+            min_train_months=args.min_train_months, horizon=args.horizon, step=args.step,
+            by_lead_months=_group_by(samples, counts, "lead_months"),
+        )
+
+    output = args.output or OUT_PATH.parent / f"backtest_{args.mode}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+
+    overall = report["overall"]
+    print(
+        f"{args.mode}: {overall['samples']} forecasts in {elapsed:.1f} s; IoU {overall['iou_mean']:.3f} "
+        f"(pooled {overall['iou_pooled']:.3f}), accuracy {overall['accuracy_mean']:.4f}, "
+        f"extent MAE {overall['extent_mae_km2']:,.0f} km²"
+    )
+    for key, label in (("by_lead_months", "lead"), ("by_calendar_month", "month")):
+        for value, stats in report.get(key, {}).items():
+            print(f"  {label} {value:>2}: IoU {stats['iou_mean']:.3f}, accuracy {stats['accuracy_mean']:.4f}")
+    print(f"Report written to {output}")
+
+
+if __name__ == "__main__":
+    main()
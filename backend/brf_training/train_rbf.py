@@ -1,8 +1,14 @@
 from pathlib import Path
+import os
 import re
+import sys
 import numpy as np
 import rasterio
 
+# Use the backend's datacube (python -m src.core.datacube) for rasters it holds.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from src.core.datacube import ICE_PLANE, DataCube  # noqa: E402
+
 # Training is done for years between 2015 to 2025 for the training speed and the laptop's capacity limits, can also be done via Colab for more accurate result.
 YEAR_START = 2015
 YEAR_END = 2025
@@ -12,88 +18,128 @@ GAMMA = 1.0
 # Resolve dataset root relative to this file so running from backend/ works
 DATA_ROOT = Path(__file__).resolve().parent / "datasets" / "all_source"
 OUT_PATH = Path(__file__).resolve().parent / "datasets" / "trained_data" / "rbf_model_2015_2025_spatiotemporal.npz"
+DATACUBE_DIR = Path(os.environ.get("ICE_DATACUBE_DIR", DATA_ROOT / "datacube"))
 
 
-def _inside_range(year: int) -> bool:
-    return YEAR_START <= year <= YEAR_END
-
-def parse_year_month(path: Path):
-    m = re.search(r"(\d{4})(\d{2})\d{2}", path.stem)
+def parse_date(path: Path):
+    m = re.search(r"(\d{4})(\d{2})(\d{2})", path.stem)
     if not m:
         raise ValueError(f"Cannot parse date from {path.name}")
-    return int(m.group(1)), int(m.group(2))
-
-if not DATA_ROOT.exists():
-    raise SystemExit(f"Dataset root not found at {DATA_ROOT}")
-
-tif_paths = []
-for p in sorted(DATA_ROOT.rglob("*.tif")):
-    y, _ = parse_year_month(p)
-    if _inside_range(y):
-        tif_paths.append(p)
-
-if not tif_paths:
-    raise SystemExit(f"No GeoTIFFs found in {DATA_ROOT} for years {YEAR_START}-{YEAR_END}")
-
-years, months, rows = [], [], []
-valid_mask = None
-transform = None
-crs = None
-
-for p in tif_paths:
-    with rasterio.open(p) as src:
-        band = src.read(1)
-        nodata = src.nodata
-        if transform is None:
-            transform = src.transform
-            crs = src.crs
-        if valid_mask is None:
-            valid_mask = np.ones_like(band, dtype=bool)
-            if nodata is not None:
-                valid_mask &= band != nodata
-        y = (band == 1).astype(np.float32)
-        rows.append(y[valid_mask])
-    y_, m_ = parse_year_month(p)
-    years.append(y_)
-    months.append(m_)
-
-Y = np.stack(rows, axis=0)
-years = np.array(years)
-months = np.array(months)
-H, W = valid_mask.shape
-
-# temporal features
-year_norm = (years - years.min()) / max(1, (years.max() - years.min()))
-month_sin = np.sin(2 * np.pi * months / 12.0)
-month_cos = np.cos(2 * np.pi * months / 12.0)
-t = np.stack([year_norm, month_sin, month_cos], axis=1) 
+    return int(m.group(1)), int(m.group(2)), f"{m.group(1)}-{m.group(2)}-{m.group(3)}"
+
+def parse_year_month(path: Path):
+    y, m, _ = parse_date(path)
+    return y, m
+
+def find_rasters(data_root: Path = DATA_ROOT, year_start: int = YEAR_START, year_end: int = YEAR_END):
+    if not data_root.exists():
+        raise SystemExit(f"Dataset root not found at {data_root}")
+
+    tif_paths = []
+    for p in sorted(data_root.rglob("*.tif")):
+        y, _ = parse_year_month(p)
+        if year_start <= y <= year_end:
+            tif_paths.append(p)
+
+    if not tif_paths:
+        raise SystemExit(f"No GeoTIFFs found in {data_root} for years {year_start}-{year_end}")
+    return tif_paths
+
+def load_samples(tif_paths, datacube_dir: Path = DATACUBE_DIR):
+    """
+    Read the ice rows (1 = sea ice) of every raster over the first raster's
+    valid pixels.  Returns years, months, Y (samples, valid pixels) uint8,
+    valid_mask, transform and crs.
+    """
+    years, months, rows = [], [], []
+    valid_mask = None
+    transform = None
+    crs = None
+
+    cube = DataCube(datacube_dir) if (datacube_dir / "cube.json").exists() else None
+    from_cube = 0
+
+    for p in tif_paths:
+        y_, m_, iso = parse_date(p)
+        if cube is not None and cube.has(iso, p):
+            # Sequential reads of bit-packed planes instead of a GeoTIFF decode per date.
+            from_cube += 1
+            if transform is None:
+                transform, crs = cube.transform, cube.crs
+            if valid_mask is None:
+                band = cube.band(iso)
+                valid_mask = np.ones_like(band, dtype=bool)
+                if cube.nodata is not None:
+                    valid_mask &= band != cube.nodata
+            rows.append(cube.plane(iso, ICE_PLANE)[valid_mask].astype(np.uint8))
+        else:
+            with rasterio.open(p) as src:
+                band = src.read(1)
+                nodata = src.nodata
+                if transform is None:
+                    transform = src.transform
+                    crs = src.crs
+                if valid_mask is None:
+                    valid_mask = np.ones_like(band, dtype=bool)
+                    if nodata is not None:
+                        valid_mask &= band != nodata
+                y = (band == 1).astype(np.uint8)
+                rows.append(y[valid_mask])
+        years.append(y_)
+        months.append(m_)
+
+    if cube is not None:
+        print(f"Read {from_cube} of {len(tif_paths)} rasters from the datacube at {datacube_dir}")
+
+    return np.array(years), np.array(months), np.stack(rows, axis=0), valid_mask, transform, crs
+
+def temporal_features(years, months, year_min=None, year_max=None):
+    """[year_norm, sin(month), cos(month)] rows; the year range defaults to that of `years`."""
+    year_min = years.min() if year_min is None else year_min
+    year_max = years.max() if year_max is None else year_max
+    year_norm = (years - year_min) / max(1, (year_max - year_min))
+    month_sin = np.sin(2 * np.pi * months / 12.0)
+    month_cos = np.cos(2 * np.pi * months / 12.0)
+    return np.stack([year_norm, month_sin, month_cos], axis=1)
 
 def rbf(x1, x2, gamma):
     diff = x1[:, None, :] - x2[None, :, :]
     dist2 = (diff ** 2).sum(axis=2)
     return np.exp(-gamma * dist2)
 
-K = rbf(t, t, GAMMA)
-A = K + ALPHA * np.eye(len(K))
-
-# solve for B then store weights = B.T
-B = np.linalg.solve(A, Y)
-weights = B.T 
-
-transform_arr = np.array([transform.a, transform.b, transform.c, transform.d, transform.e, transform.f], dtype=np.float64)
-
-OUT_PATH.parent.mkdir(parents=True, exist_ok=True)
-np.savez(
-    OUT_PATH,
-    weights=weights,
-    valid_mask=valid_mask.astype(bool),
-    years=years,
-    months=months,
-    alpha=ALPHA,
-    gamma=GAMMA,
-    H=H,
-    W=W,
-    transform=transform_arr,
-    crs=str(crs),
-)
-print(f"Saved model to {OUT_PATH}")
+def main():
+    tif_paths = find_rasters()
+    years, months, Y, valid_mask, transform, crs = load_samples(tif_paths)
+    H, W = valid_mask.shape
+
+    # temporal features
+    t = temporal_features(years, months)
+
+    K = rbf(t, t, GAMMA)
+    A = K + ALPHA * np.eye(len(K))
+
+    # solve for B then store weights = B.T
+    B = np.linalg.solve(A, Y.astype(np.float32))
+    weights = B.T
+
+    transform_arr = np.array([transform.a, transform.b, transform.c, transform.d, transform.e, transform.f], dtype=np.float64)
+
+    OUT_PATH.parent.mkdir(parents=True, exist_ok=True)
+    np.savez(
+        OUT_PATH,
+        weights=weights,
+        valid_mask=valid_mask.astype(bool),
+        years=years,
+        months=months,
+        alpha=ALPHA,
+        gamma=GAMMA,
+        H=H,
+        W=W,
+        transform=transform_arr,
+        crs=str(crs),
+    )
+    print(f"Saved model to {OUT_PATH}")
+
+
+if __name__ == "__main__":
+    main()
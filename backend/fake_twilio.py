@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Minimal fake of the Twilio Messages API for load-testing SMS broadcasts
+
+Run it, then start the backend with TWILIO_API_BASE_URL pointing at it:
+
+    python fake_twilio.py --port 8099 --latency-ms 150 --error-rate 0.05
+    TWILIO_API_BASE_URL=http://127.0.0.1:8099 python -m src.main
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+class FakeTwilioHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    latency = 0.0
+    error_rate = 0.0
+    throttle_rate = 0.0
+    counts = {'accepted': 0, 'errors': 0, 'throttled': 0}
+    lock = threading.Lock()
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        form = {key: values[0] for key, values in parse_qs(self.rfile.read(length).decode('utf-8')).items()}
+        if not self.path.endswith('/Messages.json'):
+            self._reply(404, {'code': 20404, 'message': 'Not found', 'status': 404})
+            return
+
+        time.sleep(self.latency)
+        roll = random.random()
+        if roll < self.throttle_rate:
+            with self.lock:
+                self.counts['throttled'] += 1
+            self._reply(429, {'code': 20429, 'message': 'Too Many Requests', 'status': 429})
+            return
+        if roll < self.throttle_rate + self.error_rate:
+            with self.lock:
+                self.counts['errors'] += 1
+            self._reply(500, {'code': 20500, 'message': 'Internal Server Error', 'status': 500})
+            return
+
+        with self.lock:
+            self.counts['accepted'] += 1
+        self._reply(201, {
+            'sid': f"SM{uuid.uuid4().hex}",
+            'status': 'queued',
+            'to': form.get('To'),
+            'from': form.get('From'),
+            'body': form.get('Body'),
+            'num_segments': '1',
+        })
+
+    def do_GET(self):
+        with self.lock:
+            self._reply(200, dict(self.counts))
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fake Twilio Messages API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--latency-ms', type=float, default=100.0)
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered with HTTP 500')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='fraction of requests answered with HTTP 429')
+    args = parser.parse_args()
+
+    FakeTwilioHandler.latency = args.latency_ms / 1000.0
+    FakeTwilioHandler.error_rate = args.error_rate
+    FakeTwilioHandler.throttle_rate = args.throttle_rate
+    server = ThreadingHTTPServer((args.host, args.port), FakeTwilioHandler)
+    print(f"Fake Twilio listening on http://{args.host}:{args.port} (GET / for counters)")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -8,11 +8,13 @@ from fastapi import FastAPI
 from .ice_extent import router as ice_extent_router
 from .route_prediction import router as route_prediction_router
 from .chat import router as chat_router
+from .sms import router as sms_router
 
 __all__ = [
     "ice_extent_router",
     "route_prediction_router",
     "chat_router",
+    "sms_router",
     "register_routes",
 ]
 
@@ -22,3 +24,4 @@ def register_routes(app: FastAPI, prefix: str = "/api") -> None:
     app.include_router(ice_extent_router, prefix=prefix)
     app.include_router(chat_router, prefix=prefix)
     app.include_router(route_prediction_router, prefix=prefix)
+    app.include_router(sms_router, prefix=prefix)
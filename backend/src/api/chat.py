@@ -1,22 +1,58 @@
-from fastapi import APIRouter, HTTPException
+import json
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 
 from ..core.models import ChatRequest, ChatResponse
-from ..core.services import generate_chat_reply
+from ..core.services import answer_data_question, chat_version, generate_chat_reply, stream_chat_reply
 
 router = APIRouter(tags=["chat"])
 
 
+def _validated_message(request: ChatRequest) -> str:
+    message = request.message.strip()
+    if not message:
+        raise HTTPException(status_code=400, detail="Message cannot be empty.")
+    return message
+
+
 @router.post("/chat", response_model=ChatResponse)
 def chat(request: ChatRequest) -> ChatResponse:
     """
     Chat endpoint that uses LangChain + Gemini to answer questions, injecting dataset context.
     """
-    message = request.message.strip()
-    if not message:
-        raise HTTPException(status_code=400, detail="Message cannot be empty.")
+    message = _validated_message(request)
 
     result = generate_chat_reply(message)
     return ChatResponse(
         reply=result["reply"],
         note=result["note"]
     )
+
+
+@router.post("/chat/stream")
+async def chat_stream(request: Request, body: ChatRequest) -> StreamingResponse:
+    """
+    Stream the assistant reply as Server-Sent Events (`token`, then `done` or
+    `error`).  Generation stops as soon as the client disconnects.
+    """
+    message = _validated_message(body)
+    answer = await run_in_threadpool(answer_data_question, message)
+    version = await run_in_threadpool(chat_version) if answer is None else None
+
+    async def events():
+        stream = stream_chat_reply(message, version, answer)
+        try:
+            async for event, data in stream:
+                if await request.is_disconnected():
+                    break
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        finally:
+            await stream.aclose()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
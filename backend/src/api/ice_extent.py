@@ -1,19 +1,36 @@
 from __future__ import annotations
 
 import re
+from typing import Optional, Tuple
+
 from fastapi import APIRouter, HTTPException, Query
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 
 from ..core.converter import convert_tif_to_geojson, GeoDataConversionError
+from .profiling import ProfiledRoute
 from ..core.services import (
     find_dataset_path,
     scan_available_dates,
     get_datasets_for_year,
     cached_prediction,
     PredictionError,
+    get_ice_index,
+    INDEX_SOURCES,
+    ice_change,
+    DIFF_SOURCES,
+    encode_frames,
+    frame_dates,
+    ClimatologyUnavailable,
+    anomaly,
+    climatology_summary,
+    observed_key,
+    predicted_key,
+    prefetch_observed_neighbours,
+    prefetch_predicted_neighbours,
+    record_request,
 )
 
-router = APIRouter(tags=["ice_extent"])
+router = APIRouter(tags=["ice_extent"], route_class=ProfiledRoute)
 DATE_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}$")
 
 
@@ -24,7 +41,9 @@ def ice_extent(
 ):
     try:
         tif_path = find_dataset_path(date)
-        feature_collection = convert_tif_to_geojson(str(tif_path), radius_km=radius_km)
+        record_request(observed_key(str(tif_path), radius_km))
+        feature_collection = convert_tif_to_geojson(str(tif_path), radius_km)
+        prefetch_observed_neighbours(date, radius_km)
 
         payload = {
             "date": date,
@@ -101,8 +120,10 @@ def predict_ice_extent(
         year = int(date[:4])
         month = int(date[5:7])
         
+        record_request(predicted_key(year, month, thresh, radius_km))
         feature_collection = cached_prediction(year, month, thresh, radius_km)
-        
+        prefetch_predicted_neighbours(year, month, thresh, radius_km)
+
     except PredictionError as exc:
         raise HTTPException(status_code=500, detail=str(exc)) from exc
     except ValueError as exc:
@@ -117,3 +138,199 @@ def predict_ice_extent(
         "feature_collection": feature_collection,
     }
     return JSONResponse(payload)
+
+
+@router.get("/ice_extent/diff")
+def ice_extent_diff(
+    from_date: str = Query(..., alias="from", description="Earlier date (YYYY-MM-DD)"),
+    to_date: str = Query(..., alias="to", description="Later date (YYYY-MM-DD)"),
+    from_source: str = Query("observed", description="observed or predicted"),
+    to_source: str = Query("observed", description="observed or predicted"),
+    radius_km: float = Query(500, ge=0, description="Radial distance filter (kilometres)"),
+    thresh: float = Query(0.5, ge=0.0, le=1.0, description="Threshold for ice probability (predicted only)"),
+    geometry: bool = Query(True, description="Include polygons of the gained and lost pixels"),
+):
+    """
+    Ice gained, lost and persistent between two dates, computed on bit-packed
+    masks.  Either side can be an observation or a monthly prediction.
+    """
+    for source in (from_source, to_source):
+        if source not in DIFF_SOURCES:
+            raise HTTPException(status_code=400, detail=f"source must be one of {', '.join(DIFF_SOURCES)}.")
+    try:
+        change = ice_change(from_date, to_date, from_source, to_source, radius_km, thresh, geometry)
+    except FileNotFoundError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    except (GeoDataConversionError, PredictionError) as exc:
+        raise HTTPException(status_code=500, detail=str(exc)) from exc
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=f"Unexpected diff error: {exc}") from exc
+
+    return JSONResponse({
+        "from": {"date": from_date, "source": from_source},
+        "to": {"date": to_date, "source": to_source},
+        "radius_km": radius_km,
+        "threshold": thresh,
+        **change,
+    })
+
+
+@router.get("/ice_extent/frames")
+def ice_extent_frames(
+    start: str = Query(..., description="First date (YYYY-MM-DD)"),
+    end: str = Query(..., description="Last date (YYYY-MM-DD)"),
+    radius_km: float = Query(500, ge=0, description="Radial distance filter (kilometres)"),
+):
+    """
+    Stream a keyframe of the first available date in [start, end] followed by
+    per-date added/removed pixel deltas (binary, see `services/frames.py`).
+    """
+    try:
+        dates = frame_dates(start, end)
+        if not dates:
+            raise FileNotFoundError(f"No GeoTIFFs found between {start} and {end}")
+        frames = encode_frames(dates, radius_km)
+        first = next(frames)
+    except FileNotFoundError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    except GeoDataConversionError as exc:
+        raise HTTPException(status_code=500, detail=str(exc)) from exc
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=f"Unexpected frame encoding error: {exc}") from exc
+
+    def body():
+        yield first
+        yield from frames
+
+    return StreamingResponse(
+        body(),
+        media_type="application/octet-stream",
+        headers={"x-frame-count": str(len(dates)), "x-frame-dates": f"{dates[0]}/{dates[-1]}"},
+    )
+
+
+@router.get("/ice_extent/climatology")
+def ice_extent_climatology(
+    month: Optional[int] = Query(None, ge=1, le=12, description="Calendar month (all months if omitted)"),
+    geometry: bool = Query(False, description="Per-pixel frequency and trend points (requires month)"),
+):
+    """
+    Long-term per-pixel ice frequency and its trend per calendar month, served
+    from the precomputed climatology.
+    """
+    if geometry and month is None:
+        raise HTTPException(status_code=400, detail="geometry requires a month.")
+    try:
+        return JSONResponse(climatology_summary(month, geometry))
+    except FileNotFoundError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    except ClimatologyUnavailable as exc:
+        raise HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": "60"}) from exc
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=f"Unexpected climatology error: {exc}") from exc
+
+
+@router.get("/ice_extent/anomaly")
+def ice_extent_anomaly(
+    date: str = Query(..., description="Observation date (YYYY-MM-DD)"),
+    geometry: bool = Query(False, description="Points where the anomaly is at least 0.5"),
+):
+    """Observed ice on a date against the climatology of its calendar month."""
+    try:
+        return JSONResponse(anomaly(date, geometry))
+    except FileNotFoundError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    except ClimatologyUnavailable as exc:
+        raise HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": "60"}) from exc
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    except GeoDataConversionError as exc:
+        raise HTTPException(status_code=500, detail=str(exc)) from exc
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=f"Unexpected anomaly error: {exc}") from exc
+
+
+def _parse_bbox(value: str) -> Tuple[float, float, float, float]:
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(part) for part in value.split(","))
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=400, detail="bbox must be provided as min_lon,min_lat,max_lon,max_lat."
+        ) from exc
+    if not (-180 <= min_lon <= 180 and -180 <= max_lon <= 180):
+        raise HTTPException(status_code=400, detail="bbox longitudes must be within [-180, 180].")
+    if not (-90 <= min_lat <= max_lat <= 90):
+        raise HTTPException(status_code=400, detail="bbox latitudes must satisfy -90 <= min_lat <= max_lat <= 90.")
+    return min_lon, min_lat, max_lon, max_lat
+
+
+def _load_index(date: str, source: str, radius_km: float, thresh: float):
+    if source not in INDEX_SOURCES:
+        raise HTTPException(status_code=400, detail=f"source must be one of {', '.join(INDEX_SOURCES)}.")
+    try:
+        return get_ice_index(date, source=source, radius_km=radius_km, thresh=thresh)
+    except FileNotFoundError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    except (GeoDataConversionError, PredictionError) as exc:
+        raise HTTPException(status_code=500, detail=str(exc)) from exc
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=f"Unexpected indexing error: {exc}") from exc
+
+
+@router.get("/ice_extent/query")
+def ice_extent_query(
+    date: str = Query(..., description="Date to query (YYYY-MM-DD)"),
+    bbox: str = Query(..., description="Bounding box as min_lon,min_lat,max_lon,max_lat"),
+    source: str = Query("observed", description="observed or predicted"),
+    radius_km: float = Query(500, ge=0, description="Radial distance filter (kilometres)"),
+    thresh: float = Query(0.5, ge=0.0, le=1.0, description="Threshold for ice probability (predicted only)"),
+):
+    """
+    Return the ice pixels whose centers fall inside a lon/lat bounding box.
+    A box with min_lon > max_lon is treated as crossing the antimeridian.
+    """
+    box = _parse_bbox(bbox)
+    index = _load_index(date, source, radius_km, thresh)
+    hits = index.query_bbox(*box)
+    return JSONResponse({
+        "date": date,
+        "source": source,
+        "bbox": list(box),
+        "radius_km": radius_km,
+        "count": int(hits.size),
+        "feature_collection": index.features(hits),
+    })
+
+
+@router.get("/ice_extent/at")
+def ice_extent_at(
+    date: str = Query(..., description="Date to query (YYYY-MM-DD)"),
+    lon: float = Query(..., ge=-180, le=180, description="Longitude in degrees"),
+    lat: float = Query(..., ge=-90, le=90, description="Latitude in degrees"),
+    source: str = Query("observed", description="observed or predicted"),
+    radius_km: float = Query(500, ge=0, description="Radial distance filter (kilometres)"),
+    thresh: float = Query(0.5, ge=0.0, le=1.0, description="Threshold for ice probability (predicted only)"),
+):
+    """Report whether the raster cell containing lon/lat is ice on the given date."""
+    index = _load_index(date, source, radius_km, thresh)
+    cell = index.locate(lon, lat)
+    payload = {
+        "date": date,
+        "source": source,
+        "lon": lon,
+        "lat": lat,
+        "radius_km": radius_km,
+        "in_grid": cell is not None,
+        "ice": bool(index.mask[cell]) if cell is not None else False,
+        "row": cell[0] if cell is not None else None,
+        "col": cell[1] if cell is not None else None,
+    }
+    if source == "predicted" and cell is not None:
+        payload["pred_prob"] = index.value_at(*cell)
+    return payload
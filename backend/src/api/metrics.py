@@ -0,0 +1,91 @@
+import time
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from starlette.routing import compile_path
+
+from ..core.converter import convert_tif_to_geojson, load_ice_mask, load_raster
+from ..core.metrics import gauge, histogram, lru_cache_collector, register_collector, render_metrics
+from ..core.services.change import observed_packed_mask, predicted_packed_mask
+from ..core.services.prediction import cached_prediction, predict_ice_grid
+from ..core.services.prefetch import request_scope, set_load_probe
+
+router = APIRouter(tags=["metrics"])
+
+REQUESTS_IN_FLIGHT = gauge("http_requests_in_flight", "Requests currently being handled.", ("handler",))
+REQUEST_SECONDS = histogram(
+    "http_request_duration_seconds", "Time to produce the response.", ("handler", "method", "status")
+)
+
+# Handlers held open for a long time; they do not compete with prefetching.
+STREAMING_HANDLERS = ("/ice_extent/frames", "/chat/stream")
+
+
+def _map_request(labels) -> bool:
+    handler = labels[0]
+    return "/ice_extent" in handler and not handler.endswith(STREAMING_HANDLERS)
+
+
+# Prefetching backs off while map requests are being served.
+set_load_probe(lambda: int(REQUESTS_IN_FLIGHT.total(_map_request)))
+
+register_collector(lru_cache_collector({
+    "convert_tif_to_geojson": convert_tif_to_geojson,
+    "load_ice_mask": load_ice_mask,
+    "load_raster": load_raster,
+    "cached_prediction": cached_prediction,
+    "predict_ice_grid": predict_ice_grid,
+    "observed_packed_mask": observed_packed_mask,
+    "predicted_packed_mask": predicted_packed_mask,
+}))
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics() -> PlainTextResponse:
+    """Prometheus text exposition of the hot-path metrics."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware tracking in-flight requests and response times per route
+    template (e.g. `/api/sms/broadcast/{job_id}`), so path parameters do not
+    explode label cardinality.  Templates come from the app's OpenAPI paths,
+    compiled once on the first request; other paths share one `unmatched` label.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+        self._templates = None
+
+    def _handler(self, scope) -> str:
+        if self._templates is None:
+            paths = scope["app"].openapi().get("paths", {})
+            self._templates = [(compile_path(path)[0], path) for path in paths]
+        path = scope["path"]
+        for regex, template in self._templates:
+            if regex.match(path):
+                return template
+        return "unmatched"
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        handler = self._handler(scope)
+        status = {"code": 500}
+
+        async def send_wrapper(message) -> None:
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc(handler)
+        started = time.perf_counter()
+        try:
+            with request_scope():
+                await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUESTS_IN_FLIGHT.dec(handler)
+            REQUEST_SECONDS.observe(time.perf_counter() - started, handler, scope["method"], str(status["code"]))
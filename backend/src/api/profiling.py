@@ -0,0 +1,90 @@
+import time
+from typing import Sequence
+
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import FileResponse, PlainTextResponse
+from fastapi.routing import APIRoute
+
+from ..core.metrics import REQUEST_STAGES
+from ..core.profiling import (
+    CAPTURE_HEADER,
+    PROFILE_REQUEST,
+    TOKEN_HEADER,
+    is_authorized,
+    profile_path,
+    profile_summary,
+    profiled,
+    server_timing,
+)
+
+router = APIRouter(tags=["profiling"])
+
+
+class ProfiledRoute(APIRoute):
+    """Route class whose endpoints can be captured with cProfile on request."""
+
+    def __init__(self, path: str, endpoint, **kwargs) -> None:
+        super().__init__(path, profiled(endpoint), **kwargs)
+
+
+class ProfilingMiddleware:
+    """
+    Adds `Server-Timing` (and `X-Profile-Id` after a cProfile capture) to
+    responses for paths under `prefixes`, for requests authorised by
+    `is_authorized`.  Other requests pass straight through.
+    """
+
+    def __init__(self, app, prefixes: Sequence[str]) -> None:
+        self.app = app
+        self.prefixes = tuple(prefixes)
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or not scope["path"].startswith(self.prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        headers = {key.decode("latin-1"): value.decode("latin-1") for key, value in scope["headers"]}
+        if not is_authorized(headers.get(TOKEN_HEADER)):
+            await self.app(scope, receive, send)
+            return
+
+        stages = {}
+        capture = {} if headers.get(CAPTURE_HEADER, "").lower() in ("1", "true", "cprofile") else None
+        stages_token = REQUEST_STAGES.set(stages)
+        capture_token = PROFILE_REQUEST.set(capture)
+        started = time.perf_counter()
+
+        async def send_wrapper(message) -> None:
+            if message["type"] == "http.response.start":
+                extra = [(b"server-timing", server_timing(stages, time.perf_counter() - started).encode("latin-1"))]
+                if capture and capture.get("profile_id"):
+                    extra.append((b"x-profile-id", capture["profile_id"].encode("latin-1")))
+                message = {**message, "headers": [*message.get("headers", []), *extra]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUEST_STAGES.reset(stages_token)
+            PROFILE_REQUEST.reset(capture_token)
+
+
+@router.get("/debug/profiles/{profile_id}")
+def download_profile(
+    profile_id: str,
+    format: str = Query("prof", pattern="^(prof|text)$", description="prof (pstats file) or text"),
+    sort: str = Query("cumulative", pattern="^(cumulative|tottime|ncalls)$", description="Sort key for text output"),
+    x_profile_token: str | None = Header(None),
+):
+    """Download a saved request profile (`python -m pstats <file>` or snakeviz can open it)."""
+    if not is_authorized(x_profile_token):
+        raise HTTPException(status_code=403, detail="Profiling is not enabled for this request.")
+    try:
+        if format == "text":
+            return PlainTextResponse(profile_summary(profile_id, sort))
+        path = profile_path(profile_id)
+    except FileNotFoundError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return FileResponse(path, media_type="application/octet-stream", filename=path.name)
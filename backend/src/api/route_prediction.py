@@ -1,24 +1,93 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
 
-from ..core.models import RouteRequest
+from ..core.converter import GeoDataConversionError
+from ..core.models import BatchRouteRequest, RouteRequest
+from ..core.routing import RoutingError
+from ..core.services import (
+    plan_route,
+    plan_routes,
+    plan_voyage,
+    PredictionError,
+    ROUTE_SOURCES,
+    ROUTE_MODES,
+    ROUTE_BATCH_MAX_PAIRS,
+)
 
 router = APIRouter(tags=["route_prediction"])
 
 
 @router.post("/route_prediction")
 def route_prediction(request_body: RouteRequest):
-    return {
-        "type": "FeatureCollection",
-        "features": [
-            {
-                "type": "Feature",
-                "geometry": {
-                    "type": "LineString",
-                    "coordinates": [request_body.start, request_body.end],
-                },
-                "properties": {
-                    "source": "stubbed",
-                },
-            }
-        ],
-    }
+    """
+    Least-cost route between two coordinates over the observed or predicted
+    ice field of a date, avoiding land and penalising ice-covered cells.
+
+    With `mode=time_dependent` the date is the departure and the route is
+    planned over consecutive monthly predictions, costing each leg with the
+    ice of the month it is sailed in.
+    """
+    if request_body.source not in ROUTE_SOURCES:
+        raise HTTPException(status_code=400, detail=f"source must be one of {', '.join(ROUTE_SOURCES)}.")
+    if request_body.mode not in ROUTE_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of {', '.join(ROUTE_MODES)}.")
+
+    try:
+        if request_body.mode == "time_dependent":
+            return plan_voyage(
+                request_body.start,
+                request_body.end,
+                departure=request_body.date,
+                speed_kmh=request_body.speed_kmh,
+                thresh=request_body.thresh,
+            )
+        return plan_route(
+            request_body.start,
+            request_body.end,
+            date_str=request_body.date,
+            source=request_body.source,
+            thresh=request_body.thresh,
+        )
+    except FileNotFoundError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    except RoutingError as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
+    except (GeoDataConversionError, PredictionError) as exc:
+        raise HTTPException(status_code=500, detail=str(exc)) from exc
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=f"Unexpected routing error: {exc}") from exc
+
+
+@router.post("/route_prediction/batch")
+def route_prediction_batch(request_body: BatchRouteRequest):
+    """
+    Route many origin/destination pairs for one date over a shared grid,
+    reusing one Dijkstra search per distinct origin.
+    """
+    if request_body.source not in ROUTE_SOURCES:
+        raise HTTPException(status_code=400, detail=f"source must be one of {', '.join(ROUTE_SOURCES)}.")
+    if not request_body.pairs:
+        raise HTTPException(status_code=400, detail="At least one origin/destination pair is required.")
+    if len(request_body.pairs) > ROUTE_BATCH_MAX_PAIRS:
+        raise HTTPException(
+            status_code=400, detail=f"A batch may contain at most {ROUTE_BATCH_MAX_PAIRS} pairs."
+        )
+
+    try:
+        return plan_routes(
+            [(pair.start, pair.end) for pair in request_body.pairs],
+            date_str=request_body.date,
+            source=request_body.source,
+            thresh=request_body.thresh,
+        )
+    except FileNotFoundError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    except RoutingError as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
+    except (GeoDataConversionError, PredictionError) as exc:
+        raise HTTPException(status_code=500, detail=str(exc)) from exc
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=f"Unexpected routing error: {exc}") from exc
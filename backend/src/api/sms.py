@@ -0,0 +1,166 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from ..core.models import (
+    SMSAlertCheckRequest,
+    SMSAlertRuleRequest,
+    SMSArcticScheduleRequest,
+    SMSBroadcastRequest,
+    SMSScheduleRequest,
+    SMSSendRequest,
+    SMSSubscribeRequest,
+    SMSUnsubscribeRequest,
+)
+from ..core.sms import get_sms_service
+
+router = APIRouter(tags=["sms"])
+
+
+@router.get("/sms/health")
+def sms_health():
+    service = get_sms_service()
+    return {
+        "status": "healthy",
+        "service": "NASA SMS Service",
+        "pending_scheduled": len(service.scheduler),
+    }
+
+
+@router.post("/sms/send")
+def send_sms(body: SMSSendRequest):
+    """Send an SMS to one phone number."""
+    result = get_sms_service().send_sms(body.phone, body.message, body.language)
+    if not result["success"]:
+        return JSONResponse(status_code=500, content=jsonable_encoder(result))
+    return result
+
+
+@router.post("/sms/subscribe")
+def subscribe(body: SMSSubscribeRequest):
+    return get_sms_service().add_subscriber(body.phone, body.language)
+
+
+@router.post("/sms/unsubscribe")
+def unsubscribe(body: SMSUnsubscribeRequest):
+    result = get_sms_service().remove_subscriber(body.phone)
+    if not result["success"]:
+        raise HTTPException(status_code=404, detail=result["message"])
+    return result
+
+
+@router.get("/sms/subscribers")
+def subscribers():
+    active = get_sms_service().store.active_subscribers()
+    return {"subscribers": active, "total_count": len(active)}
+
+
+@router.post("/sms/broadcast", status_code=202)
+def broadcast(body: SMSBroadcastRequest):
+    """Queue the Arctic update for every active subscriber; poll `/sms/broadcast/{job_id}` for progress."""
+    result = get_sms_service().send_arctic_update(body.type, body.language)
+    if result["job"] is None:
+        return JSONResponse(status_code=200, content=jsonable_encoder(result))
+    return result
+
+
+@router.get("/sms/broadcast/{job_id}")
+def broadcast_progress(job_id: str):
+    job = get_sms_service().broadcasts.progress(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Broadcast job not found")
+    return job
+
+
+@router.get("/sms/broadcasts")
+def broadcasts():
+    return {"jobs": get_sms_service().broadcasts.jobs()}
+
+
+@router.post("/sms/test")
+def test_sms():
+    """Send a test message to the placeholder test number (edit before use)."""
+    test_phone = "+1XXXXXXXXXX"
+    test_message = "VIVE LE QUEBEC LIBRE! 🇫🇷 This is a test message from NASA Arctic SMS service."
+    return get_sms_service().send_sms(test_phone, test_message, "fr")
+
+
+@router.post("/sms/schedule")
+def schedule(body: SMSScheduleRequest):
+    result = get_sms_service().schedule_message(
+        body.phone, body.message, body.scheduled_time, body.language, body.type
+    )
+    if not result["success"]:
+        raise HTTPException(status_code=400, detail=result["error"])
+    return result
+
+
+@router.get("/sms/scheduled")
+def scheduled(phone: str | None = None):
+    return get_sms_service().get_scheduled_messages(phone)
+
+
+@router.delete("/sms/scheduled/{message_id}")
+def cancel_scheduled(message_id: str):
+    result = get_sms_service().cancel_scheduled_message(message_id)
+    if not result["success"]:
+        raise HTTPException(status_code=404, detail=result["message"])
+    return result
+
+
+@router.post("/sms/schedule/arctic")
+def schedule_arctic(body: SMSArcticScheduleRequest):
+    """Schedule the Arctic data report for every active subscriber."""
+    result = get_sms_service().schedule_arctic_update(body.scheduled_time, body.type, body.language)
+    if not result["success"]:
+        raise HTTPException(status_code=400, detail=result.get("error") or result.get("message"))
+    return result
+
+
+@router.post("/sms/alerts", status_code=201)
+def create_alert(body: SMSAlertRuleRequest):
+    """Create a data-driven alert rule for a subscriber."""
+    service = get_sms_service()
+    if service.store.get_subscriber(body.phone) is None:
+        raise HTTPException(status_code=404, detail="Phone number is not subscribed")
+    try:
+        rule = service.alerts.add_rule(
+            body.phone,
+            body.kind,
+            body.source,
+            threshold_km2=body.threshold_km2,
+            lon=body.lon,
+            lat=body.lat,
+            radius_km=body.radius_km,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return {"success": True, "rule": rule}
+
+
+@router.get("/sms/alerts")
+def list_alerts(phone: str | None = None):
+    rules = get_sms_service().store.rules(phone)
+    return {"rules": rules, "count": len(rules)}
+
+
+@router.delete("/sms/alerts/{rule_id}")
+def delete_alert(rule_id: int):
+    if not get_sms_service().store.remove_rule(rule_id):
+        raise HTTPException(status_code=404, detail="Alert rule not found")
+    return {"success": True, "message": "Alert rule deleted"}
+
+
+@router.post("/sms/alerts/check")
+def check_alerts(body: SMSAlertCheckRequest | None = None):
+    """Evaluate alert rules now, optionally against a specific observed date."""
+    body = body or SMSAlertCheckRequest()
+    alerts = get_sms_service().alerts
+    try:
+        if body.date:
+            return alerts.evaluate_observed(body.date)
+        return alerts.check(force=body.force)
+    except FileNotFoundError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
@@ -1,21 +1,31 @@
 """
 Utilities for converting sea-ice GeoTIFF rasters into GeoJSON point clouds.
 
-The heavy lifting is done with rasterio, NumPy, and GeoPandas.  Converted
-feature collections can be cached in-memory so repeated requests for the same
-file are fast.
+The heavy lifting is done with rasterio, NumPy, and GeoPandas (imported on
+first conversion, as it is slow to import).  Converted feature collections can
+be cached in-memory so repeated requests for the same file are fast.
 """
 from __future__ import annotations
 
 from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Iterable, Tuple
+from typing import TYPE_CHECKING, Dict, Iterable, Tuple
 
-import geopandas as gpd
 import numpy as np
 import rasterio
 from rasterio.transform import xy as transform_xy
-from shapely.geometry import Point
+
+from .datacube import cube_band
+from .metrics import stage
+
+if TYPE_CHECKING:
+    from shapely.geometry import Point
+
+
+# NSIDC sea-ice extent class codes: 1 = sea ice, 251 = pole hole (assumed ice),
+# 253 = coast, 254 = land, 255 = missing.
+ICE_CODES = (1, 251)
+BLOCKED_CODES = (253, 254, 255)
 
 
 class GeoDataConversionError(RuntimeError):
@@ -49,13 +59,26 @@ def _pixel_coordinates(
     return xs, ys
 
 
-def _filter_points(
+def _mask_points(mask: np.ndarray, transform: rasterio.Affine) -> Iterable[Point]:
+    """
+    Yield a point at the projected center of every pixel set in `mask`.
+    """
+    from shapely.geometry import Point
+
+    rows, cols = np.where(mask)
+    if rows.size == 0:
+        return
+    xs_filtered, ys_filtered = transform_xy(transform, rows, cols)
+    for x, y in zip(xs_filtered, ys_filtered):
+        yield Point(x, y)
+
+
+def _radius_mask(
     data: np.ndarray,
     xs: np.ndarray,
     ys: np.ndarray,
     radius_km: float,
-    transform: rasterio.Affine,
-) -> Iterable[Point]:
+) -> np.ndarray:
     """
     Mask the raster to keep only pixels whose value indicates ice presence
     and whose distance from the origin exceeds the desired radius.
@@ -64,34 +87,73 @@ def _filter_points(
         raise GeoDataConversionError("Raster dimensions mismatch while generating coordinates.")
 
     dist_km = np.sqrt(xs**2 + ys**2) / 1000
-    mask = (data == 1) & (dist_km > radius_km)
-    rows, cols = np.where(mask)
-    xs_filtered, ys_filtered = transform_xy(transform, rows, cols)
-    for x, y in zip(xs_filtered, ys_filtered):
-        yield Point(x, y)
+    return (data == 1) & (dist_km > radius_km)
 
 
 def _to_feature_collection(points: Iterable[Point], crs) -> Dict:
-    gdf = gpd.GeoDataFrame(geometry=list(points), crs=crs)
+    import geopandas as gpd
+
+    with stage("convert", "geodataframe"):
+        gdf = gpd.GeoDataFrame(geometry=list(points), crs=crs)
     if gdf.empty:
         return {"type": "FeatureCollection", "features": []}
 
-    gdf = gdf.to_crs(epsg=4326)
-    return gdf.__geo_interface__
+    with stage("convert", "to_crs"):
+        gdf = gdf.to_crs(epsg=4326)
+    with stage("convert", "serialize"):
+        return gdf.__geo_interface__
 
 
 @lru_cache(maxsize=128)
-def convert_tif_to_geojson(path: str, radius_km: float = 500) -> Dict:
+def load_raster(path: str) -> Tuple[np.ndarray, rasterio.Affine, rasterio.crs.CRS]:
     """
-    Convert a GeoTIFF file into a GeoJSON FeatureCollection (as a dict).
+    Read band 1 of a GeoTIFF along with its transform and CRS, from the
+    datacube when it holds an up-to-date copy of the file.
 
-    Results are cached in-memory keyed by the file path and radius.
+    Results are cached in-memory keyed by the file path; the returned array is
+    read-only because it is shared between callers.
     """
     tif_path = Path(path)
     if not tif_path.exists():
         raise FileNotFoundError(f"GeoTIFF not found at {tif_path}")
 
-    data, transform, crs = _load_raster(tif_path)
-    xs, ys = _pixel_coordinates(transform, data.shape[1], data.shape[0])
-    points = list(_filter_points(data, xs, ys, radius_km, transform))
+    with stage("convert", "cube_read"):
+        from_cube = cube_band(path)
+    if from_cube is not None:
+        data, transform, crs = from_cube
+    else:
+        with stage("convert", "raster_read"):
+            data, transform, crs = _load_raster(tif_path)
+    data.flags.writeable = False
+    return data, transform, crs
+
+
+@lru_cache(maxsize=128)
+def load_ice_mask(
+    path: str, radius_km: float = 500
+) -> Tuple[np.ndarray, rasterio.Affine, rasterio.crs.CRS]:
+    """
+    Return the boolean ice mask used by `convert_tif_to_geojson` together with
+    the raster transform and CRS, so other consumers can share the same read.
+
+    Results are cached in-memory keyed by the file path and radius.
+    """
+    data, transform, crs = load_raster(path)
+    with stage("convert", "mask"):
+        xs, ys = _pixel_coordinates(transform, data.shape[1], data.shape[0])
+        mask = _radius_mask(data, xs, ys, radius_km)
+    mask.flags.writeable = False
+    return mask, transform, crs
+
+
+@lru_cache(maxsize=128)
+def convert_tif_to_geojson(path: str, radius_km: float = 500) -> Dict:
+    """
+    Convert a GeoTIFF file into a GeoJSON FeatureCollection (as a dict).
+
+    Results are cached in-memory keyed by the file path and radius.
+    """
+    mask, transform, crs = load_ice_mask(path, radius_km)
+    with stage("convert", "points"):
+        points = list(_mask_points(mask, transform))
     return _to_feature_collection(points, crs)
@@ -0,0 +1,286 @@
+"""
+Consolidated, memory-mapped datacube of the GeoTIFF archive.
+
+The cube stores every snapshot as bit-packed planes (`np.packbits`) for the
+per-date classes - sea ice (1), pole hole (251) and missing (255) - while the
+classes that never change (coast 253, land 254) are stored once in a shared
+static layer together with the grid metadata.  Planes are chunked by year,
+one `.npy` file of shape (dates, planes, packed pixels) per year, opened with
+`mmap_mode="r"`, so reading a run of dates is a sequential read of one file
+instead of one GeoTIFF open and decode per date.
+
+Each snapshot records its source file's name, size and mtime; a snapshot is
+only served while its source is unchanged and the ingest could reproduce the
+raster exactly, otherwise readers fall back to the GeoTIFF.
+
+Build or refresh it (only years whose rasters changed are rewritten) with:
+
+    cd backend
+    python -m src.core.datacube
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import rasterio
+
+logger = logging.getLogger(__name__)
+
+DATACUBE_DIR = Path(
+    os.environ.get(
+        "ICE_DATACUBE_DIR",
+        Path(os.environ.get("ICE_DATASET_DIR", Path(__file__).resolve().parent.parent.parent / "datasets"))
+        / "datacube",
+    )
+).resolve()
+
+CUBE_VERSION = 1
+# Codes stored as per-date bit planes, in plane order; everything else must be
+# one of STATIC_CODES (fixed per grid) or 0 (open ocean).
+PLANE_CODES = (1, 251, 255)
+STATIC_CODES = (253, 254)
+ICE_PLANE, POLE_PLANE, MISSING_PLANE = range(len(PLANE_CODES))
+
+TOKEN_PATTERN = re.compile(r"(\d{8})")
+
+
+def _iso_from_name(name: str) -> Optional[str]:
+    m = TOKEN_PATTERN.search(Path(name).stem)
+    if not m:
+        return None
+    token = m.group(1)
+    return f"{token[:4]}-{token[4:6]}-{token[6:8]}"
+
+
+def _source_info(path: Path) -> Dict:
+    stat = path.stat()
+    return {"name": path.name, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+class DataCube:
+    """Read-only view of a built datacube directory."""
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = Path(directory)
+        meta = json.loads((self.directory / "cube.json").read_text())
+        if meta.get("version") != CUBE_VERSION:
+            raise ValueError(f"Unsupported datacube version {meta.get('version')}")
+        self.height = int(meta["height"])
+        self.width = int(meta["width"])
+        self.transform = rasterio.Affine(*meta["transform"])
+        self.crs = rasterio.crs.CRS.from_string(meta["crs"])
+        self.nodata = meta.get("nodata")
+        self.static = np.load(self.directory / meta["static"], mmap_mode="r")
+        self._chunks = meta["chunks"]
+        self._planes: Dict[str, np.ndarray] = {}
+        # date -> (chunk key, row, source info); only exactly reproducible snapshots
+        self._index: Dict[str, Tuple[str, int, Dict]] = {}
+        for key, chunk in self._chunks.items():
+            for row, (iso, source, exact) in enumerate(zip(chunk["dates"], chunk["sources"], chunk["exact"])):
+                if exact:
+                    self._index[iso] = (key, row, source)
+
+    @property
+    def dates(self) -> List[str]:
+        return sorted(self._index)
+
+    def _chunk(self, key: str) -> np.ndarray:
+        planes = self._planes.get(key)
+        if planes is None:
+            planes = self._planes[key] = np.load(self.directory / self._chunks[key]["file"], mmap_mode="r")
+        return planes
+
+    def _unpack(self, packed: np.ndarray) -> np.ndarray:
+        return np.unpackbits(packed, count=self.height * self.width).reshape(self.height, self.width).view(bool)
+
+    def has(self, iso: str, path: Optional[Path] = None) -> bool:
+        """Whether `iso` is in the cube and, if given, still matches the file at `path`."""
+        entry = self._index.get(iso)
+        if entry is None:
+            return False
+        if path is None:
+            return True
+        try:
+            return _source_info(Path(path)) == entry[2]
+        except OSError:
+            return False
+
+    def packed_planes(self, iso: str) -> np.ndarray:
+        """(planes, packed pixels) uint8 view for one date (memory mapped)."""
+        key, row, _ = self._index[iso]
+        return self._chunk(key)[row]
+
+    def plane(self, iso: str, plane: int) -> np.ndarray:
+        """Boolean (H, W) mask of one plane (ICE_PLANE, POLE_PLANE or MISSING_PLANE)."""
+        return self._unpack(self.packed_planes(iso)[plane])
+
+    def band(self, iso: str) -> np.ndarray:
+        """Rebuild the original uint8 raster for `iso`."""
+        packed = self.packed_planes(iso)
+        band = np.array(self.static, dtype=np.uint8)
+        for plane, code in enumerate(PLANE_CODES):
+            band[self._unpack(packed[plane])] = code
+        return band
+
+    def iter_planes(self, dates: Iterable[str], plane: int) -> Iterable[Tuple[str, np.ndarray]]:
+        """Yield (date, packed plane) in order; consecutive dates read sequentially from one chunk."""
+        for iso in dates:
+            yield iso, self.packed_planes(iso)[plane]
+
+    def ice_pixel_counts(self, dates: Sequence[str]) -> np.ndarray:
+        """Pixels coded sea ice or pole hole per date, counted on the packed planes."""
+        counts = np.empty(len(dates), dtype=np.int64)
+        for i, iso in enumerate(dates):
+            packed = self.packed_planes(iso)
+            counts[i] = int(np.unpackbits(packed[ICE_PLANE] | packed[POLE_PLANE]).sum())
+        return counts
+
+
+_CUBE_LOCK = threading.Lock()
+_CUBE: Dict = {"mtime_ns": None, "cube": None}
+
+
+def open_datacube(directory: Path = DATACUBE_DIR) -> Optional[DataCube]:
+    """
+    The datacube at `directory`, or None if none has been built.  Reopened
+    when `cube.json` changes, so a rebuild is picked up without a restart.
+    """
+    try:
+        mtime_ns = (directory / "cube.json").stat().st_mtime_ns
+    except OSError:
+        return None
+    with _CUBE_LOCK:
+        if _CUBE["mtime_ns"] != mtime_ns:
+            try:
+                _CUBE["cube"] = DataCube(directory)
+            except Exception as exc:
+                logger.warning("Ignoring datacube at %s: %s", directory, exc)
+                _CUBE["cube"] = None
+            _CUBE["mtime_ns"] = mtime_ns
+        return _CUBE["cube"]
+
+
+def cube_band(path: str) -> Optional[Tuple[np.ndarray, rasterio.Affine, rasterio.crs.CRS]]:
+    """The raster for a GeoTIFF path from the datacube, or None if it must be read from disk."""
+    cube = open_datacube()
+    if cube is None:
+        return None
+    iso = _iso_from_name(path)
+    if iso is None or not cube.has(iso, Path(path)):
+        return None
+    return cube.band(iso), cube.transform, cube.crs
+
+
+def _read_band(path: Path) -> Tuple[np.ndarray, rasterio.Affine, rasterio.crs.CRS]:
+    with rasterio.open(path) as src:
+        return src.read(1), src.transform, src.crs
+
+
+def _pack(band: np.ndarray, static: np.ndarray) -> Tuple[np.ndarray, bool]:
+    planes = np.stack([np.packbits(band == code) for code in PLANE_CODES])
+    rebuilt = static.copy()
+    for code in PLANE_CODES:
+        rebuilt[band == code] = code
+    return planes, bool(np.array_equal(rebuilt, band))
+
+
+def build_datacube(paths_by_date: Dict[str, Path], out_dir: Path = DATACUBE_DIR, force: bool = False) -> Dict:
+    """
+    Ingest the given rasters into `out_dir`.  Years whose sources are
+    unchanged since the last build are kept as they are.  Returns a summary.
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    meta_path = out_dir / "cube.json"
+    previous = json.loads(meta_path.read_text()) if meta_path.exists() and not force else None
+
+    dates = sorted(paths_by_date)
+    if not dates:
+        raise ValueError("No rasters to ingest.")
+    with rasterio.open(paths_by_date[dates[0]]) as src:
+        first, transform, crs, nodata = src.read(1), src.transform, src.crs, src.nodata
+    height, width = first.shape
+    grid = {
+        "height": height, "width": width, "transform": list(transform)[:6], "crs": crs.to_string(), "nodata": nodata,
+    }
+    if previous and any(previous.get(k) != v for k, v in grid.items()):
+        previous = None
+
+    static_path = out_dir / "static.npy"
+    if previous:
+        static = np.load(static_path)
+    else:
+        static = np.where(np.isin(first, STATIC_CODES), first, 0).astype(np.uint8)
+        np.save(static_path, static)
+
+    by_year: Dict[str, List[str]] = {}
+    for iso in dates:
+        by_year.setdefault(iso[:4], []).append(iso)
+
+    chunks, summary = {}, {"rebuilt": [], "kept": [], "skipped": [], "inexact": []}
+    for year, year_dates in by_year.items():
+        sources = [_source_info(paths_by_date[iso]) for iso in year_dates]
+        old = (previous or {}).get("chunks", {}).get(year)
+        if old and old["dates"] == year_dates and old["sources"] == sources and (out_dir / old["file"]).exists():
+            chunks[year] = old
+            summary["kept"].append(year)
+            continue
+
+        kept_dates, kept_sources, exact, planes = [], [], [], []
+        for iso, source in zip(year_dates, sources):
+            band, band_transform, band_crs = _read_band(paths_by_date[iso])
+            if band.shape != (height, width) or band_transform != transform or band_crs != crs:
+                summary["skipped"].append(iso)
+                continue
+            packed, is_exact = _pack(band, static)
+            if not is_exact:
+                summary["inexact"].append(iso)
+            kept_dates.append(iso)
+            kept_sources.append(source)
+            exact.append(is_exact)
+            planes.append(packed)
+        if not planes:
+            continue
+
+        file_name = f"{year}.npy"
+        tmp_path = out_dir / f".{file_name}.tmp"
+        with open(tmp_path, "wb") as fh:
+            np.save(fh, np.stack(planes))
+        os.replace(tmp_path, out_dir / file_name)
+        chunks[year] = {"file": file_name, "dates": kept_dates, "sources": kept_sources, "exact": exact}
+        summary["rebuilt"].append(year)
+
+    meta = {"version": CUBE_VERSION, **grid, "static": static_path.name, "chunks": chunks}
+    tmp_meta = out_dir / ".cube.json.tmp"
+    tmp_meta.write_text(json.dumps(meta))
+    os.replace(tmp_meta, meta_path)
+    summary["dates"] = sum(len(chunk["dates"]) for chunk in chunks.values())
+    return summary
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Build the ice datacube from the GeoTIFF archive.")
+    parser.add_argument("--out", type=Path, default=DATACUBE_DIR, help=f"output directory (default {DATACUBE_DIR})")
+    parser.add_argument("--force", action="store_true", help="rewrite every year, not only changed ones")
+    args = parser.parse_args(argv)
+
+    from .services.ice_extent import DATASET_ROOT, find_dataset_path, scan_available_dates
+
+    paths = {iso: find_dataset_path(iso) for iso in scan_available_dates()}
+    print(f"Ingesting {len(paths)} rasters from {DATASET_ROOT} into {args.out}")
+    summary = build_datacube(paths, args.out, force=args.force)
+    print(
+        f"{summary['dates']} dates; years rebuilt {summary['rebuilt'] or '-'}, kept {summary['kept'] or '-'}; "
+        f"{len(summary['skipped'])} skipped (grid mismatch), {len(summary['inexact'])} served from GeoTIFF"
+    )
+
+
+if __name__ == "__main__":
+    main()
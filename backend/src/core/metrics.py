@@ -0,0 +1,253 @@
+"""
+Minimal Prometheus-style metrics for the backend hot paths.
+
+Counters, gauges and histograms keep their values in plain dicts keyed by
+label tuples behind one lock each, so recording a sample costs a lock and a
+few additions.  `render_metrics` produces the Prometheus text exposition
+format; collectors registered with `register_collector` add samples computed
+at scrape time (e.g. `lru_cache` statistics) without touching the hot path.
+"""
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Seconds; spans cache hits (sub-millisecond) to slow GeoJSON conversions.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(v)}" for labels, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+    def total(self, where: Optional[Callable[[LabelValues], bool]] = None) -> float:
+        """Sum over all label sets, or those `where` accepts."""
+        with self._lock:
+            return sum(value for labels, value in self._values.items() if where is None or where(labels))
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "started")
+
+    def __init__(self, histogram: "Histogram", labels: LabelValues) -> None:
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self) -> "_Timer":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.histogram.observe(time.perf_counter() - self.started, *self.labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            row = self._values.get(labels)
+            if row is None:
+                row = self._values[labels] = [0.0] * (len(self.buckets) + 2)
+            row[index] += 1
+            row[-1] += value
+
+    def time(self, *labels: str) -> _Timer:
+        """Context manager observing the duration of its block."""
+        return _Timer(self, labels)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((labels, list(row)) for labels, row in self._values.items())
+        lines = []
+        for labels, row in items:
+            cumulative = 0.0
+            for bound, count in zip((*self.buckets, float("inf")), row[:-1]):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {_format_value(cumulative)}")
+            suffix = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{suffix} {_format_value(row[-1])}")
+            lines.append(f"{self.name}_count{suffix} {_format_value(cumulative)}")
+        return lines
+
+
+_METRICS: List[_Metric] = []
+_COLLECTORS: List[Callable[[], Iterable[str]]] = []
+
+
+def _register(metric: _Metric) -> _Metric:
+    _METRICS.append(metric)
+    return metric
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+    return _register(Counter(name, documentation, labelnames))
+
+
+def gauge(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+    return _register(Gauge(name, documentation, labelnames))
+
+
+def histogram(
+    name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+) -> Histogram:
+    return _register(Histogram(name, documentation, labelnames, buckets))
+
+
+def register_collector(collector: Callable[[], Iterable[str]]) -> None:
+    """Add a callable returning exposition lines (with HELP/TYPE) evaluated at scrape time."""
+    _COLLECTORS.append(collector)
+
+
+def render_metrics() -> str:
+    lines: List[str] = []
+    for metric in _METRICS:
+        lines += metric.header()
+        lines += metric.samples()
+    for collector in _COLLECTORS:
+        lines += collector()
+    return "\n".join(lines) + "\n"
+
+
+# Shared hot-path metrics.  `pipeline` is convert, predict, diff, frames or
+# climatology; stages include cube_read (datacube lookup), raster_read, mask,
+# model_load, kernel, select (from a cached probability field), transform_xy,
+# points (pixel centres to shapely points), geodataframe, to_crs and serialize.
+STAGE_SECONDS = histogram(
+    "ice_stage_duration_seconds",
+    "Time spent in each stage of GeoTIFF conversion, prediction and change detection.",
+    ("pipeline", "stage"),
+)
+MODEL_LOADS = counter("ice_model_loads_total", "Number of times the prediction model was loaded.")
+MODEL_LOAD_SECONDS = gauge("ice_model_load_seconds", "Duration of the most recent prediction model load.")
+
+
+# Per-request "pipeline.stage" -> [total seconds, calls], set while a request
+# is being timed (see `src/core/profiling.py`).  Unset outside such requests.
+REQUEST_STAGES: ContextVar[Optional[Dict[str, List[float]]]] = ContextVar("request_stages", default=None)
+
+
+def record_stage(pipeline: str, name: str, seconds: float) -> None:
+    """Record a stage duration measured by the caller."""
+    STAGE_SECONDS.observe(seconds, pipeline, name)
+    stages = REQUEST_STAGES.get()
+    if stages is not None:
+        entry = stages.setdefault(f"{pipeline}.{name}", [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+
+
+class _StageTimer(_Timer):
+    __slots__ = ()
+
+    def __exit__(self, *exc) -> None:
+        record_stage(*self.labels, time.perf_counter() - self.started)
+
+
+def stage(pipeline: str, name: str) -> _Timer:
+    """
+    `with stage("convert", "to_crs"): ...` records the block in STAGE_SECONDS
+    and, when the current request is being timed, in its REQUEST_STAGES.
+    """
+    return _StageTimer(STAGE_SECONDS, (pipeline, name))
+
+
+def lru_cache_collector(caches: Dict[str, Callable]) -> Callable[[], List[str]]:
+    """
+    Collector exposing hits, misses, evictions, size and capacity of
+    `functools.lru_cache` wrapped functions.  Evictions are derived from
+    `cache_info()` (misses that are no longer resident), so nothing is added
+    to the cached call path.
+    """
+    def collect() -> List[str]:
+        infos = {name: fn.cache_info() for name, fn in caches.items()}
+        series = (
+            ("ice_cache_hits_total", "counter", "Cache hits.", lambda i: i.hits),
+            ("ice_cache_misses_total", "counter", "Cache misses.", lambda i: i.misses),
+            ("ice_cache_evictions_total", "counter", "Entries evicted from the cache.",
+             lambda i: max(0, i.misses - i.currsize)),
+            ("ice_cache_entries", "gauge", "Entries currently cached.", lambda i: i.currsize),
+            ("ice_cache_capacity", "gauge", "Maximum cache entries.", lambda i: i.maxsize or 0),
+        )
+        lines = []
+        for name, kind, documentation, value in series:
+            lines += [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+            lines += [f'{name}{{cache="{cache}"}} {value(info)}' for cache, info in infos.items()]
+        return lines
+
+    return collect
@@ -3,20 +3,45 @@ from __future__ import annotations
 from pydantic import BaseModel, Field, validator
 
 
+def _check_coord(value: list[float]) -> list[float]:
+    if len(value) != 2:
+        raise ValueError("Coordinate must contain [lng, lat].")
+    try:
+        float(value[0])
+        float(value[1])
+    except (TypeError, ValueError) as exc:
+        raise ValueError("Coordinate values must be numbers.") from exc
+    return value
+
+
 class RouteRequest(BaseModel):
     start: list[float] = Field(..., description="Start coordinate [lng, lat]")
     end: list[float] = Field(..., description="End coordinate [lng, lat]")
+    date: str | None = Field(None, description="Date to route on (YYYY-MM-DD); defaults to the latest observation.")
+    source: str = Field("observed", description="Ice field to route over: observed or predicted.")
+    thresh: float = Field(0.5, ge=0.0, le=1.0, description="Ice probability threshold for predicted fields.")
+    mode: str = Field("static", description="static (one ice field) or time_dependent (monthly predicted fields).")
+    speed_kmh: float = Field(25.0, gt=0, description="Open-water vessel speed for time_dependent routing.")
+
+    @validator("start", "end")
+    def _validate_coord(cls, value: list[float]) -> list[float]:
+        return _check_coord(value)
+
+
+class RoutePair(BaseModel):
+    start: list[float] = Field(..., description="Start coordinate [lng, lat]")
+    end: list[float] = Field(..., description="End coordinate [lng, lat]")
 
     @validator("start", "end")
     def _validate_coord(cls, value: list[float]) -> list[float]:
-        if len(value) != 2:
-            raise ValueError("Coordinate must contain [lng, lat].")
-        try:
-            float(value[0])
-            float(value[1])
-        except (TypeError, ValueError) as exc:
-            raise ValueError("Coordinate values must be numbers.") from exc
-        return value
+        return _check_coord(value)
+
+
+class BatchRouteRequest(BaseModel):
+    pairs: list[RoutePair] = Field(..., description="Origin/destination pairs to route.")
+    date: str | None = Field(None, description="Date to route on (YYYY-MM-DD); defaults to the latest observation.")
+    source: str = Field("observed", description="Ice field to route over: observed or predicted.")
+    thresh: float = Field(0.5, ge=0.0, le=1.0, description="Ice probability threshold for predicted fields.")
 
 
 class ChatRequest(BaseModel):
@@ -27,3 +52,52 @@ class ChatResponse(BaseModel):
     reply: str
     note: str | None = None
 
+
+
+class SMSSendRequest(BaseModel):
+    phone: str = Field(..., description="Destination phone number (E.164).")
+    message: str = Field(..., description="Message body.")
+    language: str = Field("en", description="Greeting language: en or fr.")
+
+
+class SMSSubscribeRequest(BaseModel):
+    phone: str = Field(..., description="Subscriber phone number (E.164).")
+    language: str = Field("en", description="Preferred language: en or fr.")
+
+
+class SMSUnsubscribeRequest(BaseModel):
+    phone: str = Field(..., description="Subscriber phone number (E.164).")
+
+
+class SMSBroadcastRequest(BaseModel):
+    type: str = Field("general", description="Update type: ice_loss, temperature or general.")
+    language: str = Field("en", description="Fallback language for subscribers without one.")
+
+
+class SMSScheduleRequest(BaseModel):
+    phone: str = Field(..., description="Destination phone number (E.164).")
+    message: str = Field(..., description="Message body.")
+    scheduled_time: str = Field(..., description="ISO 8601 send time; must be in the future.")
+    language: str = Field("en", description="Greeting language: en or fr.")
+    type: str = Field("custom", description="Message type recorded with the schedule.")
+
+
+class SMSArcticScheduleRequest(BaseModel):
+    scheduled_time: str = Field(..., description="ISO 8601 send time; must be in the future.")
+    type: str = Field("general", description="Update type: ice_loss, temperature or general.")
+    language: str = Field("en", description="Fallback language for subscribers without one.")
+
+
+class SMSAlertRuleRequest(BaseModel):
+    phone: str = Field(..., description="Subscribed phone number the alert is sent to.")
+    kind: str = Field(..., description="extent_below, extent_above or ice_within.")
+    source: str = Field("observed", description="observed (newest raster) or predicted (next month's forecast).")
+    threshold_km2: float | None = Field(None, gt=0, description="Extent threshold for extent_* rules.")
+    lon: float | None = Field(None, description="Longitude for ice_within rules.")
+    lat: float | None = Field(None, description="Latitude for ice_within rules.")
+    radius_km: float | None = Field(None, gt=0, description="Radius for ice_within rules.")
+
+
+class SMSAlertCheckRequest(BaseModel):
+    date: str | None = Field(None, description="Evaluate observed rules for this date (YYYY-MM-DD).")
+    force: bool = Field(False, description="Re-evaluate even if nothing changed since the last check.")
@@ -0,0 +1,126 @@
+"""
+Opt-in per-request profiling.
+
+A request is *timed* when profiling is enabled for everyone
+(`PROFILING_ENABLED`) or it carries the admin token (`PROFILING_TOKEN`) in the
+`X-Profile-Token` header.  Timed requests collect the per-stage durations
+recorded by `metrics.stage` into a `Server-Timing` header.  A timed request
+that also sends `X-Profile: 1` is run under cProfile; the stats are saved
+under `PROFILE_DIR` and can be downloaded by id.
+"""
+from __future__ import annotations
+
+import cProfile
+import hmac
+import io
+import logging
+import os
+import pstats
+import re
+import time
+import uuid
+from contextvars import ContextVar
+from functools import wraps
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED", "false").lower() in ("1", "true", "yes")
+PROFILING_TOKEN = os.environ.get("PROFILING_TOKEN", "")
+PROFILE_DIR = Path(
+    os.environ.get("PROFILE_DIR", Path(__file__).resolve().parent.parent.parent / "profiles")
+).resolve()
+# Saved profiles kept on disk, oldest deleted first (0 keeps everything).
+PROFILE_KEEP = int(os.environ.get("PROFILE_KEEP", "50"))
+
+TOKEN_HEADER = "x-profile-token"
+CAPTURE_HEADER = "x-profile"
+PROFILE_ID_PATTERN = re.compile(r"^[0-9a-f]{16}$")
+
+# Set by the middleware for requests that asked for a cProfile capture; the
+# wrapped endpoint stores the saved profile id in it.
+PROFILE_REQUEST: ContextVar[Optional[Dict]] = ContextVar("profile_request", default=None)
+
+
+def is_authorized(token: Optional[str]) -> bool:
+    """Whether a request with this `X-Profile-Token` value may be timed and profiled."""
+    if PROFILING_ENABLED:
+        return True
+    return bool(PROFILING_TOKEN) and token is not None and hmac.compare_digest(token, PROFILING_TOKEN)
+
+
+def server_timing(stages: Dict[str, List[float]], total_seconds: float) -> str:
+    """`Server-Timing` header value: one entry per stage (summed over calls) plus `total`."""
+    entries = []
+    for name, (seconds, calls) in sorted(stages.items(), key=lambda item: -item[1][0]):
+        entry = f"{name};dur={seconds * 1000.0:.2f}"
+        if calls > 1:
+            entry += f';desc="{calls} calls"'
+        entries.append(entry)
+    entries.append(f"total;dur={total_seconds * 1000.0:.2f}")
+    return ", ".join(entries)
+
+
+def _prune_profiles() -> None:
+    if PROFILE_KEEP <= 0:
+        return
+    profiles = sorted(PROFILE_DIR.glob("*.prof"), key=lambda path: path.stat().st_mtime)
+    for path in profiles[:-PROFILE_KEEP]:
+        path.unlink(missing_ok=True)
+
+
+def save_profile(profiler: cProfile.Profile) -> str:
+    """Dump the profiler's stats to PROFILE_DIR; returns the profile id."""
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    profile_id = uuid.uuid4().hex[:16]
+    profiler.dump_stats(str(PROFILE_DIR / f"{profile_id}.prof"))
+    _prune_profiles()
+    return profile_id
+
+
+def profile_path(profile_id: str) -> Path:
+    if not PROFILE_ID_PATTERN.match(profile_id):
+        raise ValueError("Invalid profile id.")
+    path = PROFILE_DIR / f"{profile_id}.prof"
+    if not path.exists():
+        raise FileNotFoundError(f"Profile {profile_id} not found")
+    return path
+
+
+def profile_summary(profile_id: str, sort: str = "cumulative", limit: int = 40) -> str:
+    """Human-readable pstats listing for a saved profile."""
+    path = profile_path(profile_id)
+    out = io.StringIO()
+    stats = pstats.Stats(str(path), stream=out)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    return out.getvalue()
+
+
+def profiled(endpoint: Callable) -> Callable:
+    """
+    Wrap a sync endpoint so it runs under cProfile when the current request
+    asked for a capture.  The profile is taken inside the endpoint because
+    sync endpoints run in a worker thread, which a profiler started by the
+    middleware on the event loop thread would not see.
+    """
+    @wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        request = PROFILE_REQUEST.get()
+        if request is None:
+            return endpoint(*args, **kwargs)
+
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            profiler.disable()
+            request["profile_id"] = save_profile(profiler)
+            logger.info(
+                "Profiled %s in %.1f ms -> %s",
+                endpoint.__name__, (time.perf_counter() - started) * 1000.0, request["profile_id"],
+            )
+
+    return wrapper
@@ -0,0 +1,283 @@
+"""
+Ice-aware shortest-path routing on the native raster grid.
+
+Every raster cell is a graph node connected to its eight neighbours.  Edge
+weights are the grid distance between cell centers scaled by the navigability
+cost of the two cells, so open water is cheap, ice is expensive and land is
+impassable.  The graph is stored as a SciPy CSR matrix once per grid and
+searched with the compiled Dijkstra from `scipy.sparse.csgraph`.
+"""
+from __future__ import annotations
+
+import itertools
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import rasterio
+from rasterio.transform import xy as transform_xy
+from rasterio.warp import transform as warp_transform
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+
+WGS84 = "EPSG:4326"
+# Memory budget shared by the cached distance fields of every grid.
+DISTANCE_FIELD_CACHE_BYTES = int(float(os.environ.get("ROUTE_FIELD_CACHE_MB", "64")) * 2**20)
+NEIGHBOUR_OFFSETS = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
+
+
+class RoutingError(RuntimeError):
+    """Raised when a route cannot be computed between two points."""
+
+
+class _FieldCache:
+    """
+    LRU of (grid id, source) -> (float32 cost field, int32 predecessors),
+    bounded by total bytes across all grids.  Fields of grids that fell out
+    of their caches are simply never hit again and age out.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[int, int], Tuple[np.ndarray, np.ndarray]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[int, int]) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        with self._lock:
+            field = self._entries.get(key)
+            if field is not None:
+                self._entries.move_to_end(key)
+            return field
+
+    def put(self, key: Tuple[int, int], field: Tuple[np.ndarray, np.ndarray]) -> None:
+        size = field[0].nbytes + field[1].nbytes
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[0].nbytes + previous[1].nbytes
+            self._entries[key] = field
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted[0].nbytes + evicted[1].nbytes
+
+
+_FIELD_CACHE = _FieldCache(DISTANCE_FIELD_CACHE_BYTES)
+_GRID_IDS = itertools.count()
+
+
+class NavigationGrid:
+    """Navigability cost grid and its 8-connected routing graph."""
+
+    def __init__(
+        self,
+        navigable: np.ndarray,
+        ice: np.ndarray,
+        transform: rasterio.Affine,
+        crs: rasterio.crs.CRS,
+        ice_penalty: float,
+    ) -> None:
+        if navigable.shape != ice.shape:
+            raise RoutingError("Navigability and ice grids must share the same shape.")
+
+        self.shape = navigable.shape
+        self.transform = transform
+        self.crs = crs
+        self.ice_penalty = ice_penalty
+        self.navigable = navigable
+        self.ice = ice & navigable
+        self.cell_km = (abs(transform.a) / 1000.0, abs(transform.e) / 1000.0)
+        # Relative cost of crossing a cell: 1 in open water, `ice_penalty` in ice.
+        self.cost = np.where(self.ice, ice_penalty, 1.0).astype(np.float64)
+        self.graph = self._build_graph()
+
+        nav_rows, nav_cols = np.nonzero(navigable)
+        self._nav_rows = nav_rows
+        self._nav_cols = nav_cols
+
+        # Single-source fields go to the shared, byte-bounded `_FIELD_CACHE`.
+        self._grid_id = next(_GRID_IDS)
+        self._fields_lock = threading.Lock()
+        self.field_hits = 0
+        self.field_misses = 0
+
+    def _build_graph(self) -> csr_matrix:
+        height, width = self.shape
+        node_ids = np.arange(height * width).reshape(height, width)
+        cost = self.cost
+        dx_km, dy_km = self.cell_km
+
+        sources, targets, weights = [], [], []
+        for dr, dc in NEIGHBOUR_OFFSETS:
+            src = (slice(max(0, -dr), height - max(0, dr)), slice(max(0, -dc), width - max(0, dc)))
+            dst = (slice(max(0, dr), height - max(0, -dr)), slice(max(0, dc), width - max(0, -dc)))
+            ok = self.navigable[src] & self.navigable[dst]
+            step_km = float(np.hypot(dr * dy_km, dc * dx_km))
+            sources.append(node_ids[src][ok])
+            targets.append(node_ids[dst][ok])
+            weights.append(step_km * 0.5 * (cost[src][ok] + cost[dst][ok]))
+
+        n_nodes = height * width
+        return csr_matrix(
+            (np.concatenate(weights), (np.concatenate(sources), np.concatenate(targets))),
+            shape=(n_nodes, n_nodes),
+        )
+
+    def snap(self, lon: float, lat: float) -> Tuple[int, float]:
+        """
+        Return the node id of the navigable cell nearest to lon/lat and the
+        distance (km) between the point and that cell's center.
+        """
+        if self._nav_rows.size == 0:
+            raise RoutingError("The grid has no navigable cells.")
+
+        xs, ys = warp_transform(WGS84, self.crs, [lon], [lat])
+        inverse = ~self.transform
+        col, row = inverse * (xs[0], ys[0])
+        dx_km, dy_km = self.cell_km
+        d2 = ((self._nav_rows + 0.5 - row) * dy_km) ** 2 + ((self._nav_cols + 0.5 - col) * dx_km) ** 2
+        best = int(np.argmin(d2))
+        node = int(self._nav_rows[best]) * self.shape[1] + int(self._nav_cols[best])
+        return node, float(np.sqrt(d2[best]))
+
+    def distance_fields(self, sources: Sequence[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """Single-source cost fields and predecessor trees for each source node."""
+        dist, pred = dijkstra(self.graph, directed=True, indices=list(sources), return_predecessors=True)
+        return np.atleast_2d(dist), np.atleast_2d(pred)
+
+    def distance_field(self, source: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Cost field (float32) and predecessor tree (int32) rooted at `source`,
+        memoised in an LRU shared by all grids and bounded by
+        ROUTE_FIELD_CACHE_MB, so repeated origins skip the search entirely.
+        """
+        key = (self._grid_id, source)
+        cached = _FIELD_CACHE.get(key)
+        with self._fields_lock:
+            if cached is not None:
+                self.field_hits += 1
+                return cached
+            self.field_misses += 1
+
+        dist, pred = self.distance_fields([source])
+        field = (dist[0].astype(np.float32), pred[0].astype(np.int32))
+        _FIELD_CACHE.put(key, field)
+        return field
+
+    def path_nodes(self, predecessors: np.ndarray, source: int, target: int) -> List[int]:
+        """Walk a predecessor tree back from `target` to `source`."""
+        if source == target:
+            return [source]
+        path = [target]
+        node = target
+        while node != source:
+            node = int(predecessors[node])
+            if node < 0:
+                raise RoutingError("No navigable route connects the requested points.")
+            path.append(node)
+        path.reverse()
+        return path
+
+    def describe_path(self, nodes: Sequence[int]) -> Dict:
+        """Coordinates, travelled distance and ice exposure for a node path."""
+        rows, cols = np.divmod(np.asarray(nodes, dtype=np.int64), self.shape[1])
+        xs, ys = transform_xy(self.transform, rows, cols)
+        lons, lats = warp_transform(self.crs, WGS84, np.atleast_1d(xs), np.atleast_1d(ys))
+
+        dx_km, dy_km = self.cell_km
+        step_km = np.hypot(np.diff(rows) * dy_km, np.diff(cols) * dx_km)
+        ice = self.ice[rows, cols].astype(np.float64)
+        ice_km = step_km * 0.5 * (ice[:-1] + ice[1:])
+        cost = step_km * 0.5 * (self.cost[rows, cols][:-1] + self.cost[rows, cols][1:])
+
+        coordinates = [[float(lon), float(lat)] for lon, lat in zip(lons, lats)]
+        if len(coordinates) == 1:
+            # A LineString needs two positions even when start and end coincide.
+            coordinates.append(list(coordinates[0]))
+
+        distance_km = float(step_km.sum())
+        return {
+            "coordinates": coordinates,
+            "distance_km": distance_km,
+            "ice_km": float(ice_km.sum()),
+            "ice_fraction": float(ice_km.sum() / distance_km) if distance_km else 0.0,
+            "cost": float(cost.sum()),
+        }
+
+
+def _settled_free_graph(graph: csr_matrix, settled: np.ndarray, seeds: np.ndarray, seed_cost: np.ndarray) -> csr_matrix:
+    """
+    Copy of `graph` without edges into already-settled nodes, plus one extra
+    super-source node (the last index) wired to `seeds` with `seed_cost`.
+    """
+    n_nodes = graph.shape[0]
+    keep = ~settled[graph.indices]
+    rows = np.repeat(np.arange(n_nodes), np.diff(graph.indptr))
+    counts = np.bincount(rows[keep], minlength=n_nodes)
+    indptr = np.concatenate([[0], np.cumsum(counts), [int(counts.sum()) + seeds.size]])
+    return csr_matrix(
+        (
+            np.concatenate([graph.data[keep], seed_cost]),
+            np.concatenate([graph.indices[keep], seeds]),
+            indptr,
+        ),
+        shape=(n_nodes + 1, n_nodes + 1),
+    )
+
+
+def time_dependent_search(
+    grid_for_epoch: Callable[[int], NavigationGrid],
+    epoch_ends_h: Sequence[float],
+    source: int,
+    target: int,
+    speed_kmh: float,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Earliest-arrival search where each epoch (e.g. a calendar month) has its
+    own cost grid.
+
+    Epoch `k` covers arrival times up to `epoch_ends_h[k]` hours after
+    departure.  Nodes reached in earlier epochs keep their arrival time and
+    seed the next epoch through a super-source, so every edge is costed with
+    the grid of the epoch in which it is completed.  Returns arrival hours,
+    predecessors and the epoch index each node was reached in.
+    """
+    arrival = None
+    predecessors = None
+    epoch_of = None
+
+    for k, epoch_end in enumerate(epoch_ends_h):
+        grid = grid_for_epoch(k)
+        if arrival is None:
+            n_nodes = grid.graph.shape[0]
+            arrival = np.full(n_nodes, np.inf)
+            arrival[source] = 0.0
+            predecessors = np.full(n_nodes, -9999, dtype=np.int64)
+            epoch_of = np.full(n_nodes, -1, dtype=np.int64)
+            epoch_of[source] = 0
+
+        settled = np.isfinite(arrival)
+        seeds = np.flatnonzero(settled)
+        hours = grid.graph / speed_kmh
+        augmented = _settled_free_graph(hours.tocsr(), settled, seeds, arrival[seeds])
+        dist, pred = dijkstra(
+            augmented,
+            directed=True,
+            indices=augmented.shape[0] - 1,
+            limit=epoch_end,
+            return_predecessors=True,
+        )
+        reached = np.isfinite(dist[:-1]) & ~settled
+        arrival[reached] = dist[:-1][reached]
+        predecessors[reached] = pred[:-1][reached]
+        epoch_of[reached] = k
+
+        if np.isfinite(arrival[target]):
+            break
+
+    return arrival, predecessors, epoch_of
@@ -1,4 +1,6 @@
 from .ice_extent import (
+    catalog_version,
+    refresh_catalog,
     scan_available_dates,
     find_dataset_path,
     get_ice_extent_geojson,
@@ -8,14 +10,82 @@ from .prediction import (
     cached_prediction,
     PredictionError,
 )
-from .chat import generate_chat_reply
+from .change import (
+    ice_change,
+    DIFF_SOURCES,
+)
+from .climatology import (
+    ClimatologyUnavailable,
+    anomaly,
+    climatology_summary,
+)
+from .frames import (
+    encode_frames,
+    frame_dates,
+)
+from .prefetch import (
+    observed_key,
+    predicted_key,
+    prefetch_observed_neighbours,
+    prefetch_predicted_neighbours,
+    record_request,
+)
+from .spatial_index import (
+    get_ice_index,
+    INDEX_SOURCES,
+)
+from .routing import (
+    plan_route,
+    plan_routes,
+    plan_voyage,
+    ROUTE_SOURCES,
+    ROUTE_MODES,
+    ROUTE_BATCH_MAX_PAIRS,
+)
+from .chat_tools import answer_data_question
+from .chat import (
+    chat_context,
+    chat_version,
+    dataset_context,
+    generate_chat_reply,
+    register_chat_backend,
+    stream_chat_reply,
+)
 
 __all__ = [
+    "catalog_version",
+    "refresh_catalog",
     "scan_available_dates",
     "find_dataset_path",
     "get_ice_extent_geojson",
     "get_datasets_for_year",
     "cached_prediction",
     "PredictionError",
+    "get_ice_index",
+    "INDEX_SOURCES",
+    "ice_change",
+    "DIFF_SOURCES",
+    "ClimatologyUnavailable",
+    "anomaly",
+    "climatology_summary",
+    "encode_frames",
+    "frame_dates",
+    "observed_key",
+    "predicted_key",
+    "prefetch_observed_neighbours",
+    "prefetch_predicted_neighbours",
+    "record_request",
+    "plan_route",
+    "plan_routes",
+    "plan_voyage",
+    "ROUTE_MODES",
+    "ROUTE_BATCH_MAX_PAIRS",
+    "ROUTE_SOURCES",
+    "answer_data_question",
+    "chat_context",
+    "chat_version",
+    "dataset_context",
     "generate_chat_reply",
+    "stream_chat_reply",
+    "register_chat_backend",
 ]
@@ -0,0 +1,160 @@
+"""
+Change detection between two ice masks (observed or predicted).
+
+Masks are kept bit-packed (`np.packbits`, eight pixels per byte) and cached
+per date, so a diff is a handful of byte-wise AND/XOR operations plus a
+popcount table lookup, without re-reading or unpacking either raster.
+Observed masks come straight from the datacube's packed ice plane when it holds
+the date, otherwise from the converter's cached raster read.
+"""
+from __future__ import annotations
+
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Tuple
+
+import numpy as np
+import rasterio
+
+from ..converter import _pixel_coordinates, load_ice_mask
+from ..datacube import ICE_PLANE, _iso_from_name, open_datacube
+from ..metrics import stage
+from .ice_extent import _normalise_date, find_dataset_path
+from .prediction import predict_ice_grid
+from .stats import _cell_area_km2
+
+DIFF_SOURCES = ("observed", "predicted")
+# Set bits per byte value.
+_POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1).astype(np.int64)
+# Class values in the rasterised change grid handed to `rasterio.features.shapes`.
+_CHANGE_CLASSES = {"gained": 1, "lost": 2}
+
+PackedMask = Tuple[np.ndarray, Tuple[int, int], rasterio.Affine, rasterio.crs.CRS]
+
+
+def _popcount(packed: np.ndarray) -> int:
+    return int(_POPCOUNT[packed].sum())
+
+
+@lru_cache(maxsize=16)
+def _outside_radius_bits(transform: rasterio.Affine, height: int, width: int, radius_km: float) -> np.ndarray:
+    xs, ys = _pixel_coordinates(transform, width, height)
+    return np.packbits(np.sqrt(xs**2 + ys**2) / 1000 > radius_km)
+
+
+@lru_cache(maxsize=256)
+def observed_packed_mask(path: str, radius_km: float = 500) -> PackedMask:
+    """Bit-packed ice mask of `load_ice_mask(path, radius_km)` with its grid."""
+    cube = open_datacube()
+    iso = _iso_from_name(path)
+    if cube is not None and iso is not None and cube.has(iso, Path(path)):
+        shape = (cube.height, cube.width)
+        outside = _outside_radius_bits(cube.transform, *shape, radius_km)
+        packed = cube.packed_planes(iso)[ICE_PLANE] & outside
+        return packed, shape, cube.transform, cube.crs
+
+    mask, transform, crs = load_ice_mask(path, radius_km)
+    return np.packbits(mask), mask.shape, transform, crs
+
+
+@lru_cache(maxsize=128)
+def predicted_packed_mask(year: int, month: int, thresh: float, radius_km: float) -> PackedMask:
+    """Bit-packed ice mask of `predict_ice_grid` with its grid."""
+    mask, _, transform, crs = predict_ice_grid(year, month, thresh, radius_km)
+    return np.packbits(mask), mask.shape, transform, crs
+
+
+def _mask_key(date_str: str, source: str) -> Tuple:
+    """Hashable identity of a mask: the resolved raster path, or the predicted month."""
+    if source == "observed":
+        return source, str(find_dataset_path(date_str))
+    if source == "predicted":
+        token = _normalise_date(date_str)
+        return source, int(token[:4]), int(token[4:6])
+    raise ValueError(f"Unknown source '{source}', expected one of {', '.join(DIFF_SOURCES)}.")
+
+
+def _packed_mask(key: Tuple, radius_km: float, thresh: float) -> PackedMask:
+    if key[0] == "observed":
+        return observed_packed_mask(key[1], radius_km)
+    return predicted_packed_mask(key[1], key[2], thresh, radius_km)
+
+
+def _change_geometry(gained: np.ndarray, lost: np.ndarray, shape, transform, crs) -> Dict:
+    """
+    One MultiPolygon feature per change class, built from runs of adjacent
+    changed pixels rather than one point per pixel, in lon/lat.
+    """
+    from rasterio.features import shapes
+    from rasterio.warp import transform_geom
+
+    count = shape[0] * shape[1]
+    classes = np.zeros(count, dtype=np.uint8)
+    classes[np.unpackbits(gained, count=count).view(bool)] = _CHANGE_CLASSES["gained"]
+    classes[np.unpackbits(lost, count=count).view(bool)] = _CHANGE_CLASSES["lost"]
+    classes = classes.reshape(shape)
+
+    polygons: Dict[int, list] = {value: [] for value in _CHANGE_CLASSES.values()}
+    for geometry, value in shapes(classes, mask=classes > 0, connectivity=4, transform=transform):
+        polygons[int(value)].append(geometry["coordinates"])
+
+    features = []
+    for name, value in _CHANGE_CLASSES.items():
+        if not polygons[value]:
+            continue
+        geometry = transform_geom(
+            crs, "EPSG:4326", {"type": "MultiPolygon", "coordinates": polygons[value]}, precision=5
+        )
+        features.append({"type": "Feature", "geometry": geometry, "properties": {"change": name}})
+    return {"type": "FeatureCollection", "features": features}
+
+
+@lru_cache(maxsize=128)
+def _ice_change(from_key: Tuple, to_key: Tuple, radius_km: float, thresh: float, geometry: bool) -> Dict:
+    before, before_shape, transform, crs = _packed_mask(from_key, radius_km, thresh)
+    after, after_shape, after_transform, after_crs = _packed_mask(to_key, radius_km, thresh)
+    if before_shape != after_shape or transform != after_transform or crs != after_crs:
+        raise ValueError("Cannot compare masks on different grids.")
+
+    with stage("diff", "bitwise"):
+        changed = before ^ after
+        gained = changed & after
+        lost = changed & before
+        persistent = before & after
+        counts = {
+            "gained": _popcount(gained),
+            "lost": _popcount(lost),
+            "persistent": _popcount(persistent),
+        }
+    counts["from_ice"] = counts["lost"] + counts["persistent"]
+    counts["to_ice"] = counts["gained"] + counts["persistent"]
+
+    cell_km2 = _cell_area_km2(transform)
+    result = {
+        "pixel_area_km2": cell_km2,
+        "counts": counts,
+        "area_km2": {name: pixels * cell_km2 for name, pixels in counts.items()},
+        "net_change_km2": (counts["gained"] - counts["lost"]) * cell_km2,
+    }
+    if geometry:
+        with stage("diff", "geometry"):
+            result["feature_collection"] = _change_geometry(gained, lost, before_shape, transform, crs)
+    return result
+
+
+def ice_change(
+    from_date: str,
+    to_date: str,
+    from_source: str = "observed",
+    to_source: str = "observed",
+    radius_km: float = 500,
+    thresh: float = 0.5,
+    geometry: bool = True,
+) -> Dict:
+    """
+    Ice gained, lost and persistent between two dates.  Either side may be an
+    observation or a (monthly) prediction; both must share one grid.
+    """
+    return _ice_change(
+        _mask_key(from_date, from_source), _mask_key(to_date, to_source), radius_km, thresh, geometry
+    )
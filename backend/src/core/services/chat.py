@@ -1,59 +1,225 @@
 from __future__ import annotations
 
+import asyncio
+import logging
 import os
-from typing import Dict, Optional
+import threading
+import time
+from functools import lru_cache
+from typing import AsyncIterator, Callable, Dict, Hashable, Optional, Tuple
 
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.language_models import BaseChatModel
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
 from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
 
-from .ice_extent import scan_available_dates
+from .chat_cache import response_cache
+from .chat_tools import answer_data_question, data_context_facts
+from .ice_extent import catalog_version, scan_available_dates
 
-def generate_chat_reply(message: str) -> Dict[str, Optional[str]]:
+logger = logging.getLogger(__name__)
+
+CHAT_BACKEND = os.environ.get("CHAT_BACKEND", "gemini")
+CHAT_MODEL = os.environ.get("CHAT_MODEL", "gemini-2.5-flash")
+STUB_REPLY = "This is a stub reply from the local test model."
+
+PROMPT = ChatPromptTemplate.from_messages([
+    ("system", "You are an intelligent assistant for a NASA Sea Ice Analysis application. "
+               "Your goal is to help users understand sea ice extent data. "
+               "{context}. "
+               "Answer concise and helpful."),
+    ("human", "{question}")
+])
+
+
+class ChatBackendError(RuntimeError):
+    """Raised when the configured chat backend cannot be constructed."""
+
+
+def _gemini_backend() -> BaseChatModel:
     api_key = os.getenv("GOOGLE_API_KEY")
     if not api_key or "your-api-key" in api_key:
-        return {
-            "reply": "I am not connected to an LLM yet. Please set the GOOGLE_API_KEY environment variable.",
-            "note": "Missing GOOGLE_API_KEY"
-        }
+        raise ChatBackendError("Missing GOOGLE_API_KEY")
+
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    return ChatGoogleGenerativeAI(
+        model=CHAT_MODEL,
+        google_api_key=api_key,
+        temperature=0.7
+    )
 
-    # Gather context
+
+def _stub_backend() -> BaseChatModel:
+    return FakeListChatModel(responses=[STUB_REPLY])
+
+
+_BACKENDS: Dict[str, Callable[[], BaseChatModel]] = {
+    "gemini": _gemini_backend,
+    "stub": _stub_backend,
+}
+
+
+def register_chat_backend(name: str, factory: Callable[[], BaseChatModel]) -> None:
+    """Register (or replace) a chat model factory selectable via CHAT_BACKEND."""
+    _BACKENDS[name] = factory
+    get_chat_chain.cache_clear()
+
+
+@lru_cache(maxsize=4)
+def get_chat_chain(backend: str = CHAT_BACKEND, api_key: Optional[str] = None):
+    """
+    Build the prompt | model | parser chain once per backend and reuse it, so
+    the model client and its HTTP connection pool live for the whole process.
+    `api_key` is only part of the cache key, so rotating the key rebuilds.
+    """
+    factory = _BACKENDS.get(backend)
+    if factory is None:
+        raise ChatBackendError(f"Unknown CHAT_BACKEND '{backend}'")
+    return PROMPT | factory() | StrOutputParser()
+
+
+# Dataset summary injected into the prompt, rebuilt when the catalog changes.
+_CONTEXT: Dict = {"version": None, "text": None}
+_CONTEXT_LOCK = threading.Lock()
+
+
+def dataset_context() -> str:
     try:
+        version = catalog_version()
+        with _CONTEXT_LOCK:
+            if _CONTEXT["version"] == version:
+                return _CONTEXT["text"]
+
         dates = scan_available_dates()
         count = len(dates)
         date_range = f"{dates[0]} to {dates[-1]}" if dates else "No data available"
-        context_str = (
+        text = (
             f"Dataset Context: There are {count} valid sea ice extent snapshots available. "
             f"The date range is {date_range}."
         )
+        with _CONTEXT_LOCK:
+            _CONTEXT["version"] = version
+            _CONTEXT["text"] = text
+        return text
     except Exception:
-        context_str = "Dataset Context: Unable to retrieve dataset statistics at this time."
+        return "Dataset Context: Unable to retrieve dataset statistics at this time."
 
+
+def chat_version() -> Hashable:
+    """
+    Version that keys the response cache, so cached replies are dropped
+    whenever the backend or the dataset catalog changes.
+    """
     try:
-        model = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash",
-            google_api_key=api_key,
-            temperature=0.7
-        )
+        return (CHAT_BACKEND, catalog_version())
+    except Exception:
+        return (CHAT_BACKEND, None)
+
+
+def chat_context(message: Optional[str] = None) -> Tuple[str, Hashable]:
+    """
+    Prompt context plus the response cache version (see `chat_version`).
+    Exact figures for years mentioned in `message` are appended to the context.
+    """
+    context = dataset_context()
+    facts = data_context_facts(message) if message else []
+    if facts:
+        context = f"{context} Exact figures: {'; '.join(facts)}"
+    return context, chat_version()
+
+
+def _missing_backend_reply(exc: ChatBackendError) -> Dict[str, Optional[str]]:
+    return {
+        "reply": "I am not connected to an LLM yet. Please set the GOOGLE_API_KEY environment variable.",
+        "note": str(exc)
+    }
 
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", "You are an intelligent assistant for a NASA Sea Ice Analysis application. "
-                       "Your goal is to help users understand sea ice extent data. "
-                       "{context}. "
-                       "Answer concise and helpful."),
-            ("human", "{question}")
-        ])
 
-        chain = prompt | model | StrOutputParser()
-        
+def generate_chat_reply(message: str) -> Dict[str, Optional[str]]:
+    answer = answer_data_question(message)
+    if answer is not None:
+        return {"reply": answer["reply"], "note": None}
+
+    try:
+        chain = get_chat_chain(CHAT_BACKEND, os.getenv("GOOGLE_API_KEY"))
+    except ChatBackendError as exc:
+        return _missing_backend_reply(exc)
+
+    # The cache is checked first: the context is only needed to call the model.
+    cached = response_cache.get(message, chat_version())
+    if cached is not None:
+        return {"reply": cached, "note": None}
+    context, version = chat_context(message)
+
+    try:
         reply_text = chain.invoke({
-            "context": context_str,
+            "context": context,
             "question": message
         })
 
+        response_cache.put(message, version, reply_text)
         return {"reply": reply_text, "note": None}
     except Exception as e:
         return {
             "reply": "I encountered an error calling the Gemini model.",
             "note": f"Error: {str(e)}. Check your API key and model availability."
         }
+
+
+async def stream_chat_reply(
+    message: str, version: Hashable, answer: Optional[Dict[str, str]] = None
+) -> AsyncIterator[Tuple[str, Dict]]:
+    """
+    Stream a reply as `(event, data)` pairs: one `token` event per chunk from
+    the chain's async streaming interface, then a final `done` event carrying
+    time-to-first-token and total latency.  Closing the iterator (e.g. when
+    the client disconnects) closes the upstream model stream.  Cached replies
+    and deterministic `answer`s from `answer_data_question` are sent as a
+    single token without calling the model; the prompt context is only
+    built (in a worker thread) on a cache miss.
+    """
+    started = time.perf_counter()
+    if answer is not None:
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+        yield "token", {"token": answer["reply"]}
+        yield "done", {"note": None, "ttft_ms": elapsed_ms, "total_ms": elapsed_ms, "cached": False, "tool": answer["tool"]}
+        return
+
+    try:
+        chain = get_chat_chain(CHAT_BACKEND, os.getenv("GOOGLE_API_KEY"))
+    except ChatBackendError as exc:
+        fallback = _missing_backend_reply(exc)
+        yield "token", {"token": fallback["reply"]}
+        yield "done", {"note": fallback["note"], "ttft_ms": None, "total_ms": 0.0, "cached": False}
+        return
+
+    cached = response_cache.get(message, version)
+    if cached is not None:
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+        yield "token", {"token": cached}
+        yield "done", {"note": None, "ttft_ms": elapsed_ms, "total_ms": elapsed_ms, "cached": True}
+        return
+
+    context, version = await asyncio.to_thread(chat_context, message)
+    ttft_ms = None
+    chunks = []
+    try:
+        async for chunk in chain.astream({"context": context, "question": message}):
+            if not chunk:
+                continue
+            if ttft_ms is None:
+                ttft_ms = (time.perf_counter() - started) * 1000.0
+            chunks.append(chunk)
+            yield "token", {"token": chunk}
+    except Exception as e:
+        yield "error", {
+            "reply": "I encountered an error calling the Gemini model.",
+            "note": f"Error: {str(e)}. Check your API key and model availability."
+        }
+        return
+
+    response_cache.put(message, version, "".join(chunks))
+    total_ms = (time.perf_counter() - started) * 1000.0
+    logger.info("chat stream ttft_ms=%s total_ms=%.1f", f"{ttft_ms:.1f}" if ttft_ms is not None else "n/a", total_ms)
+    yield "done", {"note": None, "ttft_ms": ttft_ms, "total_ms": total_ms, "cached": False}
@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import os
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Hashable, Optional, Tuple
+
+import numpy as np
+
+CHAT_CACHE_SIZE = int(os.environ.get("CHAT_CACHE_SIZE", "256"))
+CHAT_CACHE_TTL_SECONDS = float(os.environ.get("CHAT_CACHE_TTL_SECONDS", "3600"))
+# Cosine similarity needed for a near-duplicate hit; 0 disables the semantic tier.
+CHAT_CACHE_SIMILARITY = float(os.environ.get("CHAT_CACHE_SIMILARITY", "0.9"))
+
+EMBEDDING_DIM = 512
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+# Words that never change what a question asks for.  Every other word (minimum
+# vs maximum, lowest vs highest, month names, ...) must match for a semantic hit.
+_STOPWORDS = frozenset(
+    "a about an and any are at be by can could did do does for give how i in is it its me "
+    "my of on or please s show tell the there to was were what whats which would you".split()
+)
+
+
+def normalize_message(message: str) -> str:
+    """Lower-case, drop punctuation and collapse whitespace."""
+    text = _PUNCTUATION.sub(" ", message.lower())
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def _content_words(normalized: str) -> FrozenSet[str]:
+    """Words of a normalised message other than stopwords and numbers."""
+    return frozenset(
+        word for word in normalized.split() if word not in _STOPWORDS and not _NUMBER.fullmatch(word)
+    )
+
+
+def _match_key(normalized: str) -> Tuple[Tuple[str, ...], FrozenSet[str]]:
+    return tuple(_NUMBER.findall(normalized)), _content_words(normalized)
+
+
+def _content_text(normalized: str) -> str:
+    """The message without stopwords; what the semantic tier compares."""
+    return " ".join(word for word in normalized.split() if word not in _STOPWORDS)
+
+
+def embed_message(normalized: str) -> np.ndarray:
+    """
+    Cheap local embedding: word unigrams and character trigrams hashed into a
+    fixed-size vector, L2-normalised so a dot product is the cosine similarity.
+    """
+    vector = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+    padded = f" {normalized} "
+    features = normalized.split() + [padded[i:i + 3] for i in range(len(padded) - 2)]
+    for feature in features:
+        vector[zlib.crc32(feature.encode("utf-8")) % EMBEDDING_DIM] += 1.0
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm else vector
+
+
+class ChatResponseCache:
+    """
+    LRU + TTL cache of chatbot replies.
+
+    Exact hits are keyed on the normalised message and a context version (so a
+    catalog change invalidates every entry).  An optional semantic tier matches
+    near-duplicate phrasings by embedding similarity, but only when both
+    messages mention exactly the same numbers and content words, so "ice in
+    2015" never answers "ice in 2016" and "minimum extent" never answers
+    "maximum extent".
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float, similarity: float) -> None:
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.similarity = similarity
+        self._entries: "OrderedDict[Tuple[Hashable, str], Tuple[float, str, np.ndarray, Tuple]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    def _evict_expired(self, now: float) -> None:
+        expired = [key for key, (expires_at, *_rest) in self._entries.items() if expires_at <= now]
+        for key in expired:
+            del self._entries[key]
+
+    def get(self, message: str, version: Hashable) -> Optional[str]:
+        if self.max_size <= 0:
+            return None
+        normalized = normalize_message(message)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get((version, normalized))
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end((version, normalized))
+                self.hits += 1
+                return entry[1]
+
+            if self.similarity > 0:
+                self._evict_expired(now)
+                match_key = _match_key(normalized)
+                candidates = [
+                    (key, value)
+                    for key, value in self._entries.items()
+                    if key[0] == version and value[3] == match_key
+                ]
+                if candidates:
+                    query = embed_message(_content_text(normalized))
+                    scores = np.stack([value[2] for _, value in candidates]) @ query
+                    best = int(np.argmax(scores))
+                    if scores[best] >= self.similarity:
+                        key, value = candidates[best]
+                        self._entries.move_to_end(key)
+                        self.semantic_hits += 1
+                        return value[1]
+
+            self.misses += 1
+            return None
+
+    def put(self, message: str, version: Hashable, reply: str) -> None:
+        if self.max_size <= 0:
+            return
+        normalized = normalize_message(message)
+        entry = (
+            time.monotonic() + self.ttl_seconds,
+            reply,
+            embed_message(_content_text(normalized)),
+            _match_key(normalized),
+        )
+        with self._lock:
+            self._entries[(version, normalized)] = entry
+            self._entries.move_to_end((version, normalized))
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+            }
+
+
+response_cache = ChatResponseCache(CHAT_CACHE_SIZE, CHAT_CACHE_TTL_SECONDS, CHAT_CACHE_SIMILARITY)
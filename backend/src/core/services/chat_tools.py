@@ -0,0 +1,164 @@
+"""
+Deterministic answers for quantitative chat questions.
+
+Questions about the dataset coverage, the extent on a date, the trend between
+years or the predicted extent for a month are answered from local statistics
+instead of the LLM, which would otherwise guess.  Questions that only mention
+a year get that year's figures injected into the prompt context.
+"""
+from __future__ import annotations
+
+import re
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from .ice_extent import scan_available_dates
+from .stats import extent_trend, ice_extent_stats, predicted_extent, yearly_extent
+
+MONTHS = {
+    name: index
+    for index, names in enumerate(
+        [("jan", "january"), ("feb", "february"), ("mar", "march"), ("apr", "april"),
+         ("may",), ("jun", "june"), ("jul", "july"), ("aug", "august"),
+         ("sep", "sept", "september"), ("oct", "october"), ("nov", "november"), ("dec", "december")],
+        start=1,
+    )
+    for name in names
+}
+_MONTH_NAMES = "|".join(sorted(MONTHS, key=len, reverse=True))
+
+ISO_DATE = re.compile(r"\b(\d{4})-(\d{2})-(\d{2})\b")
+NAMED_DATE = re.compile(rf"\b({_MONTH_NAMES})\.?\s+(\d{{1,2}})(?:st|nd|rd|th)?,?\s+(\d{{4}})\b", re.IGNORECASE)
+MONTH_YEAR = re.compile(rf"\b({_MONTH_NAMES})\.?\s+(\d{{4}})\b", re.IGNORECASE)
+YEAR = re.compile(r"\b(19[7-9]\d|20\d{2}|2100)\b")
+
+EXTENT_WORDS = re.compile(r"\b(extent|ice|coverage|covered|area|km)\b", re.IGNORECASE)
+TREND_WORDS = re.compile(r"\b(trend|change|changed|compare|comparison|between|versus|vs|from)\b", re.IGNORECASE)
+# Only explicit words: "will"/"expected" also start questions about observed months.
+PREDICT_WORDS = re.compile(r"\b(predict|predicted|prediction|forecasts?|forecasted|next month)\b", re.IGNORECASE)
+COVERAGE_WORDS = re.compile(r"\b(date range|how many|snapshots|available dates|first date|last date|latest date)\b", re.IGNORECASE)
+
+
+def _km2(value: float) -> str:
+    return f"{value / 1e6:.2f} million km²"
+
+
+def _parse_date(message: str) -> Optional[str]:
+    m = ISO_DATE.search(message)
+    if m:
+        return m.group(0)
+    m = NAMED_DATE.search(message)
+    if m:
+        month = MONTHS[m.group(1).lower()]
+        return f"{int(m.group(3)):04d}-{month:02d}-{int(m.group(2)):02d}"
+    return None
+
+
+def _parse_month(message: str) -> Optional[Tuple[int, int]]:
+    if re.search(r"\bnext month\b", message, re.IGNORECASE):
+        today = datetime.now()
+        return (today.year + 1, 1) if today.month == 12 else (today.year, today.month + 1)
+    m = MONTH_YEAR.search(message)
+    if m:
+        return int(m.group(2)), MONTHS[m.group(1).lower()]
+    m = ISO_DATE.search(message)
+    if m:
+        return int(m.group(1)), int(m.group(2))
+    return None
+
+
+def _after_observations(year: int, month: int) -> bool:
+    """Whether `year`-`month` is later than the month of the last observed snapshot."""
+    dates = scan_available_dates()
+    return bool(dates) and f"{year:04d}-{month:02d}" > dates[-1][:7]
+
+
+def _coverage_answer() -> Optional[str]:
+    dates = scan_available_dates()
+    if not dates:
+        return "No sea ice snapshots are currently available."
+    return f"There are {len(dates)} sea ice extent snapshots available, from {dates[0]} to {dates[-1]}."
+
+
+def _extent_answer(date_str: str) -> Optional[str]:
+    try:
+        stats = ice_extent_stats(date_str)
+    except FileNotFoundError:
+        return f"There is no observed sea ice snapshot for {date_str}."
+    return (
+        f"On {date_str} the observed sea ice extent was {_km2(stats['extent_km2'])} "
+        f"({stats['ice_pixels']:,} ice pixels)."
+    )
+
+
+def _trend_answer(start_year: int, end_year: int) -> Optional[str]:
+    # Only from the datacube: a long span would otherwise decode the archive in the request.
+    trend = extent_trend(start_year, end_year, cube_only=True)
+    if trend is None:
+        return None
+    direction = "decreased" if trend["change_km2"] < 0 else "increased"
+    return (
+        f"Mean sea ice extent {direction} from {_km2(trend['start_mean_extent_km2'])} in {trend['start_year']} "
+        f"to {_km2(trend['end_mean_extent_km2'])} in {trend['end_year']} "
+        f"({trend['change_pct']:+.1f}%). The linear trend over {trend['years_with_data']} years with data is "
+        f"{trend['slope_km2_per_year'] / 1e3:+,.0f} thousand km² per year."
+    )
+
+
+def _prediction_answer(year: int, month: int) -> Optional[str]:
+    stats = predicted_extent(year, month)
+    return (
+        f"The model predicts a sea ice extent of {_km2(stats['extent_km2'])} for "
+        f"{datetime(year, month, 1).strftime('%B %Y')} ({stats['ice_pixels']:,} pixels above "
+        f"{stats['threshold']:.0%} probability)."
+    )
+
+
+def answer_data_question(message: str) -> Optional[Dict[str, str]]:
+    """
+    Return `{"reply", "tool"}` when the message is a quantitative question with
+    a deterministic answer, otherwise None so the caller falls back to the LLM.
+    Failures inside a tool also fall back rather than surfacing an error.
+    """
+    try:
+        if EXTENT_WORDS.search(message):
+            month = _parse_month(message)
+            if month and (PREDICT_WORDS.search(message) or _after_observations(*month)):
+                return {"reply": _prediction_answer(*month), "tool": "predicted_extent"}
+
+        years = [int(year) for year in YEAR.findall(message)]
+        if TREND_WORDS.search(message) and len(set(years)) >= 2:
+            reply = _trend_answer(min(years), max(years))
+            if reply:
+                return {"reply": reply, "tool": "extent_trend"}
+
+        date_str = _parse_date(message)
+        if date_str and EXTENT_WORDS.search(message):
+            return {"reply": _extent_answer(date_str), "tool": "ice_extent"}
+
+        if COVERAGE_WORDS.search(message):
+            return {"reply": _coverage_answer(), "tool": "dataset_coverage"}
+    except Exception:
+        return None
+    return None
+
+
+def data_context_facts(message: str) -> List[str]:
+    """
+    Exact yearly figures for any years mentioned, to ground the LLM's answer.
+    Only years the datacube covers are included: this runs before every LLM
+    call and must not decode a year of rasters.
+    """
+    facts = []
+    for year in sorted({int(year) for year in YEAR.findall(message)})[:3]:
+        try:
+            stats = yearly_extent(year, cube_only=True)
+        except Exception:
+            continue
+        if stats:
+            facts.append(
+                f"In {year} the mean observed extent was {_km2(stats['mean_extent_km2'])} "
+                f"(min {_km2(stats['min_extent_km2'])}, max {_km2(stats['max_extent_km2'])}, "
+                f"{stats['snapshots']} snapshots)"
+            )
+    return facts
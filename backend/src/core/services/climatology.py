@@ -0,0 +1,379 @@
+"""
+Per-pixel ice climatology, trend and anomaly over the whole archive.
+
+One streaming pass over the catalog (reading the datacube's packed planes where
+it holds a date, otherwise the GeoTIFF) accumulates, per calendar month and
+pixel, the sufficient statistics of a least-squares fit of "is ice" against the
+year: valid observations n, sum(x), sum(x^2), sum(y) and sum(x*y), with
+x = year - BASE_YEAR.  Every statistic is a plain sum, so days that arrive
+later are folded in without revisiting the archive.  From these:
+
+    frequency = sum(y) / n                       (share of days with ice)
+    trend     = (n sum(xy) - sum(x) sum(y)) / (n sum(x^2) - sum(x)^2)   (per year)
+
+The accumulators are persisted to CLIMATOLOGY_PATH together with the source
+files they include.  Requests only ever read the last saved copy; when the
+catalog changes a background thread brings it up to date (adding new dates, or
+rebuilding from scratch if a file already counted was modified or removed).
+
+Build ahead of serving (the first pass reads every raster) with:
+
+    cd backend
+    python -m src.core.services.climatology
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import rasterio
+from rasterio.transform import xy as transform_xy
+from rasterio.warp import transform as warp_transform
+
+from ..converter import BLOCKED_CODES, ICE_CODES, GeoDataConversionError, _load_raster
+from ..datacube import ICE_PLANE, MISSING_PLANE, POLE_PLANE, _source_info, open_datacube
+from ..metrics import stage
+from .ice_extent import DATASET_ROOT, _normalise_date, catalog_version, find_dataset_path, scan_available_dates
+from .stats import _cell_area_km2
+
+logger = logging.getLogger(__name__)
+
+CLIMATOLOGY_PATH = Path(os.environ.get("ICE_CLIMATOLOGY_PATH", DATASET_ROOT / "climatology.npz")).resolve()
+
+CLIMATOLOGY_VERSION = 1
+BASE_YEAR = 1970
+STATISTICS = ("n", "sx", "sxx", "sy", "sxy")
+# |anomaly| at or above which a pixel is listed in the anomaly geometry.
+ANOMALY_GEOMETRY_MIN = 0.5
+
+
+class ClimatologyUnavailable(RuntimeError):
+    """Raised when there are rasters but no climatology has been built from them yet."""
+
+
+class Climatology:
+    """Accumulated per-month statistics plus the grid and the sources they cover."""
+
+    def __init__(self, height: int, width: int, transform: rasterio.Affine, crs: rasterio.crs.CRS) -> None:
+        self.height = height
+        self.width = width
+        self.transform = transform
+        self.crs = crs
+        self.sums = {name: np.zeros((12, height, width), dtype=np.int32) for name in STATISTICS}
+        self.sources: Dict[str, Dict] = {}
+        self._derived: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+
+    def copy(self) -> "Climatology":
+        clone = Climatology(*self.grid)
+        clone.sums = {name: sums.copy() for name, sums in self.sums.items()}
+        clone.sources = dict(self.sources)
+        return clone
+
+    @property
+    def grid(self) -> Tuple:
+        return self.height, self.width, self.transform, self.crs
+
+    def add(self, month: int, year: int, ice_days: np.ndarray, valid_days: np.ndarray) -> None:
+        """Fold per-pixel counts of ice and valid days observed in one `year`-`month` into the sums."""
+        x = year - BASE_YEAR
+        m = month - 1
+        self.sums["n"][m] += valid_days
+        self.sums["sx"][m] += x * valid_days
+        self.sums["sxx"][m] += x * x * valid_days
+        self.sums["sy"][m] += ice_days
+        self.sums["sxy"][m] += x * ice_days
+        self._derived.pop(m, None)
+
+    def month_fields(self, month: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(frequency, trend per year) float32 grids for a calendar month; NaN where undefined."""
+        m = month - 1
+        derived = self._derived.get(m)
+        if derived is None:
+            n, sx, sxx, sy, sxy = (self.sums[name][m].astype(np.float64) for name in STATISTICS)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                frequency = np.where(n > 0, sy / n, np.nan)
+                denominator = n * sxx - sx * sx
+                trend = np.where(denominator > 0, (n * sxy - sx * sy) / denominator, np.nan)
+            derived = frequency.astype(np.float32), trend.astype(np.float32)
+            for grid in derived:
+                grid.flags.writeable = False
+            self._derived[m] = derived
+        return derived
+
+    def save(self, path: Path) -> None:
+        meta = {
+            "version": CLIMATOLOGY_VERSION,
+            "base_year": BASE_YEAR,
+            "height": self.height,
+            "width": self.width,
+            "transform": list(self.transform)[:6],
+            "crs": self.crs.to_string(),
+            "sources": self.sources,
+        }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        with open(tmp_path, "wb") as fh:
+            np.savez(fh, meta=np.array(json.dumps(meta)), **self.sums)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["Climatology"]:
+        if not path.exists():
+            return None
+        try:
+            with np.load(path) as data:
+                meta = json.loads(str(data["meta"]))
+                if meta.get("version") != CLIMATOLOGY_VERSION or meta.get("base_year") != BASE_YEAR:
+                    return None
+                climatology = cls(
+                    int(meta["height"]), int(meta["width"]),
+                    rasterio.Affine(*meta["transform"]), rasterio.crs.CRS.from_string(meta["crs"]),
+                )
+                for name in STATISTICS:
+                    climatology.sums[name] = data[name].astype(np.int32)
+        except (OSError, KeyError, ValueError) as exc:
+            logger.warning("Ignoring climatology at %s: %s", path, exc)
+            return None
+        climatology.sources = meta["sources"]
+        return climatology
+
+
+def _observation(iso: str, path: Path, cube) -> Tuple[np.ndarray, np.ndarray, Tuple]:
+    """(ice, valid) boolean grids for one date plus its grid, without touching the request caches."""
+    if cube is not None and cube.has(iso, path):
+        shape = (cube.height, cube.width)
+        ice = cube.plane(iso, ICE_PLANE) | cube.plane(iso, POLE_PLANE)
+        valid = ~cube.plane(iso, MISSING_PLANE) & (cube.static == 0)
+        return ice, valid, (*shape, cube.transform, cube.crs)
+    data, transform, crs = _load_raster(path)
+    return np.isin(data, ICE_CODES), ~np.isin(data, BLOCKED_CODES), (*data.shape, transform, crs)
+
+
+def _accumulate(climatology: Optional[Climatology], paths: Dict[str, Path]) -> Optional[Climatology]:
+    """
+    Stream `paths` (date -> raster) in date order into `climatology`, creating
+    it from the first raster if needed.  Days are counted per (year, month)
+    and folded in once per month.
+    """
+    cube = open_datacube()
+    bucket = ice_days = valid_days = None
+
+    def flush() -> None:
+        if bucket is not None:
+            climatology.add(bucket[1], bucket[0], ice_days, valid_days)
+
+    for iso in sorted(paths):
+        path = paths[iso]
+        try:
+            with stage("climatology", "read"):
+                ice, valid, grid = _observation(iso, path, cube)
+        except GeoDataConversionError as exc:
+            # Not recorded as a source, so it is retried on the next update.
+            logger.warning("Skipping %s: %s", path, exc)
+            continue
+        if climatology is None:
+            climatology = Climatology(*grid)
+        if grid != climatology.grid:
+            logger.warning("Skipping %s: raster grid differs from the climatology grid", path)
+        else:
+            key = (int(iso[:4]), int(iso[5:7]))
+            if key != bucket:
+                flush()
+                bucket = key
+                ice_days = np.zeros(ice.shape, dtype=np.int32)
+                valid_days = np.zeros(ice.shape, dtype=np.int32)
+            with stage("climatology", "accumulate"):
+                valid_days += valid
+                ice_days += ice & valid
+        climatology.sources[iso] = _source_info(path)
+    flush()
+    return climatology
+
+
+_STATE: Dict = {"version": None, "climatology": None, "mtime_ns": None, "updating": False}
+_STATE_LOCK = threading.Lock()
+
+
+def update_climatology(path: Path = CLIMATOLOGY_PATH, rebuild: bool = False) -> Optional[Climatology]:
+    """
+    Bring the persisted climatology in line with the catalog: add new dates,
+    or rebuild when a counted raster changed or disappeared.  Returns None
+    when there is no data at all.
+    """
+    paths = {iso: find_dataset_path(iso) for iso in scan_available_dates()}
+    climatology = None if rebuild else (_STATE["climatology"] or Climatology.load(path))
+    if climatology is not None:
+        stale = [
+            iso for iso, source in climatology.sources.items()
+            if iso not in paths or not paths[iso].exists() or _source_info(paths[iso]) != source
+        ]
+        if stale:
+            logger.info("Rebuilding climatology: %d counted rasters changed or were removed", len(stale))
+            climatology = None
+
+    new = {iso: p for iso, p in paths.items() if climatology is None or iso not in climatology.sources}
+    if new:
+        logger.info("Adding %d rasters to the climatology", len(new))
+        # Never modify the instance being served; readers hold no lock.
+        climatology = _accumulate(climatology.copy() if climatology is not None else None, new)
+        climatology.save(path)
+    return climatology
+
+
+def _saved_mtime_ns(path: Path) -> Optional[int]:
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+def _update_in_background() -> None:
+    climatology = None
+    try:
+        climatology = update_climatology()
+    except Exception:
+        logger.exception("Climatology update failed")
+    finally:
+        with _STATE_LOCK:
+            if climatology is not None:
+                _STATE["climatology"] = climatology
+                _STATE["mtime_ns"] = _saved_mtime_ns(CLIMATOLOGY_PATH)
+            _STATE["updating"] = False
+
+
+def get_climatology() -> Climatology:
+    """
+    The last saved climatology, reloaded when the file changes (e.g. after the
+    CLI ran).  It is never rebuilt on the request path: a catalog change starts
+    one background update and requests keep the current copy meanwhile.
+    Raises FileNotFoundError when there are no rasters and
+    ClimatologyUnavailable while the first build is still running.
+    """
+    version = catalog_version()
+    mtime_ns = _saved_mtime_ns(CLIMATOLOGY_PATH)
+    with _STATE_LOCK:
+        if mtime_ns is not None and mtime_ns != _STATE["mtime_ns"] and not _STATE["updating"]:
+            _STATE["climatology"] = Climatology.load(CLIMATOLOGY_PATH) or _STATE["climatology"]
+            _STATE["mtime_ns"] = mtime_ns
+        if _STATE["version"] != version and not _STATE["updating"]:
+            _STATE["version"] = version
+            _STATE["updating"] = True
+            threading.Thread(target=_update_in_background, name="climatology-update", daemon=True).start()
+        climatology = _STATE["climatology"]
+    if climatology is None:
+        if not scan_available_dates():
+            raise FileNotFoundError(f"No GeoTIFFs found under {DATASET_ROOT}")
+        raise ClimatologyUnavailable(
+            "The climatology is still being built; retry shortly, or build it ahead of serving with "
+            "`python -m src.core.services.climatology`."
+        )
+    return climatology
+
+
+def _pixel_features(mask: np.ndarray, transform, crs, **values: np.ndarray) -> Dict:
+    """FeatureCollection of lon/lat points at the pixels set in `mask`, with per-pixel values."""
+    rows, cols = np.nonzero(mask)
+    if rows.size == 0:
+        return {"type": "FeatureCollection", "features": []}
+    xs, ys = transform_xy(transform, rows, cols)
+    lons, lats = warp_transform(crs, "EPSG:4326", np.asarray(xs), np.asarray(ys))
+    columns = {name: np.round(grid[rows, cols].astype(np.float64), 4).tolist() for name, grid in values.items()}
+    features = []
+    for i, (lon, lat) in enumerate(zip(np.round(lons, 5).tolist(), np.round(lats, 5).tolist())):
+        properties = {"row": int(rows[i]), "col": int(cols[i])}
+        properties.update({name: column[i] for name, column in columns.items()})
+        features.append({
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": [lon, lat]},
+            "properties": properties,
+        })
+    return {"type": "FeatureCollection", "features": features}
+
+
+def _years_covered(climatology: Climatology, month: int) -> List[int]:
+    return sorted({int(iso[:4]) for iso in climatology.sources if int(iso[5:7]) == month})
+
+
+def climatology_summary(month: Optional[int] = None, geometry: bool = False) -> Dict:
+    """
+    Expected extent (sum of per-pixel ice frequency) and its trend per
+    calendar month, or for one `month` with optional per-pixel geometry.
+    """
+    climatology = get_climatology()
+    cell_km2 = _cell_area_km2(climatology.transform)
+    months = [month] if month is not None else list(range(1, 13))
+    summaries = []
+    for m in months:
+        frequency, trend = climatology.month_fields(m)
+        years = _years_covered(climatology, m)
+        summary = {
+            "month": m,
+            "years": [years[0], years[-1]] if years else None,
+            "observations": len([iso for iso in climatology.sources if int(iso[5:7]) == m]),
+            "mean_extent_km2": float(np.nansum(frequency)) * cell_km2,
+            "trend_km2_per_year": float(np.nansum(trend)) * cell_km2,
+        }
+        if geometry:
+            summary["feature_collection"] = _pixel_features(
+                np.nan_to_num(frequency) > 0, climatology.transform, climatology.crs,
+                frequency=frequency, trend=np.nan_to_num(trend),
+            )
+        summaries.append(summary)
+    return {"pixel_area_km2": cell_km2, "months": summaries}
+
+
+def anomaly(date_str: str, geometry: bool = False) -> Dict:
+    """
+    Observed ice on `date_str` against the climatological frequency of its
+    calendar month: per pixel, anomaly = ice (0/1) - frequency.
+    """
+    _normalise_date(date_str)
+    path = find_dataset_path(date_str)
+    climatology = get_climatology()
+    ice, valid, grid = _observation(date_str, path, open_datacube())
+    if grid != climatology.grid:
+        raise ValueError(f"Raster for {date_str} is on a different grid than the climatology.")
+
+    month = int(date_str[5:7])
+    frequency, _ = climatology.month_fields(month)
+    defined = valid & ~np.isnan(frequency)
+    values = np.where(defined, ice.astype(np.float32) - frequency, np.nan).astype(np.float32)
+
+    cell_km2 = _cell_area_km2(climatology.transform)
+    observed = int((ice & defined).sum())
+    expected = float(frequency[defined].sum())
+    result = {
+        "date": date_str,
+        "month": month,
+        "observed_extent_km2": observed * cell_km2,
+        "climatology_extent_km2": expected * cell_km2,
+        "anomaly_km2": (observed - expected) * cell_km2,
+        "unexpected_ice_pixels": int((defined & ice & (frequency < 0.5)).sum()),
+        "missing_ice_pixels": int((defined & ~ice & (frequency >= 0.5)).sum()),
+    }
+    if geometry:
+        result["feature_collection"] = _pixel_features(
+            defined & (np.abs(np.nan_to_num(values)) >= ANOMALY_GEOMETRY_MIN),
+            climatology.transform, climatology.crs, anomaly=values, frequency=frequency,
+        )
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build or update the ice climatology.")
+    parser.add_argument("--rebuild", action="store_true", help="discard the saved sums and start over")
+    args = parser.parse_args()
+    climatology = update_climatology(rebuild=args.rebuild)
+    if climatology is None:
+        raise SystemExit(f"No GeoTIFFs found under {DATASET_ROOT}")
+    print(f"Climatology over {len(climatology.sources)} rasters saved to {CLIMATOLOGY_PATH}")
+
+
+if __name__ == "__main__":
+    main()
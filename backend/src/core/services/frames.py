@@ -0,0 +1,167 @@
+"""
+Delta-encoded ice frames for date-range playback.
+
+`/ice_extent/frames` streams one binary document: a header with the grid, the
+first date's ice pixels as a keyframe, then for every following date only the
+pixels that turned ice (added) and stopped being ice (removed).  Pixel indices
+(`row * width + col`) are sorted, gap-encoded and written as LEB128 varints, so
+a sparse day-to-day change costs one or two bytes per changed pixel.
+
+Layout (integers little-endian):
+
+    header   b"ICEF", u8 version, u16 height, u16 width, u32 frames,
+             6 x f64 affine transform (a, b, c, d, e, f),
+             varint n + n bytes CRS (UTF-8)
+    frame    8 bytes date (ASCII YYYYMMDD), u8 kind (0 keyframe, 1 delta),
+             keyframe: pixel list; delta: added list, removed list
+    list     varint count, then count varints: first index, then gaps
+    trailer  b"ICEE", u32 frames
+
+Headers are sent before the last date is read, so an error part way through
+ends the stream early; the trailer is only written after every frame, and
+`decode_frames` (the reference decoder) rejects documents without it.
+"""
+from __future__ import annotations
+
+import struct
+from typing import Iterator, List, Tuple
+
+import numpy as np
+
+from ..metrics import stage
+from .change import observed_packed_mask
+from .ice_extent import _normalise_date, find_dataset_path, scan_available_dates
+
+FRAMES_MAGIC = b"ICEF"
+FRAMES_VERSION = 2
+FRAMES_END = b"ICEE"
+FRAME_KEY, FRAME_DELTA = 0, 1
+_HEADER = struct.Struct("<4sBHHI6d")
+_TRAILER = struct.Struct("<4sI")
+
+
+def _varints(values: np.ndarray) -> bytes:
+    """LEB128-encode non-negative integers (< 2**35) in one vectorised pass."""
+    values = np.asarray(values, dtype=np.uint64)
+    if values.size == 0:
+        return b""
+    sizes = np.ones(values.size, dtype=np.int64)
+    for shift in (7, 14, 21, 28):
+        sizes += values >= (1 << shift)
+    starts = np.cumsum(sizes) - sizes
+    out = np.empty(int(sizes.sum()), dtype=np.uint8)
+    for k in range(int(sizes.max())):
+        present = sizes > k
+        chunk = (values[present] >> np.uint64(7 * k)) & np.uint64(0x7F)
+        more = (sizes[present] > k + 1).astype(np.uint64) << np.uint64(7)
+        out[starts[present] + k] = (chunk | more).astype(np.uint8)
+    return out.tobytes()
+
+
+def _varint(value: int) -> bytes:
+    return _varints(np.array([value]))
+
+
+def _set_bits(packed: np.ndarray) -> np.ndarray:
+    """Sorted indices of the set bits in a packbits array, unpacking only non-zero bytes."""
+    byte_index = np.flatnonzero(packed)
+    rows, bits = np.nonzero(np.unpackbits(packed[byte_index]).reshape(-1, 8))
+    return byte_index[rows] * 8 + bits
+
+
+def _pixel_list(packed: np.ndarray) -> bytes:
+    indices = _set_bits(packed)
+    return _varint(indices.size) + _varints(np.diff(indices, prepend=0))
+
+
+def frame_dates(start: str, end: str) -> List[str]:
+    """Available observation dates in [start, end]."""
+    _normalise_date(start)
+    _normalise_date(end)
+    if start > end:
+        raise ValueError("start must not be after end.")
+    return [date for date in scan_available_dates() if start <= date <= end]
+
+
+def encode_frames(dates: List[str], radius_km: float = 500) -> Iterator[bytes]:
+    """
+    Yield the encoded document for `dates` chunk by chunk, holding only the
+    previous date's packed mask.  Paths are resolved up front so a missing
+    raster fails before anything is sent.
+    """
+    paths = [str(find_dataset_path(date)) for date in dates]
+    previous = grid = None
+    for date, path in zip(dates, paths):
+        packed, (height, width), transform, crs = observed_packed_mask(path, radius_km)
+        with stage("frames", "encode"):
+            chunk = b""
+            if previous is None:
+                crs_bytes = crs.to_string().encode()
+                chunk += _HEADER.pack(
+                    FRAMES_MAGIC, FRAMES_VERSION, height, width, len(dates), *list(transform)[:6]
+                )
+                chunk += _varint(len(crs_bytes)) + crs_bytes
+                chunk += date.replace("-", "").encode() + bytes([FRAME_KEY]) + _pixel_list(packed)
+                grid = (height, width, transform)
+            else:
+                if (height, width, transform) != grid:
+                    raise ValueError(f"Raster for {date} is on a different grid.")
+                changed = packed ^ previous
+                chunk += date.replace("-", "").encode() + bytes([FRAME_DELTA])
+                chunk += _pixel_list(changed & packed) + _pixel_list(changed & previous)
+        previous = packed
+        yield chunk
+    yield _TRAILER.pack(FRAMES_END, len(dates))
+
+
+def _read_varint(data: memoryview, pos: int) -> Tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def _read_list(data: memoryview, pos: int) -> Tuple[np.ndarray, int]:
+    count, pos = _read_varint(data, pos)
+    gaps = np.empty(count, dtype=np.int64)
+    for i in range(count):
+        gaps[i], pos = _read_varint(data, pos)
+    return np.cumsum(gaps), pos
+
+
+def decode_frames(data: bytes) -> Iterator[Tuple[str, np.ndarray]]:
+    """
+    Yield (YYYY-MM-DD, boolean (H, W) ice mask) for every frame of an encoded
+    document.  Raises ValueError up front if the document is truncated.
+    """
+    view = memoryview(data)
+    if len(view) < _HEADER.size + _TRAILER.size:
+        raise ValueError("Truncated ICEF document.")
+    magic, version, height, width, count, *_ = _HEADER.unpack_from(view, 0)
+    if magic != FRAMES_MAGIC or version != FRAMES_VERSION:
+        raise ValueError(f"Not an ICEF v{FRAMES_VERSION} document.")
+    end, end_count = _TRAILER.unpack_from(view, len(view) - _TRAILER.size)
+    if end != FRAMES_END or end_count != count:
+        raise ValueError("Truncated ICEF document: missing end marker.")
+    crs_length, pos = _read_varint(view, _HEADER.size)
+    pos += crs_length
+
+    mask = np.zeros(height * width, dtype=bool)
+    for _ in range(count):
+        token = bytes(view[pos:pos + 8]).decode()
+        kind = view[pos + 8]
+        pos += 9
+        if kind == FRAME_KEY:
+            pixels, pos = _read_list(view, pos)
+            mask[:] = False
+            mask[pixels] = True
+        else:
+            added, pos = _read_list(view, pos)
+            removed, pos = _read_list(view, pos)
+            mask[added] = True
+            mask[removed] = False
+        yield f"{token[:4]}-{token[4:6]}-{token[6:]}", mask.reshape(height, width).copy()
@@ -2,8 +2,10 @@ from __future__ import annotations
 
 import os
 import re
+import threading
+import time
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Tuple
 
 from ..converter import convert_tif_to_geojson
 
@@ -11,7 +13,15 @@ DATASET_ROOT = Path(
     os.environ.get("ICE_DATASET_DIR", Path(__file__).resolve().parent.parent.parent.parent / "datasets")
 ).resolve()
 
+# How often (seconds) the catalog re-checks the dataset directories for changes.
+CATALOG_REFRESH_SECONDS = float(os.environ.get("ICE_CATALOG_REFRESH_SECONDS", "30"))
+
 DATE_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+TOKEN_PATTERN = re.compile(r"(\d{8})")
+
+# Date -> GeoTIFF index, rebuilt only when the directory fingerprint changes.
+_CATALOG: Dict = {"signature": None, "checked_at": None, "version": 0, "paths": {}}
+_CATALOG_LOCK = threading.Lock()
 
 
 def _normalise_date(value: str) -> str:
@@ -20,28 +30,80 @@ def _normalise_date(value: str) -> str:
     return value.replace("-", "")
 
 
-def scan_available_dates() -> List[str]:
-    dates: List[str] = []
-    for path in DATASET_ROOT.rglob("*.tif"):
-        stem = path.stem
-        m = re.search(r"(\d{8})", stem)
+def _catalog_signature() -> Tuple:
+    """
+    Fingerprint the dataset tree from directory mtimes only.  Adding or
+    removing a file updates its parent directory's mtime, so this notices new
+    rasters without listing every file.  Every directory is visited, matching
+    the unbounded `rglob` of `_build_catalog`.
+    """
+    if not DATASET_ROOT.exists():
+        return ()
+    signature = []
+    for directory, _, _ in os.walk(DATASET_ROOT):
+        try:
+            signature.append((directory, os.stat(directory).st_mtime_ns))
+        except OSError:
+            continue
+    return tuple(sorted(signature))
+
+
+def _build_catalog() -> Dict[str, Path]:
+    paths: Dict[str, Path] = {}
+    for path in sorted(DATASET_ROOT.rglob("*.tif")):
+        m = TOKEN_PATTERN.search(path.stem)
         if not m:
             continue
-        y, mo, d = m.group(1)[:4], m.group(1)[4:6], m.group(1)[6:8]
-        dates.append(f"{y}-{mo}-{d}")
-    return sorted(set(dates))
+        token = m.group(1)
+        iso = f"{token[:4]}-{token[4:6]}-{token[6:8]}"
+        # Prefer files whose name starts with the date when several match.
+        if iso not in paths or (path.stem.startswith(token) and not paths[iso].stem.startswith(token)):
+            paths[iso] = path
+    return paths
+
+
+def _catalog() -> Dict[str, Path]:
+    with _CATALOG_LOCK:
+        now = time.monotonic()
+        checked_at = _CATALOG["checked_at"]
+        if checked_at is not None and now - checked_at < CATALOG_REFRESH_SECONDS:
+            return _CATALOG["paths"]
+
+        signature = _catalog_signature()
+        if signature != _CATALOG["signature"]:
+            _CATALOG["paths"] = _build_catalog()
+            _CATALOG["signature"] = signature
+            _CATALOG["version"] += 1
+        _CATALOG["checked_at"] = now
+        return _CATALOG["paths"]
+
+
+def catalog_version() -> int:
+    """Monotonic counter bumped every time the dataset catalog changes."""
+    _catalog()
+    return _CATALOG["version"]
+
+
+def refresh_catalog() -> None:
+    """Force the next catalog access to re-check the dataset directories."""
+    with _CATALOG_LOCK:
+        _CATALOG["checked_at"] = None
+
+
+def scan_available_dates() -> List[str]:
+    return sorted(_catalog())
 
 
 def find_dataset_path(date_str: str) -> Path:
-    token = _normalise_date(date_str)
-    candidates = sorted(DATASET_ROOT.rglob(f"*{token}*.tif"))
-    if not candidates:
+    _normalise_date(date_str)
+    path = _catalog().get(date_str)
+    if path is None:
+        # The file may have landed since the last check; look again once.
+        refresh_catalog()
+        path = _catalog().get(date_str)
+    if path is None:
         raise FileNotFoundError(f"No GeoTIFF found for {date_str} under {DATASET_ROOT}")
-    if len(candidates) > 1:
-        exact = [path for path in candidates if path.stem.startswith(token)]
-        if exact:
-            return exact[0]
-    return candidates[0]
+    return path
 
 
 def get_ice_extent_geojson(date_str: str, radius_km: float) -> Dict:
@@ -50,9 +112,6 @@ def get_ice_extent_geojson(date_str: str, radius_km: float) -> Dict:
 
 
 def get_datasets_for_year(year: int) -> List[Path]:
-    year_dir = DATASET_ROOT / str(year)
-    if not year_dir.exists():
-        return []
-    
-    paths = sorted(year_dir.rglob("*.tif"))
-    return paths
+    prefix = f"{year:04d}-"
+    catalog = _catalog()
+    return [catalog[iso] for iso in sorted(catalog) if iso.startswith(prefix)]
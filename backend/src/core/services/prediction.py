@@ -1,18 +1,21 @@
 from __future__ import annotations
 
+import json
 import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Tuple
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
 
 import numpy as np
 import rasterio
-import torch
-import geopandas as gpd
 from rasterio.transform import xy as transform_xy
-from shapely.geometry import Point
-import json
+
+from ..metrics import MODEL_LOAD_SECONDS, MODEL_LOADS, record_stage, stage
 
 
 class PredictionError(RuntimeError):
@@ -26,126 +29,314 @@ MODEL_ROOT = Path(
     )
 ).resolve()
 MODEL_PATH = MODEL_ROOT / "rbf_model_2015_2025_spatiotemporal.npz"
-DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
+# numpy (default) or torch; torch is only imported when selected.
+INFERENCE_BACKEND = os.environ.get("ICE_INFERENCE_BACKEND", "numpy")
+# Fused point prediction: valid pixels per block and threads evaluating blocks.
+INFERENCE_BLOCK = int(os.environ.get("ICE_INFERENCE_BLOCK", "4096"))
+INFERENCE_THREADS = int(os.environ.get("ICE_INFERENCE_THREADS", str(min(4, os.cpu_count() or 1))))
 
-# Global model state
+# Global model state; replaced as a whole once fully loaded.
 _MODEL_DATA = {}
+_MODEL_LOCK = threading.Lock()
+
+# Probability grids keyed by (year, month), shared by every threshold/radius.
+PROB_FIELD_CACHE_SIZE = 24
+_PROB_FIELDS: "OrderedDict[Tuple[int, int], np.ndarray]" = OrderedDict()
+_PROB_FIELDS_LOCK = threading.Lock()
+
+# A backend factory takes (weights (pixels, samples) float32, training
+# features t (samples, 3) float32, gamma) and returns a function mapping query
+# features (months, 3) and an optional slice of pixel rows to raw predictions
+# (pixels, months) as a NumPy array.
+Predictor = Callable[..., np.ndarray]
+
+_INFERENCE_POOL: Optional[ThreadPoolExecutor] = None
+_INFERENCE_POOL_LOCK = threading.Lock()
+
+
+def _rbf_kernel(x1: np.ndarray, x2: np.ndarray, gamma: float) -> np.ndarray:
+    diff = x1[:, None, :] - x2[None, :, :]
+    return np.exp(-gamma * np.sum(diff ** 2, axis=2))
+
+
+def _numpy_backend(weights: np.ndarray, t: np.ndarray, gamma: float) -> Predictor:
+    def predict(t_next: np.ndarray, rows: slice = slice(None)) -> np.ndarray:
+        return weights[rows] @ _rbf_kernel(t, t_next, gamma).astype(np.float32)
+
+    return predict
+
+
+def _torch_backend(weights: np.ndarray, t: np.ndarray, gamma: float) -> Predictor:
+    try:
+        import torch
+    except ImportError as exc:
+        raise PredictionError("ICE_INFERENCE_BACKEND=torch but torch is not installed") from exc
+
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    print(f"Using device: {device}")
+    weights_t = torch.from_numpy(weights).to(device)
+    t_t = torch.from_numpy(t).to(device)
+
+    def predict(t_next: np.ndarray, rows: slice = slice(None)) -> np.ndarray:
+        x = torch.from_numpy(t_next).to(device)
+        k_star = torch.exp(-gamma * torch.sum((t_t[:, None, :] - x[None, :, :]) ** 2, dim=2))
+        return (weights_t[rows] @ k_star).cpu().numpy()
+
+    return predict
+
+
+_INFERENCE_BACKENDS: Dict[str, Callable[[np.ndarray, np.ndarray, float], Predictor]] = {
+    "numpy": _numpy_backend,
+    "torch": _torch_backend,
+}
+
+
+def register_inference_backend(name: str, factory: Callable[[np.ndarray, np.ndarray, float], Predictor]) -> None:
+    """Register (or replace) an inference backend selectable via ICE_INFERENCE_BACKEND."""
+    _INFERENCE_BACKENDS[name] = factory
+
 
 def _load_model():
     if _MODEL_DATA:
         return
-    
-    print(f"Using device: {DEVICE}")
+    with _MODEL_LOCK:
+        if not _MODEL_DATA:
+            _load_model_locked()
+
+
+def _load_model_locked():
+    global _MODEL_DATA
     print(f"Loading model from: {MODEL_PATH}")
 
     if not MODEL_PATH.exists():
         raise PredictionError(f"Model file not found at {MODEL_PATH}")
     
+    started = time.perf_counter()
     try:
+        factory = _INFERENCE_BACKENDS.get(INFERENCE_BACKEND)
+        if factory is None:
+            raise PredictionError(f"Unknown ICE_INFERENCE_BACKEND '{INFERENCE_BACKEND}'")
+
         data = np.load(str(MODEL_PATH), allow_pickle=True)
-        weights = torch.from_numpy(data["weights"]).to(DEVICE).float()
+        weights = np.ascontiguousarray(data["weights"], dtype=np.float32)
         valid_mask = data["valid_mask"].astype(bool)
         years_arr = data["years"]
         months_arr = data["months"]
-        
-        _MODEL_DATA["weights"] = weights
-        _MODEL_DATA["valid_mask"] = valid_mask
-        _MODEL_DATA["years"] = years_arr
-        _MODEL_DATA["months"] = months_arr
-        _MODEL_DATA["alpha"] = float(data.get("alpha", 0.0))
-        _MODEL_DATA["gamma"] = float(data.get("gamma", 1.0))
-        _MODEL_DATA["H"] = int(data["H"])
-        _MODEL_DATA["W"] = int(data["W"])
+
+        # Built aside and published in one assignment, so concurrent readers
+        # (inference pool, prefetch thread) never see a partial model.
+        model = {}
+        model["valid_mask"] = valid_mask
+        model["years"] = years_arr
+        model["months"] = months_arr
+        model["alpha"] = float(data.get("alpha", 0.0))
+        model["gamma"] = float(data.get("gamma", 1.0))
+        model["H"] = int(data["H"])
+        model["W"] = int(data["W"])
         
         A, B, C, D, E, F = data["transform"].tolist()
-        _MODEL_DATA["transform"] = rasterio.Affine(A, B, C, D, E, F)
-        _MODEL_DATA["crs"] = rasterio.crs.CRS.from_string(str(data["crs"]))
+        transform = rasterio.Affine(A, B, C, D, E, F)
+        model["transform"] = transform
+        model["crs"] = rasterio.crs.CRS.from_string(str(data["crs"]))
+
+        # Flat grid index and distance from the pole of each valid pixel (the
+        # rows of `weights`), so radius filtering never needs a full-grid meshgrid.
+        valid_index = np.flatnonzero(valid_mask)
+        rows, cols = np.divmod(valid_index, valid_mask.shape[1])
+        xs = transform.c + cols * transform.a + rows * transform.b
+        ys = transform.f + cols * transform.d + rows * transform.e
+        model["valid_index"] = valid_index
+        model["valid_dist_km"] = np.sqrt(xs**2 + ys**2) / 1000.0
         
         # Precompute t
         year_norm = (years_arr - years_arr.min()) / max(1, (years_arr.max() - years_arr.min()))
         month_sin = np.sin(2 * np.pi * months_arr / 12.0)
         month_cos = np.cos(2 * np.pi * months_arr / 12.0)
-        t_features = np.stack([year_norm, month_sin, month_cos], axis=1)
-        _MODEL_DATA["t"] = torch.tensor(t_features, dtype=torch.float32, device=DEVICE)
+        t_features = np.stack([year_norm, month_sin, month_cos], axis=1).astype(np.float32)
+        model["predict"] = factory(weights, t_features, model["gamma"])
+        _MODEL_DATA = model
 
     except Exception as exc:
+        # Leave no half-loaded model behind so the next call retries.
+        _MODEL_DATA.clear()
+        if isinstance(exc, PredictionError):
+            raise
         raise PredictionError(f"Failed to load model from '{MODEL_PATH}': {exc}") from exc
 
-
-def _rbf_kernel(x1: torch.Tensor, x2: torch.Tensor, gamma: float) -> torch.Tensor:
-    diff = x1[:, None, :] - x2[None, :, :]
-    dist2 = torch.sum(diff ** 2, dim=2)
-    return torch.exp(-gamma * dist2)
+    elapsed = time.perf_counter() - started
+    MODEL_LOADS.inc()
+    MODEL_LOAD_SECONDS.set(elapsed)
+    record_stage("predict", "model_load", elapsed)
 
 
-def _get_temporal_features(date: datetime) -> torch.Tensor:
+def _get_temporal_features(dates: Sequence[datetime]) -> np.ndarray:
     years_arr = _MODEL_DATA["years"]
-    year_norm_next = (date.year - years_arr.min()) / max(1, (years_arr.max() - years_arr.min()))
-    month_sin_next = np.sin(2 * np.pi * date.month / 12.0)
-    month_cos_next = np.cos(2 * np.pi * date.month / 12.0)
-    return torch.tensor([[year_norm_next, month_sin_next, month_cos_next]], 
-                       dtype=torch.float32, device=DEVICE)
+    span = max(1, (years_arr.max() - years_arr.min()))
+    features = [
+        [
+            (date.year - years_arr.min()) / span,
+            np.sin(2 * np.pi * date.month / 12.0),
+            np.cos(2 * np.pi * date.month / 12.0),
+        ]
+        for date in dates
+    ]
+    return np.asarray(features, dtype=np.float32)
 
 
-def _predict_ice_mask(date: datetime, thresh: float = 0.5):
+def predict_probability_fields(months: Sequence[Tuple[int, int]]) -> List[np.ndarray]:
+    """
+    Ice probability grids (H, W) for several `(year, month)` keys.
+
+    Months that are not cached yet are evaluated together in a single batched
+    kernel product, which is much cheaper than one matmul per month when a
+    caller needs a run of consecutive months.
+    """
     _load_model()
-    t = _MODEL_DATA["t"]
-    t_next = _get_temporal_features(date)
-    gamma = _MODEL_DATA["gamma"]
-    weights = _MODEL_DATA["weights"]
-    
-    k_star = _rbf_kernel(t, t_next, gamma)
-    preds = (weights @ k_star).squeeze(-1).detach().cpu().numpy()
-    preds = np.clip(preds, 0, 1)
+    fields = {}
+    with _PROB_FIELDS_LOCK:
+        for key in months:
+            if key in _PROB_FIELDS:
+                _PROB_FIELDS.move_to_end(key)
+                fields[key] = _PROB_FIELDS[key]
+    missing = [key for key in dict.fromkeys(months) if key not in fields]
 
-    H, W = _MODEL_DATA["H"], _MODEL_DATA["W"]
-    valid_mask = _MODEL_DATA["valid_mask"]
-    
-    pred_prob = np.zeros((H, W), dtype=np.float32)
-    pred_prob[valid_mask] = preds
-    ice_mask = (pred_prob >= thresh) & valid_mask
+    if missing:
+        with stage("predict", "kernel"):
+            t_next = _get_temporal_features([datetime(year, month, 1) for year, month in missing])
+            preds = np.clip(_MODEL_DATA["predict"](t_next), 0, 1)
+
+        H, W = _MODEL_DATA["H"], _MODEL_DATA["W"]
+        valid_mask = _MODEL_DATA["valid_mask"]
+        for column, key in enumerate(missing):
+            pred_prob = np.zeros((H, W), dtype=np.float32)
+            pred_prob[valid_mask] = preds[:, column]
+            pred_prob.flags.writeable = False
+            fields[key] = pred_prob
+
+        with _PROB_FIELDS_LOCK:
+            for key in missing:
+                _PROB_FIELDS[key] = fields[key]
+            while len(_PROB_FIELDS) > PROB_FIELD_CACHE_SIZE:
+                _PROB_FIELDS.popitem(last=False)
+
+    return [fields[key] for key in months]
+
+
+def _predict_ice_mask(date: datetime, thresh: float = 0.5):
+    pred_prob = predict_probability_fields([(date.year, date.month)])[0]
+    ice_mask = (pred_prob >= thresh) & _MODEL_DATA["valid_mask"]
     return ice_mask, pred_prob
 
 
-def _filter_points(ice_mask: np.ndarray, pred_prob: np.ndarray, radius_km: float):
-    transform = _MODEL_DATA["transform"]
-    H, W = _MODEL_DATA["H"], _MODEL_DATA["W"]
+def _radius_mask(ice_mask: np.ndarray, radius_km: float) -> np.ndarray:
+    valid_index = _MODEL_DATA["valid_index"]
+    mask = np.zeros(ice_mask.size, dtype=bool)
+    mask[valid_index] = ice_mask.ravel()[valid_index] & (_MODEL_DATA["valid_dist_km"] > radius_km)
+    return mask.reshape(ice_mask.shape)
 
-    cols, rows = np.meshgrid(np.arange(W), np.arange(H))
-    xs = transform.c + cols * transform.a + rows * transform.b
-    ys = transform.f + cols * transform.d + rows * transform.e
-    dist_km = np.sqrt(xs**2 + ys**2) / 1000.0
-    
-    mask = ice_mask & (dist_km > radius_km)
-    rows, cols = np.where(mask)
-    probs = pred_prob[rows, cols]
-    
-    xs_filtered, ys_filtered = transform_xy(transform, rows, cols)
-    return xs_filtered, ys_filtered, probs
+
+def _inference_pool() -> ThreadPoolExecutor:
+    global _INFERENCE_POOL
+    with _INFERENCE_POOL_LOCK:
+        if _INFERENCE_POOL is None:
+            _INFERENCE_POOL = ThreadPoolExecutor(
+                max_workers=max(1, INFERENCE_THREADS), thread_name_prefix="ice-inference"
+            )
+        return _INFERENCE_POOL
+
+
+def predict_ice_points(year: int, month: int, thresh: float, radius_km: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Flat grid indices (ascending) and probabilities of the pixels predicted as
+    ice beyond `radius_km`, without building (H, W) grids.
+
+    Valid pixels are processed in blocks of INFERENCE_BLOCK on a thread pool;
+    each block runs the kernel product (or reads the cached probability field
+    when this month is already cached), clips, thresholds, applies the radius
+    and keeps only the surviving pixels.
+    """
+    _load_model()
+    with _PROB_FIELDS_LOCK:
+        field = _PROB_FIELDS.get((year, month))
+    valid_index = _MODEL_DATA["valid_index"]
+    valid_dist_km = _MODEL_DATA["valid_dist_km"]
+    if field is None:
+        predict = _MODEL_DATA["predict"]
+        t_next = _get_temporal_features([datetime(year, month, 1)])
+    else:
+        flat_field = field.ravel()
+
+    def block(start: int) -> Tuple[np.ndarray, np.ndarray]:
+        rows = slice(start, start + INFERENCE_BLOCK)
+        if field is None:
+            probs = np.clip(predict(t_next, rows)[:, 0], 0, 1)
+        else:
+            probs = flat_field[valid_index[rows]]
+        keep = (probs >= thresh) & (valid_dist_km[rows] > radius_km)
+        return valid_index[rows][keep], probs[keep]
+
+    starts = range(0, valid_index.size, max(1, INFERENCE_BLOCK))
+    with stage("predict", "kernel" if field is None else "select"):
+        if INFERENCE_THREADS > 1 and len(starts) > 1:
+            parts = list(_inference_pool().map(block, starts))
+        else:
+            parts = [block(start) for start in starts]
+    if not parts:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    return np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts])
+
+
+def _filter_points(index: np.ndarray):
+    rows, cols = np.divmod(index, _MODEL_DATA["W"])
+    if rows.size == 0:
+        return np.empty(0), np.empty(0)
+    return transform_xy(_MODEL_DATA["transform"], rows, cols)
 
 
 def _to_feature_collection(xs, ys, probs, date: datetime) -> Dict:
-    points = [Point(x, y) for x, y in zip(xs, ys)]
+    import geopandas as gpd
+    from shapely.geometry import Point
+
+    with stage("predict", "points"):
+        points = [Point(x, y) for x, y in zip(xs, ys)]
     if not points:
         return {"type": "FeatureCollection", "features": []}
 
-    gdf = gpd.GeoDataFrame(
-        {
-            "date": date.strftime("%Y-%m-%d"),
-            "pred_prob": probs.astype(float)
-        },
-        geometry=points,
-        crs=_MODEL_DATA["crs"]
-    ).to_crs(epsg=4326)
-
-    return json.loads(gdf.to_json())
+    with stage("predict", "geodataframe"):
+        gdf = gpd.GeoDataFrame(
+            {
+                "date": date.strftime("%Y-%m-%d"),
+                "pred_prob": probs.astype(float)
+            },
+            geometry=points,
+            crs=_MODEL_DATA["crs"]
+        )
+    with stage("predict", "to_crs"):
+        gdf = gdf.to_crs(epsg=4326)
+    with stage("predict", "serialize"):
+        return json.loads(gdf.to_json())
 
 
 @lru_cache(maxsize=128)
-def cached_prediction(year: int, month: int, thresh: float, radius_km: float) -> Dict:
-    # Ensure model loaded
+def predict_ice_grid(
+    year: int, month: int, thresh: float, radius_km: float
+) -> Tuple[np.ndarray, np.ndarray, rasterio.Affine, rasterio.crs.CRS]:
+    """
+    Return the radius-filtered predicted ice mask, the probability grid and the
+    model's grid metadata (transform, CRS) for the first day of `year`-`month`.
+    """
     _load_model()
     date = datetime(year, month, 1)
     ice_mask, pred_prob = _predict_ice_mask(date, thresh)
-    xs, ys, probs = _filter_points(ice_mask, pred_prob, radius_km)
-    return _to_feature_collection(xs, ys, probs, date)
\ No newline at end of file
+    with stage("predict", "mask"):
+        mask = _radius_mask(ice_mask, radius_km)
+    mask.flags.writeable = False
+    return mask, pred_prob, _MODEL_DATA["transform"], _MODEL_DATA["crs"]
+
+
+@lru_cache(maxsize=128)
+def cached_prediction(year: int, month: int, thresh: float, radius_km: float) -> Dict:
+    index, probs = predict_ice_points(year, month, thresh, radius_km)
+    with stage("predict", "transform_xy"):
+        xs, ys = _filter_points(index)
+    return _to_feature_collection(xs, ys, probs, datetime(year, month, 1))
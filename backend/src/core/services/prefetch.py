@@ -0,0 +1,196 @@
+"""
+Low-priority prefetch of the neighbours of what is being browsed.
+
+The map is browsed one step at a time (the next or previous available date,
+the next or previous forecast month), so after serving a date or a month the
+API schedules its neighbours here.  One background worker warms the existing
+`convert_tif_to_geojson` and `cached_prediction` caches with them.
+
+The queue is bounded: when it is full the oldest job is dropped, as the newest
+request says most about where the user is heading.  Jobs are dropped instead
+of run while PREFETCH_MAX_IN_FLIGHT or more map requests are in flight, not
+counting the requests that scheduled prefetches (see `request_scope`).  A job
+that is already running is not interrupted.  Every job's outcome and
+every request served from an entry that a prefetch computed is counted on
+`/metrics`.
+"""
+from __future__ import annotations
+
+import bisect
+import logging
+import os
+import threading
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Deque, Dict, Iterator, Optional, Tuple
+
+from ..converter import convert_tif_to_geojson
+from ..metrics import counter, gauge
+from .ice_extent import find_dataset_path, scan_available_dates
+from .prediction import cached_prediction
+
+logger = logging.getLogger(__name__)
+
+PREFETCH_ENABLED = os.environ.get("PREFETCH_ENABLED", "true").lower() in ("1", "true", "yes")
+PREFETCH_QUEUE_SIZE = int(os.environ.get("PREFETCH_QUEUE_SIZE", "8"))
+# Dates/months prefetched on each side of a request.
+PREFETCH_NEIGHBOURS = int(os.environ.get("PREFETCH_NEIGHBOURS", "1"))
+# Queued jobs are dropped while at least this many map requests are in flight.
+PREFETCH_MAX_IN_FLIGHT = int(os.environ.get("PREFETCH_MAX_IN_FLIGHT", "2"))
+# Prefetched keys remembered for hit accounting.
+_WARMED_KEYS = 512
+
+PREFETCH_SCHEDULED = counter("ice_prefetch_scheduled_total", "Prefetch jobs queued.", ("kind",))
+PREFETCH_JOBS = counter(
+    "ice_prefetch_jobs_total",
+    "Prefetch jobs by outcome: warmed, cached (already warm), dropped_full, dropped_busy or failed.",
+    ("kind", "outcome"),
+)
+PREFETCH_HITS = counter("ice_prefetch_hits_total", "Requests served from an entry warmed by a prefetch.", ("kind",))
+PREFETCH_QUEUE_DEPTH = gauge("ice_prefetch_queue_depth", "Prefetch jobs waiting to run.")
+
+# key: (kind, *cache arguments)
+Key = Tuple
+_CACHED: Dict[str, Callable] = {"observed": convert_tif_to_geojson, "predicted": cached_prediction}
+
+_QUEUE: Deque[Key] = deque()
+_QUEUE_COND = threading.Condition()
+_WARMED: "OrderedDict[Key, None]" = OrderedDict()
+_WORKER: Dict = {"thread": None}
+# Per-request flag set once the request schedules a prefetch, and how many such
+# requests are still open; the worker does not count them as load.
+_REQUEST: ContextVar[Optional[Dict[str, bool]]] = ContextVar("prefetch_request", default=None)
+_OPEN_TRIGGERS = {"count": 0}
+
+
+def _in_flight() -> int:
+    return 0
+
+
+def set_load_probe(probe: Callable[[], int]) -> None:
+    """Install the function returning the number of map requests in flight."""
+    global _in_flight
+    _in_flight = probe
+
+
+@contextmanager
+def request_scope() -> Iterator[None]:
+    """
+    Wrap the handling of one API request (inside its in-flight accounting) so
+    a request that schedules prefetches is not counted as load against them.
+    """
+    state = {"triggered": False}
+    token = _REQUEST.set(state)
+    try:
+        yield
+    finally:
+        _REQUEST.reset(token)
+        if state["triggered"]:
+            with _QUEUE_COND:
+                _OPEN_TRIGGERS["count"] -= 1
+
+
+def record_request(key: Key) -> None:
+    """Count a prefetch hit if `key` was warmed by a prefetch and not requested since."""
+    with _QUEUE_COND:
+        if key in _WARMED:
+            del _WARMED[key]
+            PREFETCH_HITS.inc(key[0])
+
+
+def _schedule(keys) -> None:
+    if not PREFETCH_ENABLED or PREFETCH_QUEUE_SIZE <= 0:
+        return
+    state = _REQUEST.get()
+    with _QUEUE_COND:
+        if state is not None and not state["triggered"]:
+            state["triggered"] = True
+            _OPEN_TRIGGERS["count"] += 1
+        for key in keys:
+            if key in _QUEUE or key in _WARMED:
+                continue
+            if len(_QUEUE) >= PREFETCH_QUEUE_SIZE:
+                PREFETCH_JOBS.inc(_QUEUE.popleft()[0], "dropped_full")
+            _QUEUE.append(key)
+            PREFETCH_SCHEDULED.inc(key[0])
+        PREFETCH_QUEUE_DEPTH.set(len(_QUEUE))
+        if _WORKER["thread"] is None:
+            _WORKER["thread"] = threading.Thread(target=_work, name="ice-prefetch", daemon=True)
+            _WORKER["thread"].start()
+        _QUEUE_COND.notify()
+
+
+def _run(key: Key) -> str:
+    cached = _CACHED[key[0]]
+    misses = cached.cache_info().misses
+    cached(*key[1:])
+    # No new miss means the entry was already cached (or a request raced us to it).
+    return "warmed" if cached.cache_info().misses > misses else "cached"
+
+
+def _work() -> None:
+    while True:
+        with _QUEUE_COND:
+            while not _QUEUE:
+                _QUEUE_COND.wait()
+            key = _QUEUE.popleft()
+            PREFETCH_QUEUE_DEPTH.set(len(_QUEUE))
+            triggers = _OPEN_TRIGGERS["count"]
+
+        if _in_flight() - triggers >= PREFETCH_MAX_IN_FLIGHT:
+            PREFETCH_JOBS.inc(key[0], "dropped_busy")
+            continue
+        try:
+            outcome = _run(key)
+        except Exception as exc:
+            logger.debug("Prefetch of %s failed: %s", key, exc)
+            outcome = "failed"
+        PREFETCH_JOBS.inc(key[0], outcome)
+        if outcome == "warmed":
+            with _QUEUE_COND:
+                _WARMED[key] = None
+                while len(_WARMED) > _WARMED_KEYS:
+                    _WARMED.popitem(last=False)
+
+
+def _spread(count: int):
+    """Offsets 1, -1, 2, -2, ... (forward first) up to `count` on each side."""
+    for step in range(1, count + 1):
+        yield step
+        yield -step
+
+
+def observed_key(path: str, radius_km: float) -> Key:
+    return "observed", path, radius_km
+
+
+def predicted_key(year: int, month: int, thresh: float, radius_km: float) -> Key:
+    return "predicted", year, month, thresh, radius_km
+
+
+def prefetch_observed_neighbours(date_str: str, radius_km: float) -> None:
+    """Queue conversions of the available dates next to `date_str`."""
+    if not PREFETCH_ENABLED:
+        return
+    dates = scan_available_dates()
+    position = bisect.bisect_left(dates, date_str)
+    later = position + 1 if position < len(dates) and dates[position] == date_str else position
+    keys = []
+    for step in range(PREFETCH_NEIGHBOURS):
+        for index in (later + step, position - 1 - step):
+            if 0 <= index < len(dates):
+                keys.append(observed_key(str(find_dataset_path(dates[index])), radius_km))
+    _schedule(keys)
+
+
+def prefetch_predicted_neighbours(year: int, month: int, thresh: float, radius_km: float) -> None:
+    """Queue predictions for the months next to `year`-`month`."""
+    if not PREFETCH_ENABLED:
+        return
+    keys = []
+    for offset in _spread(PREFETCH_NEIGHBOURS):
+        neighbour_year, neighbour_month = divmod(year * 12 + month - 1 + offset, 12)
+        keys.append(predicted_key(neighbour_year, neighbour_month + 1, thresh, radius_km))
+    _schedule(keys)
+
@@ -0,0 +1,291 @@
+from __future__ import annotations
+
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..converter import BLOCKED_CODES, ICE_CODES, load_raster
+from ..datacube import STATIC_CODES, open_datacube
+from ..routing import NavigationGrid, RoutingError, time_dependent_search
+from .ice_extent import catalog_version, find_dataset_path, scan_available_dates, _normalise_date
+from .prediction import PredictionError, predict_ice_grid, predict_probability_fields
+
+ROUTE_SOURCES = ("observed", "predicted")
+ROUTE_MODES = ("static", "time_dependent")
+ROUTE_ICE_PENALTY = float(os.environ.get("ROUTE_ICE_PENALTY", "8.0"))
+ROUTE_WORKERS = int(os.environ.get("ROUTE_WORKERS", str(min(8, os.cpu_count() or 1))))
+ROUTE_BATCH_MAX_PAIRS = int(os.environ.get("ROUTE_BATCH_MAX_PAIRS", "500"))
+ROUTE_MAX_MONTHS = int(os.environ.get("ROUTE_MAX_MONTHS", "6"))
+
+
+@lru_cache(maxsize=16)
+def observed_navigation_grid(path: str) -> NavigationGrid:
+    data, transform, crs = load_raster(path)
+    navigable = ~np.isin(data, BLOCKED_CODES)
+    ice = np.isin(data, ICE_CODES)
+    return NavigationGrid(navigable, ice, transform, crs, ROUTE_ICE_PENALTY)
+
+
+@lru_cache(maxsize=1)
+def _reference_land_mask(version: int) -> np.ndarray:
+    """
+    Land/coast mask (codes 253/254 only) for catalog `version`.  The
+    prediction model only knows ice probabilities, so land is taken from the
+    datacube's static layer, or the most recent observation without a cube.
+    Missing-data pixels stay navigable.
+    """
+    cube = open_datacube()
+    if cube is not None:
+        return np.isin(cube.static, STATIC_CODES)
+    dates = scan_available_dates()
+    if not dates:
+        raise FileNotFoundError("No observed rasters available to take the land mask from.")
+    data, _, _ = load_raster(str(find_dataset_path(dates[-1])))
+    return np.isin(data, STATIC_CODES)
+
+
+@lru_cache(maxsize=16)
+def _predicted_navigation_grid(year: int, month: int, thresh: float, version: int) -> NavigationGrid:
+    ice, _, transform, crs = predict_ice_grid(year, month, thresh, 0.0)
+    land = _reference_land_mask(version)
+    if land.shape != ice.shape:
+        raise PredictionError(
+            f"Predicted grid shape {ice.shape} does not match the land mask shape {land.shape}."
+        )
+    return NavigationGrid(~land, ice, transform, crs, ROUTE_ICE_PENALTY)
+
+
+def predicted_navigation_grid(year: int, month: int, thresh: float) -> NavigationGrid:
+    """Predicted grid for a month, rebuilt when the dataset catalog changes."""
+    return _predicted_navigation_grid(year, month, thresh, catalog_version())
+
+
+def resolve_route_date(date_str: Optional[str]) -> str:
+    """Default to the most recent observation when no date is requested."""
+    if date_str:
+        _normalise_date(date_str)
+        return date_str
+    dates = scan_available_dates()
+    if not dates:
+        raise FileNotFoundError("No observed rasters available to route on.")
+    return dates[-1]
+
+
+def get_navigation_grid(date_str: str, source: str = "observed", thresh: float = 0.5) -> NavigationGrid:
+    if source == "observed":
+        return observed_navigation_grid(str(find_dataset_path(date_str)))
+    if source == "predicted":
+        token = _normalise_date(date_str)
+        return predicted_navigation_grid(int(token[:4]), int(token[4:6]), thresh)
+    raise ValueError(f"Unknown source '{source}', expected one of {', '.join(ROUTE_SOURCES)}.")
+
+
+def _route_feature(
+    grid: NavigationGrid,
+    start_node: int,
+    end_node: int,
+    field: Tuple[np.ndarray, np.ndarray],
+) -> Dict:
+    dist, pred = field
+    if not np.isfinite(dist[end_node]):
+        raise RoutingError("No navigable route connects the requested points.")
+
+    summary = grid.describe_path(grid.path_nodes(pred, start_node, end_node))
+    return {
+        "type": "Feature",
+        "geometry": {"type": "LineString", "coordinates": summary.pop("coordinates")},
+        "properties": summary,
+    }
+
+
+def plan_route(
+    start: Sequence[float],
+    end: Sequence[float],
+    date_str: Optional[str] = None,
+    source: str = "observed",
+    thresh: float = 0.5,
+) -> Dict:
+    """
+    Least-cost route between two lon/lat points over the navigability grid of
+    one date, returned as a GeoJSON FeatureCollection with a single LineString.
+    """
+    date_str = resolve_route_date(date_str)
+    grid = get_navigation_grid(date_str, source, thresh)
+
+    start_node, start_snap_km = grid.snap(float(start[0]), float(start[1]))
+    end_node, end_snap_km = grid.snap(float(end[0]), float(end[1]))
+    feature = _route_feature(grid, start_node, end_node, grid.distance_field(start_node))
+    feature["properties"] = {
+        "source": source,
+        "date": date_str,
+        "ice_penalty": grid.ice_penalty,
+        "start_snap_km": start_snap_km,
+        "end_snap_km": end_snap_km,
+        **feature["properties"],
+    }
+    return {"type": "FeatureCollection", "features": [feature]}
+
+
+def plan_routes(
+    pairs: Sequence[Tuple[Sequence[float], Sequence[float]]],
+    date_str: Optional[str] = None,
+    source: str = "observed",
+    thresh: float = 0.5,
+) -> Dict:
+    """
+    Route many origin/destination pairs over one shared navigability grid.
+
+    Pairs are grouped by snapped origin so each distinct origin costs a single
+    Dijkstra search; those searches run on a worker pool and their distance
+    fields stay in the shared distance-field cache for later batches.  Pairs without a route
+    are reported with an `error` instead of failing the whole batch.
+    """
+    started = time.perf_counter()
+    date_str = resolve_route_date(date_str)
+    grid = get_navigation_grid(date_str, source, thresh)
+    grid_done = time.perf_counter()
+
+    snapped = [
+        (grid.snap(float(start[0]), float(start[1])), grid.snap(float(end[0]), float(end[1])))
+        for start, end in pairs
+    ]
+    snap_done = time.perf_counter()
+
+    origins = sorted({start_node for (start_node, _), _ in snapped})
+    hits_before = grid.field_hits
+    with ThreadPoolExecutor(max_workers=max(1, min(ROUTE_WORKERS, len(origins)))) as pool:
+        fields = dict(zip(origins, pool.map(grid.distance_field, origins)))
+    search_done = time.perf_counter()
+
+    routes = []
+    for i, ((start_node, start_snap_km), (end_node, end_snap_km)) in enumerate(snapped):
+        properties = {"pair": i, "start_snap_km": start_snap_km, "end_snap_km": end_snap_km}
+        try:
+            feature = _route_feature(grid, start_node, end_node, fields[start_node])
+        except RoutingError as exc:
+            routes.append({"type": "Feature", "geometry": None, "properties": {**properties, "error": str(exc)}})
+            continue
+        feature["properties"] = {**properties, **feature["properties"]}
+        routes.append(feature)
+    finished = time.perf_counter()
+
+    return {
+        "date": date_str,
+        "source": source,
+        "ice_penalty": grid.ice_penalty,
+        "count": len(routes),
+        "unique_origins": len(origins),
+        "distance_field_cache_hits": grid.field_hits - hits_before,
+        "timing_ms": {
+            "grid": (grid_done - started) * 1000.0,
+            "snap": (snap_done - grid_done) * 1000.0,
+            "search": (search_done - snap_done) * 1000.0,
+            "paths": (finished - search_done) * 1000.0,
+            "total": (finished - started) * 1000.0,
+        },
+        "feature_collection": {"type": "FeatureCollection", "features": routes},
+    }
+
+
+def _add_months(year: int, month: int, offset: int) -> Tuple[int, int]:
+    index = year * 12 + (month - 1) + offset
+    return index // 12, index % 12 + 1
+
+
+def _great_circle_km(start: Sequence[float], end: Sequence[float]) -> float:
+    lon1, lat1, lon2, lat2 = map(math.radians, (start[0], start[1], end[0], end[1]))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371.0 * math.asin(math.sqrt(min(1.0, a)))
+
+
+def plan_voyage(
+    start: Sequence[float],
+    end: Sequence[float],
+    departure: Optional[str] = None,
+    speed_kmh: float = 25.0,
+    thresh: float = 0.5,
+) -> Dict:
+    """
+    Earliest-arrival route over consecutive monthly predicted ice fields.
+
+    Each calendar month from the departure date onwards is an epoch with its
+    own cost grid, so a leg sailed in October is costed with October's ice and
+    the next leg with November's.  Ice slows the vessel by the ice penalty.
+    The months the voyage is likely to span are predicted in one batched
+    kernel evaluation up front; their cost grids are cached per month.
+    """
+    departure = resolve_route_date(departure)
+    depart_at = datetime.strptime(departure, "%Y-%m-%d")
+
+    months = [_add_months(depart_at.year, depart_at.month, k) for k in range(ROUTE_MAX_MONTHS)]
+    epoch_ends_h = []
+    for year, month in months[:-1]:
+        next_year, next_month = _add_months(year, month, 1)
+        epoch_ends_h.append((datetime(next_year, next_month, 1) - depart_at).total_seconds() / 3600.0)
+    epoch_ends_h.append(np.inf)
+
+    # Warm the probability fields for the expected voyage length in one batch.
+    expected_h = 2.0 * _great_circle_km(start, end) / speed_kmh
+    expected_months = 1 + sum(1 for end_h in epoch_ends_h[:-1] if end_h < expected_h)
+    predict_probability_fields(months[:expected_months])
+
+    grids: Dict[int, NavigationGrid] = {}
+
+    def grid_for_epoch(k: int) -> NavigationGrid:
+        if k not in grids:
+            grids[k] = predicted_navigation_grid(months[k][0], months[k][1], thresh)
+        return grids[k]
+
+    first = grid_for_epoch(0)
+    start_node, start_snap_km = first.snap(float(start[0]), float(start[1]))
+    end_node, end_snap_km = first.snap(float(end[0]), float(end[1]))
+
+    arrival, pred, epoch_of = time_dependent_search(
+        grid_for_epoch, epoch_ends_h, start_node, end_node, speed_kmh
+    )
+    if not np.isfinite(arrival[end_node]):
+        raise RoutingError("No navigable route connects the requested points.")
+
+    nodes = first.path_nodes(pred, start_node, end_node)
+    summary = first.describe_path(nodes)
+
+    # Ice exposure is counted against the month each cell is actually reached in.
+    rows, cols = np.divmod(np.asarray(nodes, dtype=np.int64), first.shape[1])
+    ice = np.array([grids[int(epoch_of[node])].ice[r, c] for node, r, c in zip(nodes, rows, cols)], dtype=np.float64)
+    dx_km, dy_km = first.cell_km
+    step_km = np.hypot(np.diff(rows) * dy_km, np.diff(cols) * dx_km)
+    ice_km = float((step_km * 0.5 * (ice[:-1] + ice[1:])).sum())
+    duration_h = float(arrival[end_node])
+    used = sorted({int(epoch_of[node]) for node in nodes})
+
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "geometry": {"type": "LineString", "coordinates": summary["coordinates"]},
+                "properties": {
+                    "source": "predicted",
+                    "mode": "time_dependent",
+                    "departure": departure,
+                    "arrival": (depart_at + timedelta(hours=duration_h)).isoformat(timespec="minutes"),
+                    "duration_hours": duration_h,
+                    "speed_kmh": speed_kmh,
+                    "months": [f"{months[k][0]:04d}-{months[k][1]:02d}" for k in used],
+                    "ice_penalty": first.ice_penalty,
+                    "start_snap_km": start_snap_km,
+                    "end_snap_km": end_snap_km,
+                    "distance_km": summary["distance_km"],
+                    "ice_km": ice_km,
+                    "ice_fraction": ice_km / summary["distance_km"] if summary["distance_km"] else 0.0,
+                    "arrival_hours": [float(arrival[node]) for node in nodes],
+                },
+            }
+        ],
+    }
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from functools import lru_cache
+
+from ..converter import load_ice_mask
+from ..spatial_index import IcePixelIndex
+from .ice_extent import find_dataset_path, _normalise_date
+from .prediction import predict_ice_grid
+
+INDEX_SOURCES = ("observed", "predicted")
+
+
+@lru_cache(maxsize=128)
+def observed_ice_index(path: str, radius_km: float = 500) -> IcePixelIndex:
+    mask, transform, crs = load_ice_mask(path, radius_km)
+    return IcePixelIndex(mask, transform, crs)
+
+
+@lru_cache(maxsize=128)
+def predicted_ice_index(year: int, month: int, thresh: float, radius_km: float) -> IcePixelIndex:
+    mask, pred_prob, transform, crs = predict_ice_grid(year, month, thresh, radius_km)
+    return IcePixelIndex(mask, transform, crs, values=pred_prob)
+
+
+def get_ice_index(
+    date_str: str,
+    source: str = "observed",
+    radius_km: float = 500,
+    thresh: float = 0.5,
+) -> IcePixelIndex:
+    """
+    Return the cached spatial index for an observed raster or a model
+    prediction.  Predictions are monthly, so only the year and month are used.
+    """
+    if source == "observed":
+        tif_path = find_dataset_path(date_str)
+        return observed_ice_index(str(tif_path), radius_km)
+    if source == "predicted":
+        token = _normalise_date(date_str)
+        return predicted_ice_index(int(token[:4]), int(token[4:6]), thresh, radius_km)
+    raise ValueError(f"Unknown source '{source}', expected one of {', '.join(INDEX_SOURCES)}.")
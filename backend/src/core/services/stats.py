@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from ..converter import ICE_CODES, load_raster
+from ..datacube import open_datacube
+from .ice_extent import catalog_version, find_dataset_path, scan_available_dates
+from .prediction import predict_ice_grid
+
+
+def _cell_area_km2(transform) -> float:
+    """Nominal pixel area from the grid spacing (ignores projection scale)."""
+    return abs(transform.a * transform.e) / 1e6
+
+
+@lru_cache(maxsize=512)
+def raster_extent(path: str) -> Dict:
+    data, transform, _ = load_raster(path)
+    ice_pixels = int(np.isin(data, ICE_CODES).sum())
+    return {"ice_pixels": ice_pixels, "extent_km2": ice_pixels * _cell_area_km2(transform)}
+
+
+def ice_extent_stats(date_str: str) -> Dict:
+    """Observed ice pixel count and extent (km²) for one date."""
+    stats = raster_extent(str(find_dataset_path(date_str)))
+    return {"date": date_str, **stats}
+
+
+def _year_dates(year: int) -> List[str]:
+    return [date for date in scan_available_dates() if date.startswith(f"{year:04d}-")]
+
+
+def _cube_covers(cube, dates: List[str]) -> bool:
+    return cube is not None and all(cube.has(date, find_dataset_path(date)) for date in dates)
+
+
+@lru_cache(maxsize=128)
+def _yearly_extent(year: int, version: int) -> Optional[Dict]:
+    dates = _year_dates(year)
+    if not dates:
+        return None
+    cube = open_datacube()
+    if _cube_covers(cube, dates):
+        # One sequential pass over the year's packed planes.
+        extents = cube.ice_pixel_counts(dates) * _cell_area_km2(cube.transform)
+    else:
+        extents = [ice_extent_stats(date)["extent_km2"] for date in dates]
+    return {
+        "year": year,
+        "snapshots": len(dates),
+        "mean_extent_km2": float(np.mean(extents)),
+        "min_extent_km2": float(np.min(extents)),
+        "max_extent_km2": float(np.max(extents)),
+    }
+
+
+def yearly_extent(year: int, cube_only: bool = False) -> Optional[Dict]:
+    """
+    Mean/min/max observed extent over a year, or None without data.  With
+    `cube_only`, also None unless the datacube holds every date of the year,
+    so the answer never requires decoding GeoTIFFs.
+    """
+    if cube_only and not _cube_covers(open_datacube(), _year_dates(year)):
+        return None
+    return _yearly_extent(year, catalog_version())
+
+
+def extent_trend(start_year: int, end_year: int, cube_only: bool = False) -> Optional[Dict]:
+    """
+    Change in mean yearly extent between two years plus the least-squares
+    slope (km²/year) over every year in between that has data.  With
+    `cube_only`, None unless the datacube holds every date of the span.
+    """
+    start_year, end_year = sorted((start_year, end_year))
+    if cube_only:
+        cube = open_datacube()
+        if not all(_cube_covers(cube, _year_dates(year)) for year in range(start_year, end_year + 1)):
+            return None
+    years: List[Dict] = [
+        stats for stats in (yearly_extent(year) for year in range(start_year, end_year + 1)) if stats
+    ]
+    if len(years) < 2:
+        return None
+
+    first, last = years[0], years[-1]
+    xs = np.array([stats["year"] for stats in years], dtype=np.float64)
+    ys = np.array([stats["mean_extent_km2"] for stats in years], dtype=np.float64)
+    slope = float(np.polyfit(xs, ys, 1)[0])
+    change = last["mean_extent_km2"] - first["mean_extent_km2"]
+    return {
+        "start_year": first["year"],
+        "end_year": last["year"],
+        "start_mean_extent_km2": first["mean_extent_km2"],
+        "end_mean_extent_km2": last["mean_extent_km2"],
+        "change_km2": change,
+        "change_pct": 100.0 * change / first["mean_extent_km2"] if first["mean_extent_km2"] else 0.0,
+        "slope_km2_per_year": slope,
+        "years_with_data": len(years),
+    }
+
+
+def predicted_extent(year: int, month: int, thresh: float = 0.5) -> Dict:
+    """Predicted ice pixel count and extent (km²) for a month."""
+    mask, _, transform, _ = predict_ice_grid(year, month, thresh, 0.0)
+    ice_pixels = int(mask.sum())
+    return {
+        "year": year,
+        "month": month,
+        "threshold": thresh,
+        "ice_pixels": ice_pixels,
+        "extent_km2": ice_pixels * _cell_area_km2(transform),
+    }
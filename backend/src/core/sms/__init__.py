@@ -0,0 +1,16 @@
+from .alerts import RULE_KINDS, RULE_SOURCES, AlertEngine
+from .broadcast import BroadcastManager
+from .scheduler import SMSScheduler
+from .service import SMSService, get_sms_service
+from .store import SMSStore
+
+__all__ = [
+    "AlertEngine",
+    "BroadcastManager",
+    "RULE_KINDS",
+    "RULE_SOURCES",
+    "SMSScheduler",
+    "SMSService",
+    "SMSStore",
+    "get_sms_service",
+]
@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+from rasterio.warp import transform as warp_transform
+from scipy.spatial import cKDTree
+
+from ..converter import ICE_CODES, load_raster
+from ..services.ice_extent import catalog_version, find_dataset_path, scan_available_dates
+from ..services.prediction import predict_ice_grid
+from .broadcast import BroadcastManager
+from .store import SMSStore
+from .templates import render_alert
+
+logger = logging.getLogger(__name__)
+
+RULE_KINDS = ("extent_below", "extent_above", "ice_within")
+RULE_SOURCES = ("observed", "predicted")
+
+SMS_ALERT_INTERVAL_SECONDS = float(os.environ.get("SMS_ALERT_INTERVAL_SECONDS", "300"))
+# Probability threshold used to turn the forecast into an ice mask.
+SMS_ALERT_FORECAST_THRESH = float(os.environ.get("SMS_ALERT_FORECAST_THRESH", "0.5"))
+
+OBSERVED_KEY = "alerts.observed_date"
+PREDICTED_KEY = "alerts.predicted_month"
+
+
+def _next_month(now: datetime) -> tuple[int, int]:
+    return (now.year + 1, 1) if now.month == 12 else (now.year, now.month + 1)
+
+
+def _cell_area_km2(transform) -> float:
+    return abs(transform.a * transform.e) / 1e6
+
+
+def evaluate_rules(rules: List[Dict], mask: np.ndarray, transform, crs) -> Dict[int, Dict]:
+    """
+    Evaluate rules against one ice mask; returns {rule id: fields} for every
+    rule whose condition holds.  Extent rules compare all thresholds against
+    the mask's extent in one vectorised step; proximity rules project every
+    rule location at once and query a KD-tree of ice pixel centres.
+    """
+    fired: Dict[int, Dict] = {}
+    extent_km2 = float(mask.sum()) * _cell_area_km2(transform)
+
+    for kind, compare in (("extent_below", np.less), ("extent_above", np.greater)):
+        subset = [rule for rule in rules if rule["kind"] == kind]
+        if subset:
+            thresholds = np.array([rule["threshold_km2"] for rule in subset], dtype=np.float64)
+            for index in np.nonzero(compare(extent_km2, thresholds))[0]:
+                fired[subset[index]["id"]] = {"extent_mkm2": extent_km2 / 1e6}
+
+    near = [rule for rule in rules if rule["kind"] == "ice_within"]
+    rows, cols = np.nonzero(mask)
+    if near and rows.size:
+        xs = transform.c + (cols + 0.5) * transform.a + (rows + 0.5) * transform.b
+        ys = transform.f + (cols + 0.5) * transform.d + (rows + 0.5) * transform.e
+        tree = cKDTree(np.column_stack([xs, ys]))
+        px, py = warp_transform("EPSG:4326", crs, [rule["lon"] for rule in near], [rule["lat"] for rule in near])
+        radii_m = np.array([rule["radius_km"] for rule in near], dtype=np.float64) * 1000.0
+        distances, _ = tree.query(np.column_stack([px, py]), distance_upper_bound=float(radii_m.max()))
+        for rule, distance, radius in zip(near, distances, radii_m):
+            if distance <= radius:
+                fired[rule["id"]] = {"distance_km": distance / 1000.0}
+    return fired
+
+
+class AlertEngine:
+    """
+    Evaluates per-subscriber alert rules when new data appears.
+
+    Each check only looks at what changed: the newest observed raster the
+    catalog has gained since the last check, and the next month's forecast
+    once per month.  Rules are edge-triggered (an alert fires when a
+    condition becomes true, not on every evaluation while it stays true) and
+    the resulting messages for active subscribers are sent as one broadcast.
+    """
+
+    def __init__(self, store: SMSStore, broadcasts: BroadcastManager) -> None:
+        self.store = store
+        self.broadcasts = broadcasts
+        self._catalog_version: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def add_rule(
+        self,
+        phone: str,
+        kind: str,
+        source: str = "observed",
+        threshold_km2: Optional[float] = None,
+        lon: Optional[float] = None,
+        lat: Optional[float] = None,
+        radius_km: Optional[float] = None,
+    ) -> Dict:
+        if kind not in RULE_KINDS:
+            raise ValueError(f"kind must be one of {', '.join(RULE_KINDS)}")
+        if source not in RULE_SOURCES:
+            raise ValueError(f"source must be one of {', '.join(RULE_SOURCES)}")
+        if kind == "ice_within":
+            if lon is None or lat is None or radius_km is None:
+                raise ValueError("ice_within rules need lon, lat and radius_km")
+            if not (-180 <= float(lon) <= 180 and -90 <= float(lat) <= 90) or float(radius_km) <= 0:
+                raise ValueError("lon/lat out of range or radius_km not positive")
+            lon, lat, radius_km, threshold_km2 = float(lon), float(lat), float(radius_km), None
+        else:
+            if threshold_km2 is None:
+                raise ValueError(f"{kind} rules need threshold_km2")
+            threshold_km2, lon, lat, radius_km = float(threshold_km2), None, None, None
+        return self.store.add_rule({
+            "phone": phone, "kind": kind, "source": source,
+            "threshold_km2": threshold_km2, "lon": lon, "lat": lat, "radius_km": radius_km,
+        })
+
+    def check(self, force: bool = False) -> Dict:
+        """Evaluate whatever changed since the last check; returns a summary."""
+        with self._lock:
+            summary = {"observed": None, "predicted": None, "alerts": 0, "job_id": None}
+            messages: List[Dict] = []
+
+            version = catalog_version()
+            if force or version != self._catalog_version:
+                dates = scan_available_dates()
+                last = self.store.get_meta(OBSERVED_KEY)
+                if dates and (force or last is None or dates[-1] > last):
+                    messages += self._evaluate("observed", dates[-1])
+                    self.store.set_meta(OBSERVED_KEY, dates[-1])
+                    summary["observed"] = dates[-1]
+                self._catalog_version = version
+
+            year, month = _next_month(datetime.now())
+            month_key = f"{year:04d}-{month:02d}"
+            if force or self.store.get_meta(PREDICTED_KEY) != month_key:
+                messages += self._evaluate("predicted", month_key)
+                self.store.set_meta(PREDICTED_KEY, month_key)
+                summary["predicted"] = month_key
+
+            if messages:
+                job = self.broadcasts.submit(messages, description="alerts")
+                summary["job_id"] = job["id"]
+            summary["alerts"] = len(messages)
+            return summary
+
+    def evaluate_observed(self, date_str: str) -> Dict:
+        """Evaluate observed rules for one specific date and send any alerts."""
+        find_dataset_path(date_str)
+        with self._lock:
+            messages = self._evaluate("observed", date_str)
+            job = self.broadcasts.submit(messages, description=f"alerts {date_str}") if messages else None
+            return {"observed": date_str, "alerts": len(messages), "job_id": job["id"] if job else None}
+
+    def _evaluate(self, source: str, key: str) -> List[Dict]:
+        rules = [rule for rule in self.store.rules() if rule["source"] == source]
+        if not rules:
+            return []
+        try:
+            if source == "observed":
+                data, transform, crs = load_raster(str(find_dataset_path(key)))
+                # Same ice definition (pole hole included) as the extent in the SMS reports.
+                mask = np.isin(data, ICE_CODES)
+                when = datetime.strptime(key, "%Y-%m-%d")
+            else:
+                year, month = map(int, key.split("-"))
+                mask, _, transform, crs = predict_ice_grid(year, month, SMS_ALERT_FORECAST_THRESH, 0.0)
+                when = key[5:7] + "/" + key[:4]
+        except Exception as exc:
+            logger.error("Alert evaluation for %s %s failed: %s", source, key, exc)
+            return []
+
+        fired = evaluate_rules(rules, mask, transform, crs)
+        cleared = [rule["id"] for rule in rules if rule["id"] not in fired and rule["triggered"]]
+        self.store.set_rules_triggered(cleared, False)
+        # Only rules this process moved to triggered alert, so workers sharing the store send once.
+        claimed = set(self.store.claim_rules_triggered(
+            [rule["id"] for rule in rules if rule["id"] in fired], fired_at=datetime.now().isoformat()
+        ))
+        newly_fired = [rule for rule in rules if rule["id"] in claimed]
+
+        messages = []
+        for rule in newly_fired:
+            subscriber = self.store.get_subscriber(rule["phone"])
+            if subscriber is None or not subscriber["active"]:
+                continue
+            language = subscriber["language"]
+            messages.append({
+                "phone": rule["phone"],
+                "message": render_alert(rule, language, source, when, fired[rule["id"]]),
+                "language": language,
+            })
+        logger.info("Alerts for %s %s: %d rules hold, %d new alerts", source, key, len(fired), len(messages))
+        return messages
+
+    async def run(self, interval: float = SMS_ALERT_INTERVAL_SECONDS) -> None:
+        """Background task: run `check` every `interval` seconds off the event loop."""
+        if interval <= 0:
+            return
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.check)
+            except Exception as exc:
+                logger.error("Alert check error: %s", exc)
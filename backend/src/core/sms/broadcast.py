@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SMS_BROADCAST_WORKERS = int(os.environ.get("SMS_BROADCAST_WORKERS", "8"))
+# Sustained send rate across all broadcasts (messages/second); bursts up to the same amount.
+SMS_RATE_PER_SECOND = float(os.environ.get("SMS_RATE_PER_SECOND", "10"))
+SMS_MAX_RETRIES = int(os.environ.get("SMS_MAX_RETRIES", "3"))
+SMS_RETRY_BACKOFF_SECONDS = float(os.environ.get("SMS_RETRY_BACKOFF_SECONDS", "0.5"))
+
+MAX_TRACKED_JOBS = 100
+MAX_JOB_ERRORS = 50
+
+
+class TokenBucket:
+    """Thread-safe token bucket; `acquire` blocks until a token is available."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None) -> None:
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                wait = (1.0 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class BroadcastManager:
+    """
+    Runs broadcasts as background jobs on a bounded worker pool.
+
+    `submit` returns a job id immediately; a coordinator thread per job feeds
+    the shared pool with at most two messages per worker in flight, every send
+    takes a token from the shared bucket, and retryable failures (HTTP 429,
+    5xx, connection errors) are retried with exponential backoff and jitter.
+    Optional per-job hooks let callers claim each message just before it is
+    sent (`prepare`) and record its final result (`on_result`).
+    """
+
+    def __init__(
+        self,
+        send: Callable[[str, str, str], Dict],
+        workers: int = SMS_BROADCAST_WORKERS,
+        rate: float = SMS_RATE_PER_SECOND,
+        max_retries: int = SMS_MAX_RETRIES,
+        backoff: float = SMS_RETRY_BACKOFF_SECONDS,
+    ) -> None:
+        self.send = send
+        self.workers = workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.bucket = TokenBucket(rate)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sms-broadcast")
+        self._jobs: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(
+        self,
+        messages: List[Dict],
+        description: Optional[str] = None,
+        prepare: Optional[Callable[[Dict], Optional[Dict]]] = None,
+        on_result: Optional[Callable[[Dict, Dict], None]] = None,
+    ) -> Dict:
+        """
+        Start sending `messages` (dicts with phone, message, language); returns
+        the job.  `prepare(msg)` runs right before a message is first sent and
+        returns the message to send, or None to skip it; `on_result(msg,
+        result)` receives the final send result of every message sent.
+        """
+        job = {
+            "id": f"bc_{uuid.uuid4().hex[:12]}",
+            "description": description,
+            "status": "queued",
+            "total": len(messages),
+            "sent": 0,
+            "failed": 0,
+            "skipped": 0,
+            "retries": 0,
+            "created_at": datetime.now().isoformat(),
+            "started_at": None,
+            "finished_at": None,
+            "errors": deque(maxlen=MAX_JOB_ERRORS),
+        }
+        with self._lock:
+            self._jobs[job["id"]] = job
+            while len(self._jobs) > MAX_TRACKED_JOBS:
+                self._jobs.popitem(last=False)
+        threading.Thread(target=self._run, args=(job, messages, prepare, on_result), name=f"sms-{job['id']}", daemon=True).start()
+        return self.progress(job["id"])
+
+    def progress(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            snapshot = {**job, "errors": list(job["errors"])}
+        done = snapshot["sent"] + snapshot["failed"] + snapshot["skipped"]
+        snapshot["completed"] = done
+        snapshot["percent"] = round(100.0 * done / snapshot["total"], 1) if snapshot["total"] else 100.0
+        if snapshot["started_at"]:
+            end = datetime.fromisoformat(snapshot["finished_at"]) if snapshot["finished_at"] else datetime.now()
+            elapsed = (end - datetime.fromisoformat(snapshot["started_at"])).total_seconds()
+            snapshot["elapsed_s"] = round(elapsed, 3)
+            snapshot["rate_per_s"] = round(done / elapsed, 2) if elapsed > 0 else None
+        return snapshot
+
+    def jobs(self) -> List[Dict]:
+        with self._lock:
+            ids = list(self._jobs)
+        return [self.progress(job_id) for job_id in ids]
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, job: Dict, messages: List[Dict], prepare=None, on_result=None) -> None:
+        with self._lock:
+            job["status"] = "running"
+            job["started_at"] = datetime.now().isoformat()
+        in_flight = threading.BoundedSemaphore(self.workers * 2)
+        futures = []
+        try:
+            for msg in messages:
+                in_flight.acquire()
+                future = self._executor.submit(self._deliver, job, msg, prepare, on_result)
+                future.add_done_callback(lambda _: in_flight.release())
+                futures.append(future)
+        except RuntimeError:
+            # The pool was shut down mid-broadcast.
+            in_flight.release()
+        for future in futures:
+            if not future.cancelled():
+                future.exception()
+        with self._lock:
+            job["status"] = "completed"
+            job["finished_at"] = datetime.now().isoformat()
+        logger.info("Broadcast %s finished: %d/%d sent, %d failed", job["id"], job["sent"], job["total"], job["failed"])
+
+    def _deliver(self, job: Dict, msg: Dict, prepare=None, on_result=None) -> None:
+        if prepare is not None:
+            msg = prepare(msg)
+            if msg is None:
+                with self._lock:
+                    job["skipped"] += 1
+                return
+        attempt = 0
+        while True:
+            self.bucket.acquire()
+            try:
+                result = self.send(msg["phone"], msg["message"], msg.get("language", "en"))
+            except Exception as exc:
+                result = {"success": False, "error": str(exc), "retryable": True}
+
+            if result["success"]:
+                with self._lock:
+                    job["sent"] += 1
+                break
+            if not result.get("retryable") or attempt >= self.max_retries:
+                with self._lock:
+                    job["failed"] += 1
+                    job["errors"].append({"to": msg["phone"], "error": result.get("error"), "attempts": attempt + 1})
+                break
+
+            delay = self.backoff * (2 ** attempt)
+            time.sleep(delay + random.uniform(0, delay))
+            attempt += 1
+            with self._lock:
+                job["retries"] += 1
+        if on_result is not None:
+            on_result(msg, result)
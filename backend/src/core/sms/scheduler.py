@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .broadcast import BroadcastManager
+from .store import SMSStore
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on a single wait so wall-clock jumps are noticed eventually.
+MAX_WAIT_SECONDS = 300.0
+
+
+class SMSScheduler:
+    """
+    Min-heap of (scheduled_time, id) for pending messages, drained by an
+    asyncio task.
+
+    The task sleeps exactly until the earliest entry is due and is woken
+    early whenever an entry is added or cancelled; `add`/`discard` may be
+    called from any thread.  Cancelled and finished messages are dropped
+    lazily: an entry whose id is no longer pending in the store is skipped
+    when it reaches the top, and the heap is rebuilt once stale entries
+    outnumber live ones.  Everything due at once (e.g. a scheduled update
+    to every subscriber) is handed to the `BroadcastManager` as one job, so
+    it is sent by the rate-limited pool and never delays later messages;
+    each message is claimed in the store right before it is sent.
+    """
+
+    def __init__(self, store: SMSStore, broadcasts: BroadcastManager) -> None:
+        self.store = store
+        self.broadcasts = broadcasts
+        self._lock = threading.Lock()
+        requeued = store.requeue_stale()
+        if requeued:
+            logger.warning("Requeued %d messages left in 'sending' by a stopped process", requeued)
+        self._heap: List[Tuple[datetime, str]] = [
+            (msg["scheduled_time"], msg["id"]) for msg in store.pending_messages()
+        ]
+        heapq.heapify(self._heap)
+        self._stale = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._heap) - self._stale
+
+    def _notify(self) -> None:
+        if self._loop is not None and self._wake is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def add(self, messages: Iterable[Dict]) -> None:
+        """Queue stored messages; wakes the task if one is due before the current head."""
+        with self._lock:
+            head = self._heap[0][0] if self._heap else None
+            for msg in messages:
+                heapq.heappush(self._heap, (msg["scheduled_time"], msg["id"]))
+            earlier = head is None or (self._heap and self._heap[0][0] < head)
+        if earlier:
+            self._notify()
+
+    def discard(self, message_id: str) -> None:
+        """Note that a queued message was cancelled so the task can re-plan its sleep."""
+        with self._lock:
+            self._stale += 1
+            if self._stale > len(self._heap) // 2:
+                pending = self.store.pending_ids()
+                self._heap = [entry for entry in self._heap if entry[1] in pending]
+                heapq.heapify(self._heap)
+                self._stale = 0
+        self._notify()
+
+    def _pop_due(self) -> Tuple[List[str], Optional[float]]:
+        """
+        Pop every entry that is due; otherwise return the seconds until the
+        head is (None if empty).
+        """
+        with self._lock:
+            while self._heap and self.store.get_pending(self._heap[0][1]) is None:
+                heapq.heappop(self._heap)
+                self._stale = max(0, self._stale - 1)
+            if not self._heap:
+                return [], None
+            now = datetime.now()
+            delay = (self._heap[0][0] - now).total_seconds()
+            if delay > 0:
+                return [], delay
+            due = []
+            while self._heap and self._heap[0][0] <= now:
+                due.append(heapq.heappop(self._heap)[1])
+            return due, 0.0
+
+    async def run(self) -> None:
+        """Background task delivering scheduled messages until cancelled."""
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        logger.info("SMS scheduler started with %d pending messages", len(self))
+        while True:
+            # Clear before inspecting the heap so a concurrent `add` is never missed.
+            self._wake.clear()
+            due, delay = self._pop_due()
+            if not due:
+                timeout = None if delay is None else min(delay, MAX_WAIT_SECONDS)
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            self._deliver(due)
+
+    def _deliver(self, message_ids: List[str]) -> None:
+        job = self.broadcasts.submit(
+            [{"id": message_id} for message_id in message_ids],
+            description="scheduled",
+            # Claim first: another API worker may hold the same message in its heap.
+            prepare=lambda msg: self.store.claim(msg["id"]),
+            on_result=self._record,
+        )
+        logger.info("Sending %d scheduled messages as broadcast %s", len(message_ids), job["id"])
+
+    def _record(self, msg: Dict, result: Dict) -> None:
+        if result["success"]:
+            self.store.set_status(msg["id"], "sent", sent_at=datetime.now().isoformat())
+        else:
+            self.store.set_status(msg["id"], "failed", error=result.get("error", "Unknown error"))
+            logger.error("Failed to send scheduled message %s: %s", msg["id"], result.get("error"))
@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from requests.adapters import HTTPAdapter
+from twilio.http.http_client import TwilioHttpClient
+from twilio.rest import Client
+
+from .alerts import AlertEngine
+from .broadcast import SMS_BROADCAST_WORKERS, BroadcastManager
+from .scheduler import SMSScheduler
+from .store import SMSStore
+from .templates import build_messages
+
+logger = logging.getLogger(__name__)
+
+SMS_HTTP_TIMEOUT = float(os.environ.get("SMS_HTTP_TIMEOUT", "10"))
+# Point Twilio API calls somewhere else, e.g. the local fake_twilio.py server.
+TWILIO_API_BASE_URL = os.environ.get("TWILIO_API_BASE_URL")
+
+GREETINGS = {
+    "fr": "🇫🇷 Mise à jour NASA Arctique:\n\n",
+    "en": "🇺🇸 NASA Arctic Update:\n\n",
+}
+
+
+class SMSService:
+    """
+    Twilio-backed SMS subscriptions, broadcasts, scheduled messages and alerts.
+
+    One pooled HTTP session is shared by every sender; the scheduler and the
+    alert engine run as asyncio tasks started by `start` from the app lifespan.
+    """
+
+    def __init__(self, store: Optional[SMSStore] = None) -> None:
+        self.account_sid = os.getenv("TWILIO_ACCOUNT_SID", "your_twilio_account_sid_here")
+        self.auth_token = os.getenv("TWILIO_AUTH_TOKEN", "your_twilio_auth_token_here")
+        self.from_phone = os.getenv("TWILIO_PHONE_NUMBER", "+1234567890")
+
+        http_client = TwilioHttpClient(timeout=SMS_HTTP_TIMEOUT)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=SMS_BROADCAST_WORKERS + 2)
+        http_client.session.mount("https://", adapter)
+        http_client.session.mount("http://", adapter)
+        self.client = Client(self.account_sid, self.auth_token, http_client=http_client)
+        if TWILIO_API_BASE_URL:
+            self.client.api.base_url = TWILIO_API_BASE_URL
+
+        self.store = store or SMSStore()
+        self.broadcasts = BroadcastManager(self.send_sms)
+        self.scheduler = SMSScheduler(self.store, self.broadcasts)
+        self.alerts = AlertEngine(self.store, self.broadcasts)
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self) -> None:
+        """Start the scheduler and alert background tasks on the running loop."""
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self.scheduler.run(), name="sms-scheduler"),
+            asyncio.create_task(self.alerts.run(), name="sms-alerts"),
+        ]
+        logger.info("SMS service started")
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self.broadcasts.shutdown()
+
+    def send_sms(self, to_phone: str, message_body: str, language: str = "en") -> Dict:
+        """Send one SMS with the language-specific greeting (blocking)."""
+        try:
+            message = self.client.messages.create(
+                from_=self.from_phone,
+                body=GREETINGS.get(language, GREETINGS["en"]) + message_body,
+                to=to_phone,
+            )
+            logger.info("SMS sent successfully to %s. Message SID: %s", to_phone, message.sid)
+            return {
+                "success": True,
+                "message_sid": message.sid,
+                "to": to_phone,
+                "timestamp": datetime.now().isoformat(),
+            }
+        except Exception as exc:
+            logger.error("Failed to send SMS to %s: %s", to_phone, exc)
+            status = getattr(exc, "status", None)
+            return {
+                "success": False,
+                "error": str(exc),
+                # Rate limits, server errors and transport failures are worth retrying
+                "retryable": status is None or status == 429 or status >= 500,
+                "to": to_phone,
+                "timestamp": datetime.now().isoformat(),
+            }
+
+    def add_subscriber(self, phone_number: str, language: str = "en") -> Dict:
+        subscriber, created = self.store.upsert_subscriber(phone_number, language)
+        if not created:
+            return {"success": True, "message": "Subscription updated", "subscriber": subscriber}
+        logger.info("New subscriber added: %s (%s)", phone_number, language)
+        return {"success": True, "message": "Subscribed successfully", "subscriber": subscriber}
+
+    def remove_subscriber(self, phone_number: str) -> Dict:
+        if self.store.deactivate_subscriber(phone_number):
+            logger.info("Subscriber removed: %s", phone_number)
+            return {"success": True, "message": "Unsubscribed successfully"}
+        return {"success": False, "message": "Phone number not found"}
+
+    def send_arctic_update(self, data_type: str = "ice_loss", language: str = "en") -> Dict:
+        """Start a background broadcast of the Arctic ice update to all active subscribers."""
+        active_subscribers = self.store.active_subscribers()
+        if not active_subscribers:
+            return {"success": True, "message": "No active subscribers", "sent_count": 0, "job": None}
+
+        outgoing = build_messages(active_subscribers, "update", data_type, language)
+        job = self.broadcasts.submit(outgoing, description=f"arctic_{data_type}")
+        return {
+            "success": True,
+            "message": f"Update queued for {len(active_subscribers)} subscribers",
+            "job_id": job["id"],
+            "total_subscribers": len(active_subscribers),
+            "job": job,
+        }
+
+    def schedule_message(
+        self, phone_number: str, message: str, scheduled_time, language: str = "en", message_type: str = "custom"
+    ) -> Dict:
+        result = self.schedule_messages([{
+            "phone": phone_number,
+            "message": message,
+            "language": language,
+            "message_type": message_type,
+        }], scheduled_time)
+        if not result["success"]:
+            return result
+
+        logger.info("Message scheduled for %s at %s", phone_number, result["scheduled_time"])
+        return {
+            "success": True,
+            "message": "SMS scheduled successfully",
+            "scheduled_message": result["scheduled_messages"][0],
+        }
+
+    def schedule_messages(self, messages: List[Dict], scheduled_time) -> Dict:
+        """Schedule many messages for the same time in a single store transaction."""
+        try:
+            if isinstance(scheduled_time, str):
+                scheduled_datetime = datetime.fromisoformat(scheduled_time.replace("Z", "+00:00"))
+            else:
+                scheduled_datetime = scheduled_time
+            if scheduled_datetime.tzinfo is not None:
+                # Stored and compared as naive local time
+                scheduled_datetime = scheduled_datetime.astimezone().replace(tzinfo=None)
+
+            if scheduled_datetime <= datetime.now():
+                return {
+                    "success": False,
+                    "error": "Scheduled time must be in the future",
+                    "scheduled_time": scheduled_time,
+                }
+
+            stored = self.store.add_scheduled([
+                {**msg, "scheduled_time": scheduled_datetime} for msg in messages
+            ])
+            self.scheduler.add(stored)
+            return {"success": True, "scheduled_time": scheduled_datetime, "scheduled_messages": stored}
+        except Exception as exc:
+            logger.error("Failed to schedule SMS: %s", exc)
+            return {"success": False, "error": str(exc)}
+
+    def schedule_arctic_update(self, scheduled_time, data_type: str = "general", language: str = "en") -> Dict:
+        """Schedule the Arctic data report for every active subscriber in their language."""
+        active_subscribers = self.store.active_subscribers()
+        if not active_subscribers:
+            return {"success": False, "message": "No active subscribers to schedule for"}
+
+        pending = [
+            {**msg, "message_type": f"arctic_{data_type}"}
+            for msg in build_messages(active_subscribers, "scheduled", data_type, language)
+        ]
+        result = self.schedule_messages(pending, scheduled_time)
+        if not result["success"]:
+            return result
+
+        scheduled_messages = result["scheduled_messages"]
+        return {
+            "success": True,
+            "message": f"Arctic update scheduled for {len(scheduled_messages)} subscribers",
+            "scheduled_count": len(scheduled_messages),
+            "scheduled_time": scheduled_time,
+            "scheduled_messages": scheduled_messages,
+        }
+
+    def cancel_scheduled_message(self, message_id: str) -> Dict:
+        if self.store.set_status(message_id, "cancelled"):
+            self.scheduler.discard(message_id)
+            logger.info("Scheduled message %s cancelled", message_id)
+            return {"success": True, "message": "Scheduled message cancelled"}
+        return {"success": False, "message": "Scheduled message not found or already sent"}
+
+    def get_scheduled_messages(self, phone_number: Optional[str] = None) -> Dict:
+        messages = self.store.scheduled_messages(phone_number)
+        return {"success": True, "scheduled_messages": messages, "count": len(messages)}
+
+
+@lru_cache(maxsize=1)
+def get_sms_service() -> SMSService:
+    """Process-wide SMS service, created on first use."""
+    return SMSService()
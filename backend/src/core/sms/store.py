@@ -0,0 +1,367 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+DB_PATH = Path(
+    os.environ.get("SMS_DB_PATH", Path(__file__).resolve().parent.parent.parent.parent / "sms.sqlite3")
+).resolve()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS subscribers (
+    phone TEXT PRIMARY KEY,
+    language TEXT NOT NULL DEFAULT 'en',
+    subscribed_at TEXT NOT NULL,
+    active INTEGER NOT NULL DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS scheduled_messages (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    phone TEXT NOT NULL,
+    message TEXT NOT NULL,
+    scheduled_time TEXT NOT NULL,
+    language TEXT NOT NULL DEFAULT 'en',
+    message_type TEXT NOT NULL DEFAULT 'custom',
+    status TEXT NOT NULL DEFAULT 'scheduled',
+    created_at TEXT NOT NULL,
+    sent_at TEXT,
+    error TEXT,
+    claimed_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_scheduled_time ON scheduled_messages (status, scheduled_time);
+CREATE INDEX IF NOT EXISTS idx_scheduled_phone ON scheduled_messages (phone);
+CREATE INDEX IF NOT EXISTS idx_subscribers_active ON subscribers (active);
+CREATE TABLE IF NOT EXISTS alert_rules (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    phone TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    source TEXT NOT NULL DEFAULT 'observed',
+    threshold_km2 REAL,
+    lon REAL,
+    lat REAL,
+    radius_km REAL,
+    triggered INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL,
+    last_fired_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_alert_rules_phone ON alert_rules (phone);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+RULE_COLUMNS = (
+    "id", "phone", "kind", "source", "threshold_km2", "lon", "lat",
+    "radius_km", "triggered", "created_at", "last_fired_at",
+)
+
+# A message left in 'sending' longer than this was claimed by a process that
+# died mid-send; it is put back in the schedule on startup.
+STALE_SENDING_SECONDS = 600
+
+MESSAGE_COLUMNS = (
+    "id", "phone", "message", "scheduled_time", "language",
+    "message_type", "status", "created_at", "sent_at", "error",
+)
+
+
+def _message_from_row(row: Tuple) -> Dict:
+    msg = dict(zip(MESSAGE_COLUMNS, row))
+    msg["scheduled_time"] = datetime.fromisoformat(msg["scheduled_time"])
+    if msg["error"] is None:
+        del msg["error"]
+    return msg
+
+
+def _subscriber_from_row(row: Tuple) -> Dict:
+    phone, language, subscribed_at, active = row
+    return {"phone": phone, "language": language, "subscribed_at": subscribed_at, "active": bool(active)}
+
+
+def _rule_from_row(row: Tuple) -> Dict:
+    rule = dict(zip(RULE_COLUMNS, row))
+    rule["triggered"] = bool(rule["triggered"])
+    return rule
+
+
+class SMSStore:
+    """
+    SQLite-backed subscriber, schedule and alert-rule store.
+
+    SQLite is the only copy of the state: several API workers may share the
+    file, so nothing is mirrored in memory and every read goes to the
+    database through the phone, (status, scheduled_time) and active indexes.
+    Sends are claimed with conditional UPDATEs (`claim`,
+    `claim_rules_triggered`) so each message and alert goes out once.
+    """
+
+    def __init__(self, path: Optional[Path] = None) -> None:
+        self.path = Path(path) if path else DB_PATH
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(scheduled_messages)")}
+        if "claimed_at" not in columns:
+            with self._conn:
+                self._conn.execute("ALTER TABLE scheduled_messages ADD COLUMN claimed_at TEXT")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # Subscribers
+
+    def get_subscriber(self, phone: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT phone, language, subscribed_at, active FROM subscribers WHERE phone = ?", (phone,)
+            ).fetchone()
+        return _subscriber_from_row(row) if row else None
+
+    def upsert_subscriber(self, phone: str, language: str, active: bool = True) -> Tuple[Dict, bool]:
+        """Insert or update a subscriber; returns (subscriber, created)."""
+        with self._lock:
+            with self._conn:
+                cursor = self._conn.execute(
+                    "INSERT INTO subscribers (phone, language, subscribed_at, active) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(phone) DO NOTHING",
+                    (phone, language, datetime.now().isoformat(), int(active)),
+                )
+                created = cursor.rowcount == 1
+                if not created:
+                    self._conn.execute(
+                        "UPDATE subscribers SET language = ?, active = ? WHERE phone = ?",
+                        (language, int(active), phone),
+                    )
+            return self.get_subscriber(phone), created
+
+    def deactivate_subscriber(self, phone: str) -> bool:
+        """Mark a subscriber inactive; returns False when the number is unknown."""
+        with self._lock:
+            with self._conn:
+                cursor = self._conn.execute("UPDATE subscribers SET active = 0 WHERE phone = ?", (phone,))
+            return cursor.rowcount == 1
+
+    def active_subscribers(self) -> List[Dict]:
+        with self._lock:
+            return [
+                _subscriber_from_row(row)
+                for row in self._conn.execute(
+                    "SELECT phone, language, subscribed_at, active FROM subscribers WHERE active = 1"
+                )
+            ]
+
+    # Scheduled messages
+
+    def add_scheduled(self, messages: Iterable[Dict]) -> List[Dict]:
+        """
+        Persist new scheduled messages in one transaction and assign their ids.
+        `messages` are dicts with phone, message, scheduled_time (datetime),
+        language and message_type; returns the stored messages.
+        """
+        now = datetime.now()
+        stamp = int(now.timestamp())
+        stored = [
+            {
+                # Random suffix: workers sharing the database never collide.
+                "id": f"sms_{stamp}_{uuid.uuid4().hex[:12]}",
+                "phone": msg["phone"],
+                "message": msg["message"],
+                "scheduled_time": msg["scheduled_time"],
+                "language": msg.get("language", "en"),
+                "message_type": msg.get("message_type", "custom"),
+                "status": "scheduled",
+                "created_at": now.isoformat(),
+                "sent_at": None,
+            }
+            for msg in messages
+        ]
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT INTO scheduled_messages (id, phone, message, scheduled_time, language, message_type, "
+                    "status, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (m["id"], m["phone"], m["message"], m["scheduled_time"].isoformat(), m["language"],
+                         m["message_type"], m["status"], m["created_at"])
+                        for m in stored
+                    ],
+                )
+        return stored
+
+    def get_pending(self, message_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(MESSAGE_COLUMNS)} FROM scheduled_messages WHERE id = ? AND status = 'scheduled'",
+                (message_id,),
+            ).fetchone()
+        return _message_from_row(row) if row else None
+
+    def pending_ids(self) -> Set[str]:
+        with self._lock:
+            return {
+                row[0] for row in self._conn.execute("SELECT id FROM scheduled_messages WHERE status = 'scheduled'")
+            }
+
+    def pending_messages(self) -> List[Dict]:
+        with self._lock:
+            return [
+                _message_from_row(row)
+                for row in self._conn.execute(
+                    f"SELECT {', '.join(MESSAGE_COLUMNS)} FROM scheduled_messages WHERE status = 'scheduled'"
+                )
+            ]
+
+    def requeue_stale(self, older_than: float = STALE_SENDING_SECONDS) -> int:
+        """Put messages stuck in 'sending' (their sender died) back in the schedule."""
+        cutoff = (datetime.now() - timedelta(seconds=older_than)).isoformat()
+        with self._lock:
+            with self._conn:
+                cursor = self._conn.execute(
+                    "UPDATE scheduled_messages SET status = 'scheduled', claimed_at = NULL "
+                    "WHERE status = 'sending' AND (claimed_at IS NULL OR claimed_at < ?)",
+                    (cutoff,),
+                )
+        return cursor.rowcount
+
+    def claim(self, message_id: str) -> Optional[Dict]:
+        """
+        Atomically move a pending message to 'sending' before it is sent.
+        Returns None when another process claimed or cancelled it first, so
+        API workers sharing one database never send the same message twice.
+        """
+        with self._lock:
+            with self._conn:
+                cursor = self._conn.execute(
+                    "UPDATE scheduled_messages SET status = 'sending', claimed_at = ? "
+                    "WHERE id = ? AND status = 'scheduled'",
+                    (datetime.now().isoformat(), message_id),
+                )
+            if cursor.rowcount != 1:
+                return None
+            row = self._conn.execute(
+                f"SELECT {', '.join(MESSAGE_COLUMNS)} FROM scheduled_messages WHERE id = ?", (message_id,)
+            ).fetchone()
+        return _message_from_row(row)
+
+    def set_status(
+        self, message_id: str, status: str, sent_at: Optional[str] = None, error: Optional[str] = None
+    ) -> bool:
+        """
+        Move a message to a final status: 'cancelled' from 'scheduled', 'sent'
+        or 'failed' from 'sending' (after `claim`).  Returns False if the
+        message was not in that state, e.g. because another process got there
+        first.
+        """
+        previous = "scheduled" if status == "cancelled" else "sending"
+        with self._lock:
+            with self._conn:
+                cursor = self._conn.execute(
+                    "UPDATE scheduled_messages SET status = ?, sent_at = ?, error = ? WHERE id = ? AND status = ?",
+                    (status, sent_at, error, message_id, previous),
+                )
+            return cursor.rowcount == 1
+
+    def scheduled_messages(self, phone: Optional[str] = None, limit: Optional[int] = None) -> List[Dict]:
+        """Scheduled-message history (all statuses), optionally for one phone number."""
+        query = f"SELECT {', '.join(MESSAGE_COLUMNS)} FROM scheduled_messages"
+        params: List = []
+        if phone:
+            query += " WHERE phone = ?"
+            params.append(phone)
+        query += " ORDER BY seq"
+        if limit:
+            query += " LIMIT ?"
+            params.append(int(limit))
+        with self._lock:
+            return [_message_from_row(row) for row in self._conn.execute(query, params)]
+
+    # Alert rules
+
+    def add_rule(self, rule: Dict) -> Dict:
+        """Persist an alert rule (phone, kind, source and its parameters); returns it with its id."""
+        stored = {column: rule.get(column) for column in RULE_COLUMNS}
+        stored.update(triggered=False, created_at=datetime.now().isoformat(), last_fired_at=None)
+        with self._lock:
+            with self._conn:
+                cursor = self._conn.execute(
+                    "INSERT INTO alert_rules (phone, kind, source, threshold_km2, lon, lat, radius_km, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (stored["phone"], stored["kind"], stored["source"], stored["threshold_km2"],
+                     stored["lon"], stored["lat"], stored["radius_km"], stored["created_at"]),
+                )
+            stored["id"] = cursor.lastrowid
+            return stored
+
+    def remove_rule(self, rule_id: int) -> bool:
+        with self._lock:
+            with self._conn:
+                cursor = self._conn.execute("DELETE FROM alert_rules WHERE id = ?", (rule_id,))
+            return cursor.rowcount == 1
+
+    def rules(self, phone: Optional[str] = None) -> List[Dict]:
+        query = f"SELECT {', '.join(RULE_COLUMNS)} FROM alert_rules"
+        params: List = []
+        if phone:
+            query += " WHERE phone = ?"
+            params.append(phone)
+        with self._lock:
+            return [_rule_from_row(row) for row in self._conn.execute(query + " ORDER BY id", params)]
+
+    def set_rules_triggered(self, rule_ids: Iterable[int], triggered: bool, fired_at: Optional[str] = None) -> None:
+        """Bulk-update the edge-trigger state of rules (and when they last fired)."""
+        rule_ids = list(rule_ids)
+        if not rule_ids:
+            return
+        with self._lock:
+            with self._conn:
+                if fired_at is None:
+                    self._conn.executemany(
+                        "UPDATE alert_rules SET triggered = ? WHERE id = ?",
+                        [(int(triggered), rule_id) for rule_id in rule_ids],
+                    )
+                else:
+                    self._conn.executemany(
+                        "UPDATE alert_rules SET triggered = ?, last_fired_at = ? WHERE id = ?",
+                        [(int(triggered), fired_at, rule_id) for rule_id in rule_ids],
+                    )
+
+    def claim_rules_triggered(self, rule_ids: Iterable[int], fired_at: str) -> List[int]:
+        """
+        Atomically mark untriggered rules as triggered; returns the ids this
+        call changed.  Another process evaluating the same data claims none of
+        them, so each alert is sent once.
+        """
+        claimed = []
+        with self._lock:
+            with self._conn:
+                for rule_id in rule_ids:
+                    cursor = self._conn.execute(
+                        "UPDATE alert_rules SET triggered = 1, last_fired_at = ? WHERE id = ? AND triggered = 0",
+                        (fired_at, rule_id),
+                    )
+                    if cursor.rowcount == 1:
+                        claimed.append(rule_id)
+        return claimed
+
+    def get_meta(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+            return row[0] if row else None
+
+    def set_meta(self, key: str, value: str) -> None:
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT INTO meta (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                    (key, value),
+                )
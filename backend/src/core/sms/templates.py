@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Union
+
+from ..services.ice_extent import scan_available_dates
+from ..services.stats import ice_extent_stats
+
+logger = logging.getLogger(__name__)
+
+LANGUAGES = ("en", "fr")
+DATE_FORMATS = {"en": "%m/%d/%Y", "fr": "%d/%m/%Y"}
+
+# (message kind, language) -> {data type: template}.  Templates are str.format
+# patterns over the fields built by `ice_figures`; 'general' is the fallback type.
+TEMPLATES = {
+    ("update", "en"): {
+        "ice_loss": "Arctic sea ice extent: {extent_mkm2:.2f} million km² on {date}{change_clause}.",
+        "temperature": "Arctic temperature: -8.5°C (+1.2°C change). Monthly trend: warming.",
+        "general": "Arctic data update available. Check the NASA dashboard for details.",
+    },
+    ("update", "fr"): {
+        "ice_loss": "Étendue de glace arctique: {extent_mkm2:.2f} millions de km² le {date}{change_clause}.",
+        "temperature": "Température arctique: -8.5°C (variation de +1.2°C). Tendance mensuelle: réchauffement.",
+        "general": "VIVE LE QUEBEC LIBRE! 🇫🇷 Mise à jour des données arctiques disponible.",
+    },
+    ("scheduled", "en"): {
+        "ice_loss": "Scheduled Report: Arctic sea ice extent {extent_mkm2:.2f} million km² on {date}{change_clause}.",
+        "temperature": "Scheduled Report: Arctic temperature -8.5°C (+1.2°C change). Trend: warming.",
+        "general": "Scheduled NASA Arctic data report available.",
+    },
+    ("scheduled", "fr"): {
+        "ice_loss": "Rapport programmé: Étendue de glace arctique de {extent_mkm2:.2f} millions de km² le {date}{change_clause}.",
+        "temperature": "Rapport programmé: Température arctique -8.5°C (+1.2°C variation). Tendance: réchauffement.",
+        "general": "VIVE LE QUEBEC LIBRE! 🇫🇷 Rapport programmé des données arctiques NASA.",
+    },
+}
+
+CHANGE_CLAUSES = {
+    "en": " ({change_pct:+.1f}% vs {previous_date})",
+    "fr": " ({change_pct:+.1f}% par rapport au {previous_date})",
+}
+
+# Used for 'ice_loss' when no observed rasters are available.
+NO_DATA = {
+    ("update", "en"): "Arctic sea ice data updated on {today}.",
+    ("update", "fr"): "Données de glace arctique mises à jour le {today}.",
+    ("scheduled", "en"): "Scheduled Report: Arctic sea ice data from {today}.",
+    ("scheduled", "fr"): "Rapport programmé: Données de glace arctique du {today}.",
+}
+
+ALERT_TEMPLATES = {
+    ("extent_below", "en"): "Alert: {source} Arctic sea ice extent is {extent_mkm2:.2f} million km² for {date}, "
+                            "below your threshold of {threshold_mkm2:.2f} million km².",
+    ("extent_below", "fr"): "Alerte: étendue de glace arctique {source} de {extent_mkm2:.2f} millions de km² pour le {date}, "
+                            "sous votre seuil de {threshold_mkm2:.2f} millions de km².",
+    ("extent_above", "en"): "Alert: {source} Arctic sea ice extent is {extent_mkm2:.2f} million km² for {date}, "
+                            "above your threshold of {threshold_mkm2:.2f} million km².",
+    ("extent_above", "fr"): "Alerte: étendue de glace arctique {source} de {extent_mkm2:.2f} millions de km² pour le {date}, "
+                            "au-dessus de votre seuil de {threshold_mkm2:.2f} millions de km².",
+    ("ice_within", "en"): "Alert: {source} sea ice for {date} is {distance_km:.0f} km from your location "
+                          "({lat:.2f}, {lon:.2f}), within your {radius_km:.0f} km radius.",
+    ("ice_within", "fr"): "Alerte: glace de mer {source} pour le {date} à {distance_km:.0f} km de votre position "
+                          "({lat:.2f}, {lon:.2f}), dans votre rayon de {radius_km:.0f} km.",
+}
+
+SOURCE_LABELS = {
+    ("observed", "en"): "observed",
+    ("observed", "fr"): "observée",
+    ("predicted", "en"): "forecast",
+    ("predicted", "fr"): "prévue",
+}
+
+
+def normalise_language(language: Optional[str]) -> str:
+    return language if language in LANGUAGES else "en"
+
+
+def ice_figures() -> Optional[Dict]:
+    """
+    Latest observed extent and its change against the last snapshot at least
+    30 days earlier, from the cached dataset statistics.  Returns None when no
+    dataset is available.
+    """
+    try:
+        dates = scan_available_dates()
+        if not dates:
+            return None
+        latest = dates[-1]
+        cutoff = (datetime.strptime(latest, "%Y-%m-%d") - timedelta(days=30)).strftime("%Y-%m-%d")
+        earlier = [date for date in dates if date <= cutoff]
+
+        figures = {
+            "date": datetime.strptime(latest, "%Y-%m-%d"),
+            "extent_km2": ice_extent_stats(latest)["extent_km2"],
+            "previous_date": None,
+            "change_pct": None,
+        }
+        if earlier:
+            previous = ice_extent_stats(earlier[-1])["extent_km2"]
+            figures["previous_date"] = datetime.strptime(earlier[-1], "%Y-%m-%d")
+            if previous:
+                figures["change_pct"] = 100.0 * (figures["extent_km2"] - previous) / previous
+        return figures
+    except Exception as exc:
+        logger.warning("Ice statistics unavailable for SMS templates: %s", exc)
+        return None
+
+
+def compile_messages(
+    kind: str, data_type: str, figures: Optional[Dict] = None, now: Optional[datetime] = None
+) -> Dict[str, str]:
+    """
+    Render the message for `data_type` once per language.  Call once per
+    broadcast and reuse the result for every subscriber.
+    """
+    now = now or datetime.now()
+    compiled = {}
+    for language in LANGUAGES:
+        templates = TEMPLATES[(kind, language)]
+        template = templates.get(data_type, templates["general"])
+        date_format = DATE_FORMATS[language]
+
+        if "{extent_mkm2" in template:
+            if figures is None:
+                template = NO_DATA[(kind, language)]
+                fields = {"today": now.strftime(date_format)}
+            else:
+                change_clause = ""
+                if figures["change_pct"] is not None:
+                    change_clause = CHANGE_CLAUSES[language].format(
+                        change_pct=figures["change_pct"],
+                        previous_date=figures["previous_date"].strftime(date_format),
+                    )
+                fields = {
+                    "extent_mkm2": figures["extent_km2"] / 1e6,
+                    "date": figures["date"].strftime(date_format),
+                    "change_clause": change_clause,
+                }
+            compiled[language] = template.format(**fields)
+        else:
+            compiled[language] = template
+    return compiled
+
+
+def group_by_language(subscribers: Iterable[Dict], default_language: str = "en") -> Dict[str, List[str]]:
+    """language -> phone numbers, so each language's message is rendered once."""
+    groups: Dict[str, List[str]] = defaultdict(list)
+    for subscriber in subscribers:
+        groups[normalise_language(subscriber.get("language") or default_language)].append(subscriber["phone"])
+    return groups
+
+
+def build_messages(
+    subscribers: Iterable[Dict], kind: str, data_type: str, default_language: str = "en"
+) -> List[Dict]:
+    """Outgoing message dicts (phone, message, language) for a broadcast."""
+    groups = group_by_language(subscribers, default_language)
+    needs_figures = any("{extent_mkm2" in TEMPLATES[(kind, language)].get(data_type, "") for language in groups)
+    compiled = compile_messages(kind, data_type, ice_figures() if needs_figures else None)
+    return [
+        {"phone": phone, "message": compiled[language], "language": language}
+        for language, phones in groups.items()
+        for phone in phones
+    ]
+
+
+def render_alert(rule: Dict, language: str, source: str, when: Union[datetime, str], fields: Dict) -> str:
+    """Alert text for a fired rule; `when` is a datetime (or a preformatted label)."""
+    language = normalise_language(language)
+    date = when.strftime(DATE_FORMATS[language]) if isinstance(when, datetime) else when
+    return ALERT_TEMPLATES[(rule["kind"], language)].format(
+        source=SOURCE_LABELS[(source, language)],
+        date=date,
+        threshold_mkm2=(rule.get("threshold_km2") or 0.0) / 1e6,
+        lon=rule.get("lon") or 0.0,
+        lat=rule.get("lat") or 0.0,
+        radius_km=rule.get("radius_km") or 0.0,
+        **fields,
+    )
@@ -0,0 +1,139 @@
+"""
+Grid-bucketed spatial index over the ice pixels of a single raster.
+
+Ice pixels are stored as parallel arrays (row, col, lon, lat) sorted by a
+coarse lon/lat bucket key, so a bounding-box query only touches the buckets
+that overlap the box.  Point lookups skip the index entirely and go straight
+to the raster cell through the inverse affine transform.
+"""
+from __future__ import annotations
+
+import math
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import rasterio
+from rasterio.transform import rowcol
+from rasterio.transform import xy as transform_xy
+from rasterio.warp import transform as warp_transform
+
+WGS84 = "EPSG:4326"
+
+
+class IcePixelIndex:
+    """Bucketed lon/lat index over the pixels set in an ice mask."""
+
+    def __init__(
+        self,
+        mask: np.ndarray,
+        transform: rasterio.Affine,
+        crs: rasterio.crs.CRS,
+        values: Optional[np.ndarray] = None,
+        bucket_deg: float = 1.0,
+    ) -> None:
+        self.mask = mask
+        self.value_grid = values
+        self.transform = transform
+        self.crs = crs
+        self.bucket_deg = bucket_deg
+        self._lon_buckets = int(math.ceil(360.0 / bucket_deg))
+
+        rows, cols = np.nonzero(mask)
+        if rows.size:
+            xs, ys = transform_xy(transform, rows, cols)
+            lons, lats = warp_transform(crs, WGS84, np.asarray(xs), np.asarray(ys))
+            lons, lats = np.asarray(lons), np.asarray(lats)
+        else:
+            lons = lats = np.empty(0)
+
+        keys = self._bucket_key(lons, lats)
+        order = np.argsort(keys, kind="stable")
+        self.keys = keys[order]
+        self.rows = rows[order]
+        self.cols = cols[order]
+        self.lons = lons[order]
+        self.lats = lats[order]
+        self.values = values[rows, cols][order] if values is not None else None
+
+    def __len__(self) -> int:
+        return int(self.rows.size)
+
+    def _lat_bucket(self, lats):
+        return np.floor((np.asarray(lats) + 90.0) / self.bucket_deg).astype(np.int64)
+
+    def _lon_bucket(self, lons):
+        buckets = np.floor((np.asarray(lons) + 180.0) / self.bucket_deg).astype(np.int64)
+        return np.clip(buckets, 0, self._lon_buckets - 1)
+
+    def _bucket_key(self, lons, lats) -> np.ndarray:
+        return self._lat_bucket(lats) * self._lon_buckets + self._lon_bucket(lons)
+
+    def _candidates(self, min_lon: float, min_lat: float, max_lon: float, max_lat: float) -> np.ndarray:
+        lat_lo, lat_hi = int(self._lat_bucket(min_lat)), int(self._lat_bucket(max_lat))
+        lon_lo, lon_hi = int(self._lon_bucket(min_lon)), int(self._lon_bucket(max_lon))
+        # A box crossing the antimeridian (min_lon > max_lon) wraps around.
+        if lon_lo <= lon_hi:
+            lon_ranges = [(lon_lo, lon_hi)]
+        else:
+            lon_ranges = [(lon_lo, self._lon_buckets - 1), (0, lon_hi)]
+
+        starts, stops = [], []
+        for lat_bucket in range(lat_lo, lat_hi + 1):
+            for lo, hi in lon_ranges:
+                base = lat_bucket * self._lon_buckets
+                starts.append(base + lo)
+                stops.append(base + hi + 1)
+        if not starts:
+            return np.empty(0, dtype=np.int64)
+
+        begin = np.searchsorted(self.keys, starts, side="left")
+        end = np.searchsorted(self.keys, stops, side="left")
+        return np.concatenate([np.arange(b, e) for b, e in zip(begin, end)])
+
+    def query_bbox(
+        self, min_lon: float, min_lat: float, max_lon: float, max_lat: float
+    ) -> np.ndarray:
+        """
+        Return positions (into the index arrays) of ice pixels whose centers
+        fall inside the box.  `min_lon > max_lon` denotes an antimeridian crossing.
+        """
+        idx = self._candidates(min_lon, min_lat, max_lon, max_lat)
+        lons, lats = self.lons[idx], self.lats[idx]
+        in_lat = (lats >= min_lat) & (lats <= max_lat)
+        if min_lon <= max_lon:
+            in_lon = (lons >= min_lon) & (lons <= max_lon)
+        else:
+            in_lon = (lons >= min_lon) | (lons <= max_lon)
+        return idx[in_lat & in_lon]
+
+    def value_at(self, row: int, col: int) -> Optional[float]:
+        """Per-pixel value (e.g. predicted probability) if the index carries one."""
+        if self.value_grid is None:
+            return None
+        return float(self.value_grid[row, col])
+
+    def locate(self, lon: float, lat: float) -> Optional[Tuple[int, int]]:
+        """Map a lon/lat to the (row, col) of the raster cell containing it."""
+        xs, ys = warp_transform(WGS84, self.crs, [lon], [lat])
+        row, col = rowcol(self.transform, xs[0], ys[0])
+        height, width = self.mask.shape
+        if not (0 <= row < height and 0 <= col < width):
+            return None
+        return int(row), int(col)
+
+    def features(self, idx: np.ndarray) -> Dict:
+        """Build a GeoJSON FeatureCollection of points for the given positions."""
+        features = []
+        for pos in idx.tolist():
+            properties = {"row": int(self.rows[pos]), "col": int(self.cols[pos])}
+            if self.values is not None:
+                properties["pred_prob"] = float(self.values[pos])
+            features.append({
+                "type": "Feature",
+                "geometry": {
+                    "type": "Point",
+                    "coordinates": [float(self.lons[pos]), float(self.lats[pos])],
+                },
+                "properties": properties,
+            })
+        return {"type": "FeatureCollection", "features": features}
@@ -1,4 +1,5 @@
 import os
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -10,9 +11,30 @@ env_path = Path(__file__).resolve().parent.parent / ".env"
 load_dotenv(dotenv_path=env_path)
 
 from .api import register_routes
+from .api.metrics import MetricsMiddleware, router as metrics_router
+from .api.profiling import ProfilingMiddleware, router as profiling_router
 
 API_PREFIX = os.getenv("API_PREFIX", "/api")
-app = FastAPI(title="NASA Ice Backend", version="0.1.0")
+# Run the SMS scheduler and alert checks alongside the API
+SMS_ENABLED = os.getenv("SMS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if not SMS_ENABLED:
+        yield
+        return
+    from .core.sms import get_sms_service
+
+    sms_service = get_sms_service()
+    await sms_service.start()
+    try:
+        yield
+    finally:
+        await sms_service.stop()
+
+
+app = FastAPI(title="NASA Ice Backend", version="0.1.0", lifespan=lifespan)
 
 
 # CORS: Must be added BEFORE routes
@@ -27,11 +49,19 @@ app.add_middleware(
     max_age=3600,
 )
 
+app.add_middleware(ProfilingMiddleware, prefixes=(f"{API_PREFIX}/ice_extent",))
+app.add_middleware(MetricsMiddleware)
+
+
 @app.get("/health")
 def health():
     return {"status": "ok"}
 
 
+app.include_router(metrics_router)
+app.include_router(profiling_router)
+
+
 register_routes(app, prefix=API_PREFIX)
 
 
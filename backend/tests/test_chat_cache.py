@@ -0,0 +1,31 @@
+from src.core.services.chat_cache import ChatResponseCache
+
+
+def _cache():
+    return ChatResponseCache(max_size=8, ttl_seconds=60, similarity=0.9)
+
+
+def test_minimum_does_not_reuse_maximum_answer():
+    cache = _cache()
+    cache.put("What is the maximum ice extent?", 1, "max answer")
+    assert cache.get("What is the minimum ice extent?", 1) is None
+    assert cache.get("What was the lowest ice extent?", 1) is None
+
+
+def test_lowest_does_not_reuse_highest_answer():
+    cache = _cache()
+    cache.put("What was the highest ice extent?", 1, "highest answer")
+    assert cache.get("What was the lowest ice extent?", 1) is None
+
+
+def test_rephrasing_still_hits():
+    cache = _cache()
+    cache.put("What's the date range?", 1, "range answer")
+    assert cache.get("what is the date range", 1) == "range answer"
+    assert cache.stats()["semantic_hits"] == 1
+
+
+def test_different_years_miss():
+    cache = _cache()
+    cache.put("ice extent in 2015", 1, "2015 answer")
+    assert cache.get("ice extent in 2016", 1) is None
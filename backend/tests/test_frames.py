@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+import rasterio
+from rasterio.transform import from_origin
+
+from src.core.services import frames
+from src.core.services.frames import decode_frames, encode_frames
+
+SHAPE = (6, 20)
+
+
+def _masks():
+    first = np.zeros(SHAPE, dtype=bool)
+    first[1:3, 2:15] = True
+    third = first.copy()
+    third[1, 2:5] = False
+    third[5, 19] = True
+    return {"2015-01-01": first, "2015-01-02": first.copy(), "2015-01-03": third}
+
+
+@pytest.fixture
+def masks(monkeypatch):
+    masks = _masks()
+    transform = from_origin(0.0, 6000.0, 1000.0, 1000.0)
+    crs = rasterio.crs.CRS.from_epsg(3413)
+    monkeypatch.setattr(frames, "find_dataset_path", lambda date: date)
+    monkeypatch.setattr(
+        frames,
+        "observed_packed_mask",
+        lambda path, radius_km: (np.packbits(masks[path]), SHAPE, transform, crs),
+    )
+    return masks
+
+
+def test_round_trip_with_keyframe_and_empty_delta(masks):
+    chunks = list(encode_frames(list(masks)))
+    decoded = list(decode_frames(b"".join(chunks)))
+
+    assert [date for date, _ in decoded] == list(masks)
+    for (_, mask), expected in zip(decoded, masks.values()):
+        assert np.array_equal(mask, expected)
+    # The second date's delta carries no pixels: date, kind and two empty lists.
+    assert len(chunks[1]) == 8 + 1 + 2
+
+
+def test_truncated_stream_is_rejected(masks):
+    chunks = list(encode_frames(list(masks)))
+    with pytest.raises(ValueError, match="Truncated"):
+        list(decode_frames(b"".join(chunks[:-1])))
@@ -0,0 +1,81 @@
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+from scipy.sparse.csgraph import dijkstra
+
+from src.core import routing
+from src.core.routing import NavigationGrid, _FieldCache, time_dependent_search
+
+SIZE = 10
+SPEED_KMH = 1.0
+
+
+def _grid(ice=None):
+    navigable = np.ones((SIZE, SIZE), dtype=bool)
+    if ice is None:
+        ice = np.zeros((SIZE, SIZE), dtype=bool)
+    transform = from_origin(0.0, SIZE * 1000.0, 1000.0, 1000.0)
+    return NavigationGrid(navigable, ice, transform, rasterio.crs.CRS.from_epsg(3413), 100.0)
+
+
+def _node(row, col):
+    return row * SIZE + col
+
+
+def test_identical_epochs_match_static_dijkstra():
+    ice = np.zeros((SIZE, SIZE), dtype=bool)
+    ice[2:8, 4] = True
+    grid = _grid(ice)
+    source, target = _node(5, 0), _node(5, 9)
+
+    arrival, pred, epoch_of = time_dependent_search(lambda k: grid, [2.0, 5.0, np.inf], source, target, SPEED_KMH)
+    static = dijkstra(grid.graph, directed=True, indices=source)
+
+    reached = np.isfinite(arrival)
+    assert np.allclose(arrival[reached] * SPEED_KMH, static[reached])
+    assert np.isclose(arrival[target] * SPEED_KMH, static[target])
+    assert epoch_of[target] == 2
+
+
+def test_barrier_in_later_epoch_forces_detour():
+    barrier = np.zeros((SIZE, SIZE), dtype=bool)
+    barrier[1:, 5] = True
+    grids = [_grid(), _grid(barrier)]
+    source, target = _node(5, 0), _node(5, 9)
+
+    arrival, pred, _ = time_dependent_search(lambda k: grids[k], [2.0, np.inf], source, target, SPEED_KMH)
+    nodes = grids[0].path_nodes(pred, source, target)
+
+    assert _node(0, 5) in nodes
+    assert not any(barrier.flat[n] for n in nodes)
+    assert arrival[target] * SPEED_KMH > 9.0 + 1e-6
+
+
+def test_field_cache_evicts_least_recently_used():
+    field = (np.zeros(50, dtype=np.float32), np.zeros(50, dtype=np.int32))
+    cache = _FieldCache(max_bytes=1000)
+    for source in range(3):
+        cache.put((0, source), field)
+        if source == 1:
+            cache.get((0, 0))
+
+    assert cache.get((0, 1)) is None
+    assert cache.get((0, 0)) is not None and cache.get((0, 2)) is not None
+
+    cache.put((0, 3), (np.zeros(500, dtype=np.float32), np.zeros(500, dtype=np.int32)))
+    assert cache.get((0, 3)) is None
+
+
+def test_distance_fields_stay_within_budget(monkeypatch):
+    grid = _grid()
+    field_bytes = SIZE * SIZE * (4 + 4)
+    cache = _FieldCache(max_bytes=3 * field_bytes)
+    monkeypatch.setattr(routing, "_FIELD_CACHE", cache)
+
+    for source in range(SIZE * SIZE):
+        grid.distance_field(source)
+        assert cache._bytes <= cache.max_bytes
+
+    assert len(cache._entries) == 3
+    grid.distance_field(SIZE * SIZE - 1)
+    assert grid.field_hits == 1
@@ -1,5 +1,5 @@
 import { useState, useRef, useEffect } from "react";
-import { sendChatMessage } from "../services/chatbotAPI";
+import { sendChatMessage, streamChatMessage } from "../services/chatbotAPI";
 import "./styles/FloatingChatbot.css";
 
 const FloatingChatbot = () => {
@@ -8,8 +8,13 @@ const FloatingChatbot = () => {
   const [reply, setReply] = useState<string[]>([]);
   const [note, setNote] = useState<string | null>(null);
   const [loading, setLoading] = useState(false);
+  const [streaming, setStreaming] = useState(false);
   const [error, setError] = useState<string | null>(null);
   const messagesEndRef = useRef<HTMLDivElement>(null);
+  const streamAbortRef = useRef<AbortController | null>(null);
+
+  // Stop any in-flight stream when the widget unmounts
+  useEffect(() => () => streamAbortRef.current?.abort(), []);
 
   // Auto-scroll to latest message
   useEffect(() => {
@@ -18,23 +23,60 @@ const FloatingChatbot = () => {
 
   const handleSend = async () => {
     const message = input.trim();
-    if (!message || loading) return;
+    if (!message || streaming) return;
 
     // 1. Immediately show user message
     setReply((prev) => [...prev, `You: ${message}`]);
     setInput("");
     setLoading(true);
+    setStreaming(true);
     setError(null);
 
+    // 2. Stream the assistant response into a new line as tokens arrive
+    streamAbortRef.current?.abort();
+    const controller = new AbortController();
+    streamAbortRef.current = controller;
+    // Decided here rather than inside the setReply updaters, which StrictMode runs twice
+    let started = false;
     try {
-      const res = await sendChatMessage(message);
-      // 2. Append assistant response
-      setReply((prev) => [...prev, `🤖: ${res.reply}`]);
-      setNote(res.note ?? null);
+      const done = await streamChatMessage(
+        message,
+        (token) => {
+          if (!started) {
+            started = true;
+            setLoading(false);
+            setReply((prev) => [...prev, `🤖: ${token}`]);
+            return;
+          }
+          setReply((prev) => {
+            const next = [...prev];
+            next[next.length - 1] += token;
+            return next;
+          });
+        },
+        controller.signal
+      );
+      setNote(done.note ?? null);
     } catch (err: any) {
-      setError(err?.message ?? "Chat request failed");
+      if (controller.signal.aborted) return;
+      if (started) {
+        setError(err?.message ?? "Chat request failed");
+      } else {
+        // Fall back to the blocking endpoint if streaming is unavailable
+        try {
+          const res = await sendChatMessage(message);
+          setReply((prev) => [...prev, `🤖: ${res.reply}`]);
+          setNote(res.note ?? null);
+        } catch (fallbackErr: any) {
+          setError(fallbackErr?.message ?? "Chat request failed");
+        }
+      }
     } finally {
-      setLoading(false);
+      if (streamAbortRef.current === controller) {
+        setLoading(false);
+        setStreaming(false);
+        streamAbortRef.current = null;
+      }
     }
   };
 
@@ -103,9 +145,9 @@ const FloatingChatbot = () => {
                     handleSend();
                   }
                 }}
-                disabled={loading}
+                disabled={streaming}
               />
-              <button type="button" onClick={handleSend} disabled={loading || !input.trim()}>
+              <button type="button" onClick={handleSend} disabled={streaming || !input.trim()}>
                 ➜
               </button>
             </div>
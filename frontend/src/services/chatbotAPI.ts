@@ -1,5 +1,6 @@
 import api from "../api/mapAPI";
-import type { ChatMessageResponse } from "../types/api";
+import parsedEnv from "../config/env";
+import type { ChatMessageResponse, ChatStreamDone } from "../types/api";
 
 export const sendChatMessage = async (message: string): Promise<ChatMessageResponse> => {
   try {
@@ -10,3 +11,51 @@ export const sendChatMessage = async (message: string): Promise<ChatMessageRespo
     throw new Error(`Chat request failed (${status})`);
   }
 };
+
+/**
+ * Stream a reply from `/chat/stream` (Server-Sent Events over a POST body).
+ * `onToken` receives each chunk as it arrives; aborting `signal` cancels the
+ * request, which also stops generation on the server.
+ */
+export const streamChatMessage = async (
+  message: string,
+  onToken: (token: string) => void,
+  signal?: AbortSignal
+): Promise<ChatStreamDone> => {
+  const res = await fetch(`${parsedEnv.VITE_API_BASE}${parsedEnv.VITE_API_PREFIX}/chat/stream`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json", "ngrok-skip-browser-warning": "true" },
+    body: JSON.stringify({ message }),
+    signal,
+  });
+  if (!res.ok || !res.body) {
+    throw new Error(`Chat request failed (${res.status})`);
+  }
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let boundary = buffer.indexOf("\n\n");
+    while (boundary !== -1) {
+      const block = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      boundary = buffer.indexOf("\n\n");
+
+      const event = block.match(/^event: (.*)$/m)?.[1];
+      const data = block.match(/^data: (.*)$/m)?.[1];
+      if (!event || !data) continue;
+
+      const payload = JSON.parse(data);
+      if (event === "token") onToken(payload.token);
+      else if (event === "done") return payload as ChatStreamDone;
+      else if (event === "error") throw new Error(payload.note ?? payload.reply);
+    }
+  }
+  throw new Error("Chat stream ended unexpectedly");
+};
@@ -38,3 +38,9 @@ export type ChatMessageResponse = {
     reply: string;
     note?: string;
 };
+
+export type ChatStreamDone = {
+    note: string | null;
+    ttft_ms: number | null;
+    total_ms: number;
+};